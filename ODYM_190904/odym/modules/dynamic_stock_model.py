@@ -18,19 +18,349 @@ standard abbreviation: DSM or dsm
 dependencies:
     numpy >= 1.9
     scipy >= 0.14
+    numba (optional, for backend = 'numba')
 
 Repository for this class, documentation, and tutorials: https://github.com/IndEcol/ODYM
 
 """
 
+import collections
+import contextlib
+import functools
+import hashlib
+import json
+import os
+import time
+import types
 import numpy as np
+import scipy.linalg
+import scipy.signal
+import scipy.sparse
 import scipy.stats
+try:
+    import numba
+except ImportError:
+    numba = None # optional, cf. DynamicStockModel(backend = 'numba')
 
 def __version__():
     """Return a brief version string and statement for this class."""
     return str('1.0'), str('Class DynamicStockModel, dsm. Version 1.0. Last change: July 25th, 2019. Check https://github.com/IndEcol/ODYM for latest version.')
 
 
+# Parameters that define each lifetime distribution type, cf. DynamicStockModel.compute_sf
+LT_PARAMETERS = {'Fixed':        ['Mean'],
+                 'Normal':       ['Mean', 'StdDev'],
+                 'FoldedNormal': ['Mean', 'StdDev'],
+                 'LogNormal':    ['Mean', 'StdDev'],
+                 'Weibull':      ['Shape', 'Scale']}
+
+# Variables stored by DynamicStockModel.save, cf. Part 9
+SAVE_VARIABLES = ['t', 'i', 's', 'o', 's_c', 'o_c']
+
+# Process-wide cache of survival functions and pdfs, shared by all instances of DynamicStockModel.
+# Key: kind of array ('sf' or 'pdf'), lifetime type, hash of the lifetime parameter arrays, and length of time vector.
+# The least recently used entry is dropped once SF_CACHE_MAXSIZE entries are stored. Set SF_CACHE_MAXSIZE = 0 to switch the cache off.
+# Cached arrays are read-only, as they can be shared by many dynamic stock models.
+SF_CACHE_MAXSIZE = 32
+SF_Cache = collections.OrderedDict()
+SF_Cache_Stats = {'hits': 0, 'misses': 0}
+
+
+def sf_cache_key(Kind, lt, NoofYears, dtype = np.float64):
+    """Return the cache key for the sf or pdf of lifetime distribution lt over NoofYears years, stored in dtype, or None if lt cannot be cached."""
+    try:
+        ParHash = hashlib.sha1()
+        for ThisKey in LT_PARAMETERS[lt['Type']]:
+            ParHash.update(ThisKey.encode())
+            ParHash.update(np.ascontiguousarray(lt[ThisKey], dtype=float).tobytes())
+        return (Kind, lt['Type'], ParHash.hexdigest(), NoofYears, np.dtype(dtype).str)
+    except:
+        return None # Unknown lifetime type or missing parameters, no caching.
+
+
+def sf_cache_get(Key):
+    """Return cached array for Key, or None if not present. Counts hits and misses."""
+    if Key is None or SF_CACHE_MAXSIZE <= 0:
+        return None
+    if Key in SF_Cache:
+        SF_Cache.move_to_end(Key)
+        SF_Cache_Stats['hits'] += 1
+        return SF_Cache[Key]
+    SF_Cache_Stats['misses'] += 1
+    return None
+
+
+def sf_cache_put(Key, Value):
+    """Store a read-only view of Value under Key and drop the least recently used entries beyond SF_CACHE_MAXSIZE."""
+    if Key is None or SF_CACHE_MAXSIZE <= 0:
+        return Value
+    Value = Value.view()
+    Value.flags.writeable = False
+    SF_Cache[Key] = Value
+    SF_Cache.move_to_end(Key)
+    while len(SF_Cache) > SF_CACHE_MAXSIZE:
+        SF_Cache.popitem(last=False)
+    return Value
+
+
+def sf_cache_info():
+    """Return hit and miss counts and the current and maximum size of the survival function cache."""
+    return {'hits': SF_Cache_Stats['hits'], 'misses': SF_Cache_Stats['misses'], 'size': len(SF_Cache), 'maxsize': SF_CACHE_MAXSIZE}
+
+
+def sf_cache_clear():
+    """Empty the survival function cache and reset the hit and miss counts."""
+    SF_Cache.clear()
+    SF_Cache_Stats['hits'] = 0
+    SF_Cache_Stats['misses'] = 0
+
+
+# Opt-in profile of the public methods of DynamicStockModel, shared by all instances in the process.
+# profile_start replaces the methods by timing wrappers, profile_stop restores them, so there is no overhead while profiling is off.
+# Profile_Stats[Method] = [number of calls, cumulative wall time in s, cumulative size of the returned arrays in bytes].
+# Times are inclusive: the time of methods called by other methods (e.g., compute_sf in compute_stock_driven_model) is counted for both.
+Profile_Stats = collections.OrderedDict()
+Profile_Originals = {}
+
+
+def profile_array_bytes(Result):
+    """Return the size in bytes of the arrays in Result, which can be an array, or a tuple, list, or dict of arrays."""
+    if isinstance(Result, np.ndarray):
+        return Result.nbytes
+    if isinstance(Result, (tuple, list)):
+        return sum(Item.nbytes for Item in Result if isinstance(Item, np.ndarray))
+    if isinstance(Result, dict):
+        return sum(Item.nbytes for Item in Result.values() if isinstance(Item, np.ndarray))
+    return 0
+
+
+def profile_wrap(Name, Method):
+    """Return a wrapper of Method that adds calls, wall time, and returned array size to Profile_Stats[Name]."""
+    @functools.wraps(Method)
+    def Wrapper(*args, **kwargs):
+        Start = time.perf_counter()
+        Result = Method(*args, **kwargs)
+        Stats = Profile_Stats.setdefault(Name, [0, 0.0, 0])
+        Stats[0] += 1
+        Stats[1] += time.perf_counter() - Start
+        Stats[2] += profile_array_bytes(Result)
+        return Result
+    return Wrapper
+
+
+def profile_start():
+    """Start recording calls, wall time, and returned array sizes of all public methods of DynamicStockModel."""
+    for Name, Method in list(vars(DynamicStockModel).items()):
+        if Name.startswith('_') is False and isinstance(Method, types.FunctionType) and Name not in Profile_Originals:
+            Profile_Originals[Name] = Method
+            setattr(DynamicStockModel, Name, profile_wrap(Name, Method))
+
+
+def profile_stop():
+    """Stop recording, the recorded statistics are kept until profile_clear is called."""
+    for Name, Method in Profile_Originals.items():
+        setattr(DynamicStockModel, Name, Method)
+    Profile_Originals.clear()
+
+
+def profile_clear():
+    """Delete the recorded statistics."""
+    Profile_Stats.clear()
+
+
+@contextlib.contextmanager
+def profiling(Clear = True):
+    """Context manager for profile_start and profile_stop. With Clear = True, the statistics of earlier runs are deleted first."""
+    if Clear is True:
+        profile_clear()
+    profile_start()
+    try:
+        yield Profile_Stats
+    finally:
+        profile_stop()
+
+
+def profile_summary():
+    """Return the recorded statistics as list of dicts with method, calls, time_s, time_per_call_s, and output_MB, slowest method first."""
+    Summary = [{'method': Name, 'calls': Stats[0], 'time_s': Stats[1], 'time_per_call_s': Stats[1] / Stats[0], 'output_MB': Stats[2] / 2**20}
+               for Name, Stats in Profile_Stats.items()]
+    return sorted(Summary, key = lambda Row: Row['time_s'], reverse = True)
+
+
+def profile_report():
+    """Return the recorded statistics as text table, slowest method first."""
+    Lines = ['{:<40s} {:>8s} {:>12s} {:>12s} {:>12s}'.format('method', 'calls', 'time [s]', 'per call [s]', 'output [MB]')]
+    for Row in profile_summary():
+        Lines.append('{:<40s} {:>8d} {:>12.4f} {:>12.6f} {:>12.1f}'.format(Row['method'], Row['calls'], Row['time_s'], Row['time_per_call_s'], Row['output_MB']))
+    return '\n'.join(Lines)
+
+
+def band_to_dense(Band):
+    """Convert a table in banded layout, time x age, into the dense layout time x age-cohort: Dense[t,t-a] = Band[t,a].
+    Band may have a leading batch dimension. Entries with age-cohort t-a < 0 are dropped."""
+    Band = np.asarray(Band)
+    NoofYears, NoofAges = Band.shape[-2], Band.shape[-1]
+    Dense = np.zeros(Band.shape[:-2] + (NoofYears, NoofYears), dtype=Band.dtype)
+    Year, Age = np.nonzero(np.subtract.outer(np.arange(0,NoofYears), np.arange(0,NoofAges)) >= 0)
+    Dense[..., Year, Year - Age] = Band[..., Year, Age]
+    return Dense
+
+
+def dense_to_band(Dense, NoofAges):
+    """Convert a table in dense layout, time x age-cohort, into the banded layout time x age with NoofAges ages: Band[t,a] = Dense[t,t-a].
+    Dense may have a leading batch dimension. Age-cohorts older than NoofAges - 1 years are dropped."""
+    Dense = np.asarray(Dense)
+    NoofYears = Dense.shape[-2]
+    Band = np.zeros(Dense.shape[:-2] + (NoofYears, NoofAges), dtype=Dense.dtype)
+    Year, Age = np.nonzero(np.subtract.outer(np.arange(0,NoofYears), np.arange(0,NoofAges)) >= 0)
+    Band[..., Year, Age] = Dense[..., Year, Year - Age]
+    return Band
+
+
+def band_to_sparse(Band):
+    """Convert a table in banded layout, time x age, into a sparse matrix (CSR) in the layout time x age-cohort, with the nonzero entries of Band only."""
+    Year, Age = np.nonzero(Band)
+    Keep = Year - Age >= 0
+    return scipy.sparse.csr_matrix((Band[Year[Keep], Age[Keep]], (Year[Keep], Year[Keep] - Age[Keep])), shape=(Band.shape[0], Band.shape[0]))
+
+
+def sparse_row(Table, t):
+    """Return row t of the sparse matrix Table (CSR) as dense vector."""
+    Row = np.zeros(Table.shape[1], dtype=Table.dtype)
+    Row[Table.indices[Table.indptr[t]:Table.indptr[t+1]]] = Table.data[Table.indptr[t]:Table.indptr[t+1]]
+    return Row
+
+
+def sparse_outflow_by_cohort(Table, Diagonal):
+    """Mass balance of a sparse stock by cohort or survival table, time x age-cohort (CSR): 
+    Out[t,c] = Table[t-1,c] - Table[t,c] for t > c, and Out[c,c] = Diagonal[c], the outflow during the first year."""
+    Diff = scipy.sparse.vstack([scipy.sparse.csr_matrix((1, Table.shape[1]), dtype=Table.dtype), Table[0:-1,:] - Table[1::,:]])
+    Out = (scipy.sparse.tril(Diff, k=-1) + scipy.sparse.diags(Diagonal)).tocsr()
+    Out.eliminate_zeros()
+    return Out
+
+
+# Compute kernels for the sequential year-by-year recursions, cf. DynamicStockModel(backend = 'numba').
+# The kernels are plain loops over preallocated arrays, which are changed in place. 
+# With the backend 'numba', they are compiled with numba.njit, the default backend 'numpy' uses the vectorized methods of DynamicStockModel instead.
+BACKENDS = ('numpy', 'numba')
+Kernel_Cache = {}
+
+
+def get_kernel(Kernel, backend):
+    """Return the compute kernel function Kernel compiled for the backend, or the plain Python function for the backend 'numpy'."""
+    if backend == 'numba':
+        if numba is None:
+            raise ImportError("The backend 'numba' requires the optional package numba.")
+        if Kernel not in Kernel_Cache:
+            Kernel_Cache[Kernel] = numba.njit(cache=True)(Kernel)
+        return Kernel_Cache[Kernel]
+    return Kernel
+
+
+def kernel_stock_driven(s, sf, i, Factor, FirstYear, NegativeInflowCorrect):
+    """Year-by-year stock-driven model with optional negative inflow correction, starting in year FirstYear, 
+    cf. DynamicStockModel.compute_negative_inflow_correct. The inflow i and the correction factors Factor are changed in place."""
+    NoofYears = s.shape[0]
+    Weight = np.zeros(NoofYears)
+    for c in range(0, FirstYear):
+        Weight[c] = i[c]
+    CumFactor = 1.0
+    for m in range(FirstYear, NoofYears):
+        StockPrev = 0.0
+        for c in range(0, m):
+            StockPrev += Weight[c] * sf[m,c]
+        StockPrev = CumFactor * StockPrev
+        InflowTest = s[m] - StockPrev
+        if NegativeInflowCorrect and InflowTest < 0:
+            i[m] = 0.0
+            Delta_percent = 0.0
+            if StockPrev != 0:
+                Delta_percent = -1 * InflowTest / StockPrev
+            Factor[m] = 1 - Delta_percent
+            CumFactor = CumFactor * Factor[m]
+            if CumFactor < 1e-100:
+                for c in range(0, m):
+                    Weight[c] = Weight[c] * CumFactor
+                CumFactor = 1.0
+        else:
+            if sf[m,m] != 0:
+                i[m] = InflowTest / sf[m,m]
+            Weight[m] = i[m] / CumFactor
+
+
+def kernel_typesplit(s, SFArrayCombined, TypeSplit, s_cg, o_cg, i_g, NIC_Flags, SwitchTime, NegativeInflowCorrect):
+    """Year-by-year stock-driven model with type split, starting in year SwitchTime, 
+    cf. DynamicStockModel.compute_stock_driven_model_initialstock_typesplit_negativeinflowcorrect. 
+    s_cg, o_cg, i_g, and NIC_Flags are changed in place."""
+    Ntt, Ng = SFArrayCombined.shape[0], SFArrayCombined.shape[2]
+    for m in range(SwitchTime, Ntt):
+        StockPrev = s_cg[m,:,:].sum()
+        i0_test = s[m] - StockPrev
+        if i0_test < 0:
+            NIC_Flags[m,0] = i0_test
+        if NegativeInflowCorrect and i0_test < 0:
+            Delta_percent = 0.0
+            if StockPrev != 0:
+                Delta_percent = -1 * i0_test / StockPrev
+            for c in range(0, Ntt):
+                for g in range(0, Ng):
+                    i_g[m,g] = 0.0
+                    o_cg[m,c,g] = o_cg[m,c,g] + s_cg[m,c,g] * Delta_percent
+            for t in range(m, Ntt):
+                for c in range(0, m):
+                    for g in range(0, Ng):
+                        s_cg[t,c,g] = s_cg[t,c,g] * (1 - Delta_percent)
+            for t in range(m+1, Ntt):
+                for c in range(0, Ntt):
+                    for g in range(0, Ng):
+                        o_cg[t,c,g] = s_cg[t-1,c,g] - s_cg[t,c,g]
+        else:
+            for g in range(0, Ng):
+                if SFArrayCombined[m,m,g] != 0:
+                    i_g[m,g] = TypeSplit[m,g] * i0_test / SFArrayCombined[m,m,g]
+                for t in range(m, Ntt):
+                    s_cg[t,m,g] = i_g[m,g] * SFArrayCombined[t,m,g]
+                o_cg[m,m,g] = i_g[m,g] * (1 - SFArrayCombined[m,m,g])
+                for t in range(m+1, Ntt):
+                    o_cg[t,m,g] = s_cg[t-1,m,g] - s_cg[t,m,g]
+
+
+def kernel_typesplit_futurestock(FutureStock, InitialStock, SFArrayCombined, TypeSplit, s_cg, o_cg, i_g, SwitchTime):
+    """Year-by-year stock-driven model with type split for the future years, 
+    cf. DynamicStockModel.compute_stock_driven_model_initialstock_typesplit. s_cg, o_cg, and i_g are changed in place."""
+    Ntt, Ng = SFArrayCombined.shape[0], SFArrayCombined.shape[2]
+    for t in range(SwitchTime, Ntt):
+        r = t - SwitchTime
+        for c in range(0, Ntt):
+            for g in range(0, Ng):
+                s_cg[r,c,g] = i_g[c,g] * SFArrayCombined[t,c,g]
+                if t == SwitchTime:
+                    o_cg[r,c,g] = InitialStock[c,g] - s_cg[r,c,g]
+                else:
+                    o_cg[r,c,g] = s_cg[r-1,c,g] - s_cg[r,c,g]
+        i0 = FutureStock[r] - s_cg[r,:,:].sum()
+        for g in range(0, Ng):
+            i_g[t,g] = TypeSplit[r,g] * i0
+            if SFArrayCombined[t,t,g] != 0:
+                i_g[t,g] = i_g[t,g] / SFArrayCombined[t,t,g]
+            s_cg[r,t,g] = i_g[t,g] * SFArrayCombined[t,t,g]
+            o_cg[r,t,g] = i_g[t,g] * (1 - SFArrayCombined[t,t,g])
+
+
+def storage_property(Name):
+    """Return a property for the table Name of DynamicStockModel (sf, pdf, s_c, o_c) that converts assigned arrays to the dtype of the model.
+    Other values, such as None or a LazyCohortTable, are stored unchanged."""
+    Key = '_' + Name
+    def Getter(self):
+        return getattr(self, Key, None)
+    def Setter(self, Value):
+        if (isinstance(Value, np.ndarray) or scipy.sparse.issparse(Value)) and Value.dtype != self.dtype:
+            Value = Value.astype(self.dtype)
+        setattr(self, Key, Value)
+    return property(Getter, Setter, doc = Name + ', stored with the dtype of the model')
+
+
 class DynamicStockModel(object):
 
     """ Class containing a dynamic stock model
@@ -51,6 +381,29 @@ class DynamicStockModel(object):
     pdf: probability density function, distribution of outflow from a specific age-cohort
     
     sf: survival function for different age-cohorts, year x age-cohort table
+        sf and pdf are taken from a process-wide cache if another model with the same lifetime and time vector length
+        has computed them before, cf. sf_cache_info(). Cached arrays are read-only.
+
+    max_age, sf_tol: optional truncation of the lifetime for the banded methods (Part 5), 
+        either a maximum age in years or a tolerance below which the survival function is treated as 0.
+    sf_band, s_c_band, o_c_band: survival function, stock by cohort, and outflow by cohort in banded layout, time x age,
+        cf. band_to_dense and dense_to_band for the conversion to the dense layout year x age-cohort.
+        
+    lazy: if True, the inflow-driven and stock-driven model keep only the inflow and the lifetime distribution,
+        s_c and o_c are LazyCohortTable objects that compute rows, columns, and totals on demand.
+        
+    sparse_threshold: optional, if the share of nonzero entries of sf is below sparse_threshold, 
+        sf, pdf, s_c, and o_c are stored as sparse matrices (scipy.sparse, CSR), cf. Part 10.
+        
+    sensitivity: derivatives of inflow, stock, and outflow with respect to the lifetime parameters, 
+        sensitivity[Parameter][Variable], cf. compute_stock_driven_model_sensitivity and compute_s_c_inflow_driven_sensitivity.
+        
+    backend: 'numpy' (default) or 'numba'. With 'numba', the year-by-year recursions of the stock-driven models 
+        (with and without negative inflow correction, initial stock, and type split) run as compiled kernels, cf. get_kernel.
+        
+    dtype: floating point type for storing sf, pdf, s_c, and o_c, default np.float64. With np.float32, the tables need half the memory.
+        The computations and the totals (compute_stock_total, compute_outflow_total) are done in float64, 
+        the resulting rounding error of the mass balance is reported by check_stock_balance(ReportPrecision = True).
 
 
     name : string, optional
@@ -61,8 +414,16 @@ class DynamicStockModel(object):
     Basic initialisation and dimension check methods
     """
 
-    def __init__(self, t=None, i=None, o=None, s=None, lt=None, s_c=None, o_c=None, name='DSM', pdf=None, sf=None):
+    sf  = storage_property('sf')
+    pdf = storage_property('pdf')
+    s_c = storage_property('s_c')
+    o_c = storage_property('o_c')
+
+    def __init__(self, t=None, i=None, o=None, s=None, lt=None, s_c=None, o_c=None, name='DSM', pdf=None, sf=None, max_age=None, sf_tol=None, lazy=False, backend='numpy', dtype=np.float64, sparse_threshold=None):
         """ Init function. Assign the input data to the instance of the object."""
+        self.dtype = np.dtype(dtype) # storage type of sf, pdf, s_c, and o_c
+        if not np.issubdtype(self.dtype, np.floating):
+            raise ValueError("dtype must be a floating point type, not '{}'.".format(self.dtype))
         self.t = t  # optional
 
         self.i = i  # optional
@@ -86,6 +447,24 @@ class DynamicStockModel(object):
 
         self.pdf = pdf # optional
         self.sf  = sf # optional
+        
+        self.max_age  = max_age # optional, for banded methods
+        self.sf_tol   = sf_tol  # optional, for banded methods
+        self.sf_band  = None
+        self.s_c_band = None
+        self.o_c_band = None
+        
+        self.lazy = lazy # optional, cf. LazyCohortTable
+        self.sparse_threshold = sparse_threshold # optional, cf. Part 10
+        self.nic_factor = None # yearly correction factors of the negative inflow correction, cf. compute_negative_inflow_correct
+        self.sensitivity = None # derivatives with respect to the lifetime parameters, cf. Part 8
+        self.buffers = {} # year x age-cohort tables with spare capacity for appended years, cf. Part 6
+        
+        if backend not in BACKENDS:
+            raise ValueError("Unknown backend '{}', choose one of {}.".format(backend, BACKENDS))
+        if backend == 'numba' and numba is None:
+            raise ImportError("The backend 'numba' requires the optional package numba.")
+        self.backend = backend # compute kernels for the year-by-year recursions, cf. get_kernel
 
     """ Part 1: Checks and balances: """
 
@@ -142,14 +521,31 @@ class DynamicStockModel(object):
         else:
             return None
 
-    def check_stock_balance(self):
-        """ Check wether inflow, outflow, and stock are balanced. If possible, the method returns the vector 'Balance', where Balance = inflow - outflow - stock_change"""
+    def check_stock_balance(self, ReportPrecision = False):
+        """ Check wether inflow, outflow, and stock are balanced. If possible, the method returns the vector 'Balance', where Balance = inflow - outflow - stock_change
+        With ReportPrecision = True, the method returns Balance and the vector Tolerance, cf. compute_balance_tolerance. 
+        Deviations with |Balance| <= Tolerance are explained by the rounding of s_c and o_c to the storage dtype."""
         try:
             Balance = self.i - self.o - self.compute_stock_change()
+            if ReportPrecision is True:
+                return Balance, self.compute_balance_tolerance()
             return Balance
         except:
             # Could not determine balance. At least one of the variables is not defined.
-            return None
+            return (None, None) if ReportPrecision is True else None
+
+    def compute_balance_tolerance(self):
+        """ Estimated rounding error of the mass balance, caused by computing s_c and o_c and storing them with the precision of dtype:
+        Tolerance[t] = 2 * eps * (sum_c |s_c[t,c]| + sum_c |s_c[t-1,c]| + sum_c |o_c[t,c]|), with the machine epsilon eps of dtype.
+        Without stock and outflow by cohort, the total stock and outflow are used instead."""
+        Eps = np.finfo(self.dtype).eps
+        if isinstance(self.s_c, np.ndarray) and isinstance(self.o_c, np.ndarray) and self.s_c.ndim == 2:
+            S_Abs = np.abs(self.s_c).sum(axis=1, dtype=np.float64)
+            O_Abs = np.abs(self.o_c).sum(axis=1, dtype=np.float64)
+        else:
+            S_Abs = np.abs(np.asarray(self.s, dtype=float))
+            O_Abs = np.abs(np.asarray(self.o, dtype=float))
+        return 2 * Eps * (S_Abs + np.concatenate(([0], S_Abs[0:-1])) + O_Abs)
 
     def compute_stock_total(self):
         """Determine total stock as row sum of cohort-specific stock."""
@@ -157,7 +553,9 @@ class DynamicStockModel(object):
             return self.s
         else:
             try:
-                self.s = self.s_c.sum(axis=1)
+                self.s = self.s_c.sum(axis=1, dtype=np.float64) # accumulate in float64 for all storage types
+                if scipy.sparse.issparse(self.s_c):
+                    self.s = np.asarray(self.s).ravel()
                 return self.s
             except:
                 return None # No stock by cohorts exists, and total stock cannot be computed
@@ -169,7 +567,9 @@ class DynamicStockModel(object):
             return self.o
         else:
             try:
-                self.o = self.o_c.sum(axis=1)
+                self.o = self.o_c.sum(axis=1, dtype=np.float64) # accumulate in float64 for all storage types
+                if scipy.sparse.issparse(self.o_c):
+                    self.o = np.asarray(self.o).ravel()
                 return self.o
             except:
                 return None # No outflow by cohorts exists, and total outflow cannot be computed
@@ -193,11 +593,19 @@ class DynamicStockModel(object):
         The method does nothing if the pdf alreay exists.
         """
         if self.pdf is None:
+            if self.sparse_threshold is not None and scipy.sparse.issparse(self.compute_sf()):
+                self.pdf = sparse_outflow_by_cohort(self.sf, 1 - self.sf.diagonal()) # cf. Part 10
+                return self.pdf
+            CacheKey = sf_cache_key('pdf', self.lt, len(self.t), self.dtype)
+            self.pdf = sf_cache_get(CacheKey)
+            if self.pdf is not None:
+                return self.pdf
             self.compute_sf() # computation of pdfs moved to this method: compute survival functions sf first, then calculate pdfs from sf.
             self.pdf   = np.zeros((len(self.t), len(self.t)))
+            self.pdf[1::,:] = -1 * np.diff(np.tril(self.sf), n=1, axis=0) # pdf(n,m) = sf(n-1,m) - sf(n,m) for all years n > m
             self.pdf[np.diag_indices(len(self.t))] = np.ones(len(self.t)) - self.sf.diagonal(0)
-            for m in range(0,len(self.t)):
-                self.pdf[np.arange(m+1,len(self.t)),m] = -1 * np.diff(self.sf[np.arange(m,len(self.t)),m])            
+            self.pdf = np.tril(self.pdf)
+            self.pdf = sf_cache_put(CacheKey, self.pdf)
             return self.pdf
         else:
             # pdf already exists
@@ -215,58 +623,141 @@ class DynamicStockModel(object):
         The method does nothing if the sf alreay exists. For example, sf could be assigned to the dynamic stock model from an exogenous computation to save time.
         """
         if self.sf is None:
-            self.sf = np.zeros((len(self.t), len(self.t)))
-            # Perform specific computations and checks for each lifetime distribution:
-
-            if self.lt['Type'] == 'Fixed': # fixed lifetime, age-cohort leaves the stock in the model year when the age specified as 'Mean' is reached.
-                for m in range(0, len(self.t)):  # cohort index
-                    self.sf[m::,m] = np.multiply(1, (np.arange(0,len(self.t)-m) < self.lt['Mean'][m])) # converts bool to 0/1
-                # Example: if Lt is 3.5 years fixed, product will still be there after 0, 1, 2, and 3 years, gone after 4 years.
-
-            if self.lt['Type'] == 'Normal': # normally distributed lifetime with mean and standard deviation. Watch out for nonzero values 
-                # for negative ages, no correction or truncation done here. Cf. note below.
-                for m in range(0, len(self.t)):  # cohort index
-                    if self.lt['Mean'][m] != 0:  # For products with lifetime of 0, sf == 0
-                        self.sf[m::,m] = scipy.stats.norm.sf(np.arange(0,len(self.t)-m), loc=self.lt['Mean'][m], scale=self.lt['StdDev'][m])
-                        # NOTE: As normal distributions have nonzero pdf for negative ages, which are physically impossible, 
-                        # these outflow contributions can either be ignored (violates the mass balance) or
-                        # allocated to the zeroth year of residence, the latter being implemented in the method compute compute_o_c_from_s_c.
-                        # As alternative, use lognormal or folded normal distribution options.
-                        
-            if self.lt['Type'] == 'FoldedNormal': # Folded normal distribution, cf. https://en.wikipedia.org/wiki/Folded_normal_distribution
-                for m in range(0, len(self.t)):  # cohort index
-                    if self.lt['Mean'][m] != 0:  # For products with lifetime of 0, sf == 0
-                        self.sf[m::,m] = scipy.stats.foldnorm.sf(np.arange(0,len(self.t)-m), self.lt['Mean'][m]/self.lt['StdDev'][m], 0, scale=self.lt['StdDev'][m])
-                        # NOTE: call this option with the parameters of the normal distribution mu and sigma of curve BEFORE folding,
-                        # curve after folding will have different mu and sigma.
-                        
-            if self.lt['Type'] == 'LogNormal': # lognormal distribution
-                # Here, the mean and stddev of the lognormal curve, 
-                # not those of the underlying normal distribution, need to be specified! conversion of parameters done here:
-                for m in range(0, len(self.t)):  # cohort index
-                    if self.lt['Mean'][m] != 0:  # For products with lifetime of 0, sf == 0
-                        # calculate parameter mu    of underlying normal distribution:
-                        LT_LN = np.log(self.lt['Mean'][m] / np.sqrt(1 + self.lt['Mean'][m] * self.lt['Mean'][m] / (self.lt['StdDev'][m] * self.lt['StdDev'][m]))) 
-                        # calculate parameter sigma of underlying normal distribution:
-                        SG_LN = np.sqrt(np.log(1 + self.lt['Mean'][m] * self.lt['Mean'][m] / (self.lt['StdDev'][m] * self.lt['StdDev'][m])))
-                        # compute survial function
-                        self.sf[m::,m] = scipy.stats.lognorm.sf(np.arange(0,len(self.t)-m), s=SG_LN, loc = 0, scale=np.exp(LT_LN)) 
-                        # values chosen according to description on
-                        # https://docs.scipy.org/doc/scipy-0.13.0/reference/generated/scipy.stats.lognorm.html
-                        # Same result as EXCEL function "=LOGNORM.VERT(x;LT_LN;SG_LN;TRUE)"
-                        
-            if self.lt['Type'] == 'Weibull': # Weibull distribution with standard definition of scale and shape parameters
-                for m in range(0, len(self.t)):  # cohort index
-                    if self.lt['Shape'][m] != 0:  # For products with lifetime of 0, sf == 0
-                        self.sf[m::,m] = scipy.stats.weibull_min.sf(np.arange(0,len(self.t)-m), c=self.lt['Shape'][m], loc = 0, scale=self.lt['Scale'][m])
-
+            if self.sparse_threshold is not None: # Store sf as sparse matrix if it has few nonzero entries, cf. Part 10.
+                Band_Existed = self.sf_band is not None
+                self.compute_sf_band()
+                if np.count_nonzero(self.sf_band) < self.sparse_threshold * len(self.t)**2:
+                    self.sf = band_to_sparse(self.sf_band)
+                    return self.sf
+                if Band_Existed is False:
+                    self.sf_band = None
+            CacheKey = sf_cache_key('sf', self.lt, len(self.t), self.dtype)
+            self.sf = sf_cache_get(CacheKey)
+            if self.sf is not None:
+                return self.sf
+            
+            if self.check_lt_time_invariant() is True:
+                # All cohorts share the same lifetime parameters: evaluate the survival curve once over ages 0...T-1
+                # and fill the lower triangle of sf with it, sf(m,n) = SF_Age(m-n) (Toeplitz structure).
+                SF_Age = self.compute_sf_age(np.arange(0,len(self.t)), 0)
+                self.sf = scipy.linalg.toeplitz(SF_Age, np.zeros(len(self.t)))
+            else:
+                self.sf = np.zeros((len(self.t), len(self.t)))
+                if self.lt['Type'] in LT_PARAMETERS:
+                    # Cohort-dependent lifetime: evaluate the scipy distribution once on the year-by-cohort grid of ages,
+                    # with the lifetime parameters broadcast along the cohort dimension.
+                    Age = np.subtract.outer(np.arange(0,len(self.t)), np.arange(0,len(self.t))) # Age[m,n] = m-n
+                    Cohorts = np.nonzero(self.compute_lt_nonzero())[0] # For products with lifetime of 0, sf == 0
+                    self.sf[:,Cohorts] = self.compute_sf_age(Age[:,Cohorts], Cohorts)
+                    # Mask upper triangle (negative ages): cohorts cannot be present before they enter the stock.
+                    self.sf = np.tril(self.sf)
+                    # NOTE: As normal distributions have nonzero pdf for negative ages, which are physically impossible, 
+                    # these outflow contributions can either be ignored (violates the mass balance) or
+                    # allocated to the zeroth year of residence, the latter being implemented in the method compute compute_o_c_from_s_c.
+                    # As alternative, use lognormal or folded normal distribution options.
 
+            self.sf = sf_cache_put(CacheKey, self.sf)
             return self.sf
         else:
             # sf already exists
             return self.sf
         
 
+    def check_lt_time_invariant(self):
+        """ Check whether the parameters of the lifetime distribution are the same for all age-cohorts.
+        In that case, the survival function only depends on the age m-n and not on the cohort n itself."""
+        try:
+            for ThisKey in LT_PARAMETERS[self.lt['Type']]:
+                LT_Par = np.asarray(self.lt[ThisKey])
+                if LT_Par.ndim > 0 and np.any(LT_Par != LT_Par.flat[0]):
+                    return False
+            return True
+        except:
+            return False # Unknown lifetime type or missing parameters, use cohort-by-cohort computation.
+        
+    def compute_sf_row(self, t):
+        """ Return row t of the survival table, sf[t,:], without computing the full table if it does not exist yet."""
+        if scipy.sparse.issparse(self.sf):
+            return sparse_row(self.sf, t)
+        if self.sf is not None:
+            return self.sf[t,:]
+        SF_Row = np.zeros(len(self.t))
+        if self.check_lt_time_invariant() is True:
+            SF_Row[0:t+1] = self.compute_sf_age_invariant()[t::-1]
+        else:
+            Cohorts = np.nonzero(self.compute_lt_nonzero()[0:t+1])[0] # For products with lifetime of 0, sf == 0
+            SF_Row[Cohorts] = self.compute_sf_age(t - Cohorts, Cohorts)
+        return SF_Row
+    
+    def compute_sf_column(self, c):
+        """ Return column c of the survival table, sf[:,c], without computing the full table if it does not exist yet."""
+        if self.sf is not None:
+            return self.sf[:,c]
+        SF_Column = np.zeros(len(self.t))
+        if self.check_lt_time_invariant() is True:
+            SF_Column[c::] = self.compute_sf_age_invariant()[0:len(self.t)-c]
+        elif self.compute_lt_nonzero()[c]: # For products with lifetime of 0, sf == 0
+            SF_Column[c::] = self.compute_sf_age(np.arange(0,len(self.t)-c), c)
+        return SF_Column
+    
+    def compute_sf_age_invariant(self):
+        """ Survival function over ages 0...T-1 for a time-invariant lifetime, taken from the process-wide cache if available."""
+        CacheKey = sf_cache_key('sf_age', self.lt, len(self.t))
+        SF_Age = sf_cache_get(CacheKey)
+        if SF_Age is None:
+            SF_Age = sf_cache_put(CacheKey, np.asarray(self.compute_sf_age(np.arange(0,len(self.t)), 0), dtype=float))
+        return SF_Age
+        
+    def compute_lt_nonzero(self):
+        """ Return a boolean vector that is True for all age-cohorts with a lifetime larger than 0."""
+        if self.lt['Type'] == 'Weibull':
+            return np.asarray(self.lt['Shape']) != 0
+        else:
+            return np.asarray(self.lt['Mean']) != 0
+        
+    def compute_sf_age(self, Age, Cohort, Method = 'sf'):
+        """
+        Evaluate the survival function of the lifetime distribution of age-cohort(s) Cohort at the age(s) Age.
+        Age and Cohort can be scalars or arrays of the same or of broadcastable shape.
+        For lifetimes 0 the sf is 0, meaning that the age-cohort leaves during the same year of the inflow.
+        With Method = 'isf', the inverse survival function is evaluated instead, i.e., Age is a surviving share 
+        and the age at which this share is reached is returned (not available for the 'Fixed' lifetime).
+        """
+        if self.lt['Type'] == 'Fixed': # Example: if Lt is 3.5 years fixed, product will still be there after 0, 1, 2, and 3 years, gone after 4 years.
+            return np.multiply(1.0, (Age < np.asarray(self.lt['Mean'])[Cohort])) # converts bool to 0/1
+        
+        if self.lt['Type'] == 'Weibull':
+            Shape = np.asarray(self.lt['Shape'])[Cohort]
+            Scale = np.asarray(self.lt['Scale'])[Cohort]
+            if np.all(Shape == 0): # For products with lifetime of 0, sf == 0
+                return np.zeros(np.broadcast(Age, Shape).shape)
+            return getattr(scipy.stats.weibull_min, Method)(Age, c=Shape, loc = 0, scale=Scale)
+        
+        Mean   = np.asarray(self.lt['Mean'])[Cohort]
+        StdDev = np.asarray(self.lt['StdDev'])[Cohort]
+        if np.all(Mean == 0): # For products with lifetime of 0, sf == 0
+            return np.zeros(np.broadcast(Age, Mean).shape)
+        
+        if self.lt['Type'] == 'Normal':
+            return getattr(scipy.stats.norm, Method)(Age, loc=Mean, scale=StdDev)
+        
+        if self.lt['Type'] == 'FoldedNormal': # Folded normal distribution, cf. https://en.wikipedia.org/wiki/Folded_normal_distribution
+            # NOTE: call this option with the parameters of the normal distribution mu and sigma of curve BEFORE folding,
+            # curve after folding will have different mu and sigma.
+            return getattr(scipy.stats.foldnorm, Method)(Age, Mean/StdDev, 0, scale=StdDev)
+        
+        if self.lt['Type'] == 'LogNormal':
+            # Here, the mean and stddev of the lognormal curve, 
+            # not those of the underlying normal distribution, need to be specified! conversion of parameters done here,
+            # for all cohorts at once:
+            LT_LN = np.log(Mean / np.sqrt(1 + Mean * Mean / (StdDev * StdDev))) # parameter mu    of underlying normal distribution
+            SG_LN = np.sqrt(np.log(1 + Mean * Mean / (StdDev * StdDev)))        # parameter sigma of underlying normal distribution
+            return getattr(scipy.stats.lognorm, Method)(Age, s=SG_LN, loc = 0, scale=np.exp(LT_LN))
+            # values chosen according to description on
+            # https://docs.scipy.org/doc/scipy-0.13.0/reference/generated/scipy.stats.lognorm.html
+            # Same result as EXCEL function "=LOGNORM.VERT(x;LT_LN;SG_LN;TRUE)"
+        
+
     """
     Part 3: Inflow driven model
     Given: inflow, lifetime dist.
@@ -283,7 +774,14 @@ class DynamicStockModel(object):
         """
         if self.i is not None:
             if self.lt is not None:
+                if self.lazy is True: # Rows, columns, and totals of s_c are computed on demand.
+                    self.nic_factor = None
+                    self.s_c = LazyCohortTable(self, 's_c')
+                    return self.s_c
                 self.compute_sf()
+                if scipy.sparse.issparse(self.sf): # s_c[t,c] = i[c] * sf[t,c] for the nonzero entries of sf, cf. Part 10
+                    self.s_c = self.sf.multiply(np.asarray(self.i, dtype=float)).tocsr()
+                    return self.s_c
                 self.s_c = np.einsum('c,tc->tc', self.i, self.sf) # See numpy's np.einsum for documentation.
                 # This command means: s_c[t,c] = i[c] * sf[t,c] for all t, c
                 # from the perspective of the stock the inflow has the dimension age-cohort, 
@@ -300,6 +798,12 @@ class DynamicStockModel(object):
         """Compute outflow by cohort from stock by cohort."""
         if self.s_c is not None:
             if self.o_c is None:
+                if isinstance(self.s_c, LazyCohortTable):
+                    self.o_c = LazyCohortTable(self, 'o_c')
+                    return self.o_c
+                if scipy.sparse.issparse(self.s_c):
+                    self.o_c = sparse_outflow_by_cohort(self.s_c, self.i - self.s_c.diagonal())
+                    return self.o_c
                 self.o_c = np.zeros(self.s_c.shape)
                 self.o_c[1::,:] = -1 * np.diff(self.s_c,n=1,axis=0)
                 self.o_c[np.diag_indices(len(self.t))] = self.i - np.diag(self.s_c) # allow for outflow in year 0 already
@@ -311,22 +815,56 @@ class DynamicStockModel(object):
             # s_c does not exist. Doing nothing
             return None
 
+    def compute_inflow_driven_model(self, CohortDetail = False, Method = 'auto'):
+        """ With given inflow and lifetime distribution, the method determines the total stock and the total outflow.
+        For a time-invariant lifetime, stock and outflow are the discrete convolution of the inflow 
+        with the survival function and the pdf over age, respectively:
+        s[t] = sum_c i[c] * sf_age[t-c], o[t] = sum_c i[c] * pdf_age[t-c], and s_c and o_c are not built.
+        Method = 'direct', 'fft', or 'auto' (default) selects the convolution method, cf. scipy.signal.convolve.
+        For a lifetime that changes across age-cohorts, s is computed as sf @ i and o from the mass balance.
+        With CohortDetail = True, s_c and o_c are built as well, cf. compute_s_c_inflow_driven and compute_o_c_from_s_c.
+        """
+        if self.i is not None:
+            if self.lt is not None:
+                if CohortDetail is True:
+                    self.compute_s_c_inflow_driven()
+                    self.compute_o_c_from_s_c()
+                    self.s = self.s_c.sum(axis=1)
+                    self.o = self.o_c.sum(axis=1)
+                    return self.s, self.o
+                Inflow = np.asarray(self.i, dtype=float)
+                if self.sf is None and self.check_lt_time_invariant() is True:
+                    SF_Age  = self.compute_sf_age_invariant()
+                    PDF_Age = -1 * np.diff(SF_Age, prepend=1) # share of age-cohort leaving the stock at age a
+                    self.s = scipy.signal.convolve(Inflow, SF_Age,  mode='full', method=Method)[0:len(self.t)]
+                    self.o = scipy.signal.convolve(Inflow, PDF_Age, mode='full', method=Method)[0:len(self.t)]
+                else:
+                    self.compute_sf()
+                    self.s = self.sf.dot(Inflow)
+                    self.o = Inflow - np.diff(self.s, prepend=0) # outflow from mass balance
+                return self.s, self.o
+            else:
+                # No lifetime distribution specified
+                return None, None
+        else:
+            # No inflow specified
+            return None, None
+
     def compute_i_from_s(self, InitialStock):
         """Given a stock at t0 broken down by different cohorts tx ... t0, an "initial stock". 
            This method calculates the original inflow that generated this stock.
+           InitialStock can also be a 2D array segments x age-cohorts, e.g., one initial stock per product type,
+           then the inflow is determined for all segments at once and has the same shape.
            Example: 
         """
         if self.i is None: # only in cases where no inflow has been specified.
-            if len(InitialStock) == len(self.t):
-                self.i = np.zeros(len(self.t))
+            InitialStock = np.asarray(InitialStock, dtype=float)
+            if InitialStock.shape[-1] == len(self.t):
                 # construct the sf of a product of cohort tc surviving year t 
                 # using the lifetime distributions of the past age-cohorts
                 self.compute_sf()
-                for Cohort in range(0, len(self.t)):
-                    if self.sf[-1,Cohort] != 0:
-                        self.i[Cohort] = InitialStock[Cohort] / self.sf[-1,Cohort]
-                    else:
-                        self.i[Cohort] = 0  # Not possible with given lifetime distribution
+                # inflow is 0 where the initial stock is not possible with given lifetime distribution (sf == 0)
+                self.i = np.divide(InitialStock, self.sf[-1,:], out=np.zeros(InitialStock.shape), where=self.sf[-1,:] != 0)
                 return self.i
             else:
                 # The length of t and InitialStock needs to be equal
@@ -341,15 +879,20 @@ class DynamicStockModel(object):
         This method then computes the future stock and outflow from the year SwitchTime onwards.
         Only future years, i.e., years after SwitchTime, are computed.
         NOTE: This method ignores and deletes previously calculated s_c and o_c.
-        The InitialStock is a vector of the age-cohort composition of the stock at SwitchTime, with length SwitchTime"""
+        The InitialStock is a vector of the age-cohort composition of the stock at SwitchTime, with length SwitchTime.
+        InitialStock can also be a 2D array segments x age-cohorts, e.g., one initial stock per product type with the same lifetime,
+        then all segments are computed at once, and s_c and o_c have the shape segments x time x age-cohort.
+        Age-cohorts with sf == 0 in SwitchTime are not possible with given lifetime distribution and remain 0."""
         if self.lt is not None:
-            self.s_c = np.zeros((len(self.t), len(self.t)))
-            self.o_c = np.zeros((len(self.t), len(self.t)))
+            InitialStock = np.asarray(InitialStock, dtype=float)
+            self.s_c = np.zeros(InitialStock.shape[0:-1] + (len(self.t), len(self.t)))
+            self.o_c = np.zeros(InitialStock.shape[0:-1] + (len(self.t), len(self.t)))
             self.compute_sf()
-            # Extract and renormalize array describing fate of initialstock:
-            Shares_Left = self.sf[SwitchTime,0:SwitchTime].copy()
-            self.s_c[SwitchTime,0:SwitchTime] = InitialStock # Add initial stock to s_c
-            self.s_c[SwitchTime::,0:SwitchTime] = np.tile(InitialStock.transpose(),(len(self.t)-SwitchTime,1)) * self.sf[SwitchTime::,0:SwitchTime] / np.tile(Shares_Left,(len(self.t)-SwitchTime,1))
+            # Extract and renormalize array describing fate of initialstock: 
+            # s_c[t,c] = InitialStock[c] * sf[t,c] / sf[SwitchTime,c] for t >= SwitchTime, broadcast over years and segments.
+            Shares_Left = self.sf[SwitchTime,0:SwitchTime]
+            np.divide(InitialStock[...,np.newaxis,:] * self.sf[SwitchTime::,0:SwitchTime], Shares_Left, 
+                      out=self.s_c[...,SwitchTime::,0:SwitchTime], where=Shares_Left != 0)
         return self.s_c
     
     
@@ -364,23 +907,49 @@ class DynamicStockModel(object):
     4) check mass balance.
     """
 
-    def compute_stock_driven_model(self, NegativeInflowCorrect = False):
+    def compute_stock_driven_model(self, NegativeInflowCorrect = False, Solver = 'Loop'):
         """ With given total stock and lifetime distribution, 
             the method builds the stock by cohort and the inflow.
+            In lazy mode, only the inflow is computed, and s_c and o_c are returned as LazyCohortTable.
+            Solver = 'Loop' (default) determines the inflow year by year.
+            Solver = 'Triangular' determines the inflow in one step as solution of the lower-triangular system sf @ i = s,
+            and builds stock and outflow by cohort from it. This option is only available without NegativeInflowCorrect,
+            with NegativeInflowCorrect = True the year-by-year computation is always used.
         """
         if self.s is not None:
             if self.lt is not None:
+                if self.sparse_threshold is not None and self.lazy is False and scipy.sparse.issparse(self.compute_sf()):
+                    # sparse survival table: year-by-year computation with the rows of sf, s_c and o_c are built as sparse matrices, cf. Part 10
+                    self.i = np.zeros(len(self.t))
+                    if self.sf[0, 0] != 0: # Else, inflow is 0.
+                        self.i[0] = self.s[0] / self.sf[0, 0]
+                    return self.compute_negative_inflow_correct(1, NegativeInflowCorrect)
+                self.i = np.zeros(len(self.t))
+                if self.lazy is True: # year-by-year computation with survival function rows computed on demand, s_c and o_c are not stored.
+                    self.s_c, self.o_c = None, None
+                    if self.compute_sf_row(0)[0] != 0: # Else, inflow is 0.
+                        self.i[0] = self.s[0] / self.compute_sf_row(0)[0]
+                    return self.compute_negative_inflow_correct(1, NegativeInflowCorrect)
                 self.s_c = np.zeros((len(self.t), len(self.t)))
                 self.o_c = np.zeros((len(self.t), len(self.t)))
-                self.i = np.zeros(len(self.t))
                 # construct the sf of a product of cohort tc remaining in the stock in year t
                 self.compute_sf() # Computes sf if not present already.
-                if NegativeInflowCorrect is True: # if the stock declines faster than according to the lifetime model, this option allows to extract additional stock items.
-                    # This part was contributed by Sebastiaan Deetman, CML Leiden, and adapted by S.P. so that the mass balance of the stock fits.
-                   self.compute_outflow_pdf() # Determine pdf from sf array for computations below.                
+                if NegativeInflowCorrect is False and Solver == 'Triangular':
+                    self.i = self.compute_i_triangular_solve()
+                    self.s_c = np.einsum('c,tc->tc', self.i, self.sf) # s_c[t,c] = i[c] * sf[t,c]
+                    self.o_c[1::,:] = -1 * np.diff(self.s_c, n=1, axis=0) # outflow from previous age-cohorts
+                    self.o_c = np.tril(self.o_c)
+                    self.o_c[np.diag_indices(len(self.t))] = self.i * (1 - self.sf.diagonal(0)) # outflow during first year
+                    return self.s_c, self.o_c, self.i
                 # First year:
                 if self.sf[0, 0] != 0: # Else, inflow is 0.
                     self.i[0] = self.s[0] / self.sf[0, 0]
+                if NegativeInflowCorrect is True: # if the stock declines faster than according to the lifetime model, this option allows to extract additional stock items.
+                    # This part was contributed by Sebastiaan Deetman, CML Leiden, and adapted by S.P. so that the mass balance of the stock fits.
+                    self.compute_outflow_pdf() # Determine pdf from sf array.
+                    return self.compute_negative_inflow_correct(1)
+                if self.backend != 'numpy': # compiled year-by-year computation
+                    return self.compute_negative_inflow_correct(1, NegativeInflowCorrect = False)
                 self.s_c[:, 0] = self.i[0] * self.sf[:, 0] # Future decay of age-cohort of year 0.
                 self.o_c[0, 0] = self.i[0] - self.s_c[0, 0]
                 # all other years:
@@ -388,39 +957,11 @@ class DynamicStockModel(object):
                     # 1) Compute outflow from previous age-cohorts up to m-1
                     self.o_c[m, 0:m] = self.s_c[m-1, 0:m] - self.s_c[m, 0:m] # outflow table is filled row-wise, for each year m.
                     # 2) Determine inflow from mass balance:
-                    if NegativeInflowCorrect is False: # if no correction for negative inflows is made 
-                        if self.sf[m,m] != 0: # Else, inflow is 0.
-                            self.i[m] = (self.s[m] - self.s_c[m, :].sum()) / self.sf[m,m] # allow for outflow during first year by rescaling with 1/sf[m,m]
-                        # 3) Add new inflow to stock and determine future decay of new age-cohort
-                        self.s_c[m::, m] = self.i[m] * self.sf[m::, m]
-                        self.o_c[m, m]   = self.i[m] * (1 - self.sf[m, m])
-                    # 2a) Correct remaining stock in cases where inflow would be negative:
-                    if NegativeInflowCorrect is True: # if the stock declines faster than according to the lifetime model, this option allows to extract additional stock items.
-                        # The negative inflow correction implemented here was developed in a joined effort by Sebastiaan Deetman and Stefan Pauliuk.
-                        InflowTest = self.s[m] - self.s_c[m, :].sum()
-                        if InflowTest < 0: # if stock-driven model would yield negative inflow
-                            Delta = -1 * InflowTest # Delta > 0!
-                            self.i[m] = 0 # Set inflow to 0 and distribute mass balance gap onto remaining cohorts:
-                            if self.s_c[m,:].sum() != 0:
-                                Delta_percent = Delta / self.s_c[m,:].sum() 
-                                # Distribute gap equally across all cohorts (each cohort is adjusted by the same %, based on surplus with regards to the prescribed stock)
-                                # Delta_percent is a % value <= 100%
-                            else:
-                                Delta_percent = 0 # stock in this year is already zero, method does not work in this case.
-                            # correct for outflow and stock in current and future years
-                            # adjust the entire stock AFTER year m as well, stock is lowered in year m, so future cohort survival also needs to decrease.
-                            self.o_c[m, :] = self.o_c[m, :] + (self.s_c[m, :] * Delta_percent).copy()  # increase outflow according to the lost fraction of the stock, based on Delta_c
-                            self.s_c[m::,0:m] = self.s_c[m::,0:m] * (1-Delta_percent.copy()) # shrink future description of stock from previous age-cohorts by factor Delta_percent in current AND future years.
-                        else: # If no negative inflow would occur
-                            if self.sf[m,m] != 0: # Else, inflow is 0.
-                                self.i[m] = (self.s[m] - self.s_c[m, :].sum()) / self.sf[m,m] # allow for outflow during first year by rescaling with 1/sf[m,m]    
-                            # Add new inflow to stock and determine future decay of new age-cohort
-                            self.s_c[m::, m] = self.i[m] * self.sf[m::, m]
-                            self.o_c[m, m]   = self.i[m] * (1 - self.sf[m, m])                                
-                        # NOTE: This method of negative inflow correction is only of of many plausible methods of increasing the outflow to keep matching stock levels.
-                        # It assumes that the surplus stock is removed in the year that it becomes obsolete. Each cohort loses the same fraction.
-                        # Modellers need to try out whether this method leads to justifiable results.
-                        # In some situations it is better to change the lifetime assumption than using the NegativeInflowCorrect option.
+                    if self.sf[m,m] != 0: # Else, inflow is 0.
+                        self.i[m] = (self.s[m] - self.s_c[m, :].sum(dtype=np.float64)) / self.sf[m,m] # allow for outflow during first year by rescaling with 1/sf[m,m]
+                    # 3) Add new inflow to stock and determine future decay of new age-cohort
+                    self.s_c[m::, m] = self.i[m] * self.sf[m::, m]
+                    self.o_c[m, m]   = self.i[m] * (1 - self.sf[m, m])
                     
                 return self.s_c, self.o_c, self.i
             else:
@@ -431,6 +972,89 @@ class DynamicStockModel(object):
             return None, None, None
         
 
+    def compute_negative_inflow_correct(self, FirstYear, NegativeInflowCorrect = True):
+        """ Year-by-year stock-driven model with negative inflow correction, starting in year FirstYear.
+        The inflows of the age-cohorts before FirstYear must be given in self.i already.
+        If the stock of the previous age-cohorts in year m exceeds the prescribed stock s[m], the inflow is set to 0 
+        and all previous age-cohorts lose the same share Delta_percent of their stock in year m, which also lowers their stock in all future years.
+        Instead of rescaling the remaining block of the stock-by-cohort table in each such year, 
+        the method keeps the cumulative product of the factors (1 - Delta_percent) and applies it when s_c is built at the end:
+        s_c[t,c] = i[c] * sf[t,c] * (1 - Delta_percent[c+1]) * ... * (1 - Delta_percent[t]). 
+        This reduces the effort from O(T^3) to O(T^2).
+        The outflow by cohort follows from the stock by cohort by mass balance.
+        The negative inflow correction implemented here was developed in a joined effort by Sebastiaan Deetman and Stefan Pauliuk.
+        With NegativeInflowCorrect = False, the same year-by-year computation is done without correction.
+        The survival function is read row by row, cf. compute_sf_row, so that the method also works in lazy mode without the full sf table.
+        In lazy mode, s_c and o_c are returned as LazyCohortTable.
+        """
+        Factor = np.ones(len(self.t))   # remaining share of the stock of previous age-cohorts after the correction in year m, 1 - Delta_percent
+        Weight = np.zeros(len(self.t))  # inflow by cohort divided by the cumulative correction factor until the inflow year
+        Weight[0:FirstYear] = self.i[0:FirstYear]
+        CumFactor = 1.0                  # cumulative correction factor until current year
+        if self.backend != 'numpy' and self.lazy is False and not scipy.sparse.issparse(self.sf): # compiled year-by-year computation, same steps as below
+            get_kernel(kernel_stock_driven, self.backend)(np.asarray(self.s, dtype=float), self.sf, self.i, Factor, FirstYear, NegativeInflowCorrect)
+        else:
+            for m in range(FirstYear, len(self.t)):  # for all years m, starting at FirstYear
+                SF_Row = self.compute_sf_row(m)
+                # stock of previous age-cohorts at the end of year m, before correction:
+                StockPrev = CumFactor * Weight[0:m].dot(SF_Row[0:m])
+                InflowTest = self.s[m] - StockPrev
+                if NegativeInflowCorrect is True and InflowTest < 0: # if stock-driven model would yield negative inflow
+                    Delta = -1 * InflowTest # Delta > 0!
+                    self.i[m] = 0 # Set inflow to 0 and distribute mass balance gap onto remaining cohorts:
+                    if StockPrev != 0:
+                        Delta_percent = Delta / StockPrev
+                        # Distribute gap equally across all cohorts (each cohort is adjusted by the same %, based on surplus with regards to the prescribed stock)
+                        # Delta_percent is a % value <= 100%
+                    else:
+                        Delta_percent = 0 # stock in this year is already zero, method does not work in this case.
+                    Factor[m] = 1 - Delta_percent
+                    CumFactor = CumFactor * Factor[m]
+                    if CumFactor < 1e-100: # Move cumulative factor into the weights before it underflows or reaches zero.
+                        Weight[0:m] = Weight[0:m] * CumFactor
+                        CumFactor = 1.0
+                else: # If no negative inflow would occur
+                    if SF_Row[m] != 0: # Else, inflow is 0.
+                        self.i[m] = InflowTest / SF_Row[m] # allow for outflow during first year by rescaling with 1/sf[m,m]
+                    Weight[m] = self.i[m] / CumFactor
+                # NOTE: This method of negative inflow correction is only of of many plausible methods of increasing the outflow to keep matching stock levels.
+                # It assumes that the surplus stock is removed in the year that it becomes obsolete. Each cohort loses the same fraction.
+                # Modellers need to try out whether this method leads to justifiable results.
+                # In some situations it is better to change the lifetime assumption than using the NegativeInflowCorrect option.
+        
+        self.nic_factor = Factor
+        if self.lazy is True:
+            self.s_c = LazyCohortTable(self, 's_c')
+            self.o_c = LazyCohortTable(self, 'o_c')
+            return self.s_c, self.o_c, self.i
+        if scipy.sparse.issparse(self.sf):
+            return self.compute_negative_inflow_correct_sparse(Factor)
+        # Build stock by cohort: apply product of correction factors of all years after the inflow year, Scale[t,c] = Factor[c+1] * ... * Factor[t]
+        self.s_c = np.einsum('c,tc->tc', self.i, self.sf)
+        if (Factor != 1).any():
+            Scale = np.tril(np.tile(Factor[:,np.newaxis], (1, len(self.t))), -1) + np.triu(np.ones((len(self.t), len(self.t))))
+            self.s_c = self.s_c * np.cumprod(Scale, axis=0)
+        # Outflow by cohort from mass balance: all stock lost by previous age-cohorts, plus outflow of new inflow during first year
+        self.o_c = np.zeros((len(self.t), len(self.t)))
+        self.o_c[1::,:] = -1 * np.diff(self.s_c, n=1, axis=0)
+        self.o_c = np.tril(self.o_c)
+        self.o_c[np.diag_indices(len(self.t))] = self.i * (1 - self.sf.diagonal(0))
+        return self.s_c, self.o_c, self.i
+    
+    def compute_i_triangular_solve(self):
+        """ Determine the inflow of the stock-driven model without negative inflow correction in one step.
+        The stock in year m is the sum of the surviving inflows of all cohorts up to m: s[m] = sum_c sf[m,c] * i[c],
+        i.e., the inflow is the solution of the lower-triangular linear system sf @ i = s.
+        Cohorts with sf[m,m] == 0 leave the stock in the year of the inflow, their inflow is set to 0, as in the year-by-year computation.
+        """
+        i = np.zeros(len(self.t))
+        Nonzero = self.sf.diagonal(0) != 0 # Else, inflow is 0.
+        if Nonzero.all():
+            i = scipy.linalg.solve_triangular(self.sf, np.asarray(self.s, dtype=float), lower=True)
+        else:
+            i[Nonzero] = scipy.linalg.solve_triangular(self.sf[np.ix_(Nonzero,Nonzero)], np.asarray(self.s, dtype=float)[Nonzero], lower=True)
+        return i
+
     def compute_stock_driven_model_initialstock(self,InitialStock,SwitchTime,NegativeInflowCorrect = False):
         """ With given total stock and lifetime distribution, the method builds the stock by cohort and the inflow.
         The extra parameter InitialStock is a vector that contains the age structure of the stock at the END of the year Switchtime -1 = t0.
@@ -474,7 +1098,10 @@ class DynamicStockModel(object):
                     self.o_c[m, m]    = self.i[m] * (1 - self.sf[m, m])
                     self.o_c[m+1::,m] = self.s_c[m:-1,m] - self.s_c[m+1::,m]
                 # for future: year-by-year computation, starting from SwitchTime
-                if NegativeInflowCorrect is False:
+                if NegativeInflowCorrect is False and self.backend != 'numpy':
+                    # compiled year-by-year computation, cf. compute_negative_inflow_correct
+                    self.compute_negative_inflow_correct(SwitchTime-1, NegativeInflowCorrect = False)
+                elif NegativeInflowCorrect is False:
                     for m in range(SwitchTime-1, len(self.t)):  # for all years m, starting at SwitchTime
                         # 1) Determine inflow from mass balance:
                         if self.sf[m,m] != 0: # Else, inflow is 0.
@@ -487,32 +1114,8 @@ class DynamicStockModel(object):
                         self.o_c[m, m]    = self.i[m] * (1 - self.sf[m, m])
                         self.o_c[m+1::,m] = self.s_c[m:-1,m] - self.s_c[m+1::,m]
                 if NegativeInflowCorrect is True:
-                    for m in range(SwitchTime-1, len(self.t)):  # for all years m, starting at SwitchTime
-                        self.o_c[m, 0:m] = self.s_c[m-1, 0:m] - self.s_c[m, 0:m] # outflow table is filled row-wise, for each year m.
-                        # 1) Determine text inflow from mass balance:
-                        InflowTest = self.s[m] - self.s_c[m, :].sum()
-                        if InflowTest < 0: 
-                            Delta = -1 * InflowTest # Delta > 0!
-                            self.i[m] = 0 # Set inflow to 0 and distribute mass balance gap onto remaining cohorts:
-                            if self.s_c[m,:].sum() != 0:
-                                Delta_percent = Delta / self.s_c[m,:].sum() 
-                                # Distribute gap equally across all cohorts (each cohort is adjusted by the same %, based on surplus with regards to the prescribed stock)
-                                # Delta_percent is a % value <= 100%
-                            else:
-                                Delta_percent = 0 # stock in this year is already zero, method does not work in this case.
-                            # correct for outflow and stock in current and future years
-                            # adjust the entire stock AFTER year m as well, stock is lowered in year m, so future cohort survival also needs to decrease.
-                            # print(InflowTest)
-                            # print((self.s_c[m, :] * Delta_percent).sum())
-                            # print('_')
-                            self.o_c[m, :] = self.o_c[m, :] + (self.s_c[m, :] * Delta_percent).copy()  # increase outflow according to the lost fraction of the stock, based on Delta_c
-                            self.s_c[m::,0:m] = self.s_c[m::,0:m] * (1-Delta_percent.copy()) # shrink future description of stock from previous age-cohorts by factor Delta_percent in current AND future years.
-                        else:
-                            if self.sf[m,m] != 0: # Else, inflow is 0.
-                                self.i[m] = (self.s[m] - self.s_c[m, :].sum()) / self.sf[m,m] # allow for outflow during first year by rescaling with 1/sf[m,m]
-                            # 2) Add new inflow to stock and determine future decay of new age-cohort
-                            self.s_c[m::, m]  = self.i[m] * self.sf[m::, m]
-                            self.o_c[m, m]    = self.i[m] * (1 - self.sf[m, m])
+                    # for all years m, starting at SwitchTime, cf. compute_negative_inflow_correct
+                    self.compute_negative_inflow_correct(SwitchTime-1)
                 # Add historic stock series to total stock s:
                 self.s[0:SwitchTime-1]= self.s_c[0:SwitchTime-1,:].sum(axis =1).copy()                    
                 return self.s_c, self.o_c, self.i
@@ -564,37 +1167,32 @@ class DynamicStockModel(object):
                 o_cg = np.zeros((Nt0,Ntt,Ng)) # outflow by future years, all cohorts and products
                 i_g  = np.zeros((Ntt,Ng))     # inflow by product
                 
-                # Construct historic inflows
-                for c in range(0,SwitchTime): # for all historic age-cohorts til SwitchTime - 1:
-                    for g in range(0,Ng):
-                        if SFArrayCombined[SwitchTime-1,c,g] != 0:
-                         i_g[c,g] = InitialStock[c,g] / SFArrayCombined[SwitchTime-1,c,g]
-                         
-                         # if InitialStock is 0, historic inflow also remains 0, 
-                         # as it has no impact on future anymore.
-                         
-                         # If survival function is 0 but initial stock is not, the data are inconsisent and need to be revised.
-                         # For example, a safety-relevant device with 5 years fixed lifetime but a 10 year old device is present.
-                         # Such items will be ignored and break the mass balance.
+                # Construct historic inflows, for all historic age-cohorts til SwitchTime - 1 and all product types:
+                i_g[0:SwitchTime,:] = self.compute_i_g_historic(InitialStock, SFArrayCombined, SwitchTime)
             
                 # year-by-year computation, starting from SwitchTime
-                for t in range(SwitchTime, Ntt):  # for all years t, starting at SwitchTime
-                    # 1) Compute stock at the end of the year:
-                    s_cg[t - SwitchTime,:,:] = np.einsum('cg,cg->cg',i_g,SFArrayCombined[t,:,:])
-                    # 2) Compute outflow during year t from previous age-cohorts:
-                    if t == SwitchTime:
-                        o_cg[t -SwitchTime,:,:] = InitialStock - s_cg[t -SwitchTime,:,:]
-                    else:
-                        o_cg[t -SwitchTime,:,:] = s_cg[t -SwitchTime -1,:,:] - s_cg[t -SwitchTime,:,:] # outflow table is filled row-wise, for each year t.
-                    # 3) Determine total inflow from mass balance:
-                    i0 = FutureStock[t -SwitchTime] - s_cg[t - SwitchTime,:,:].sum()
-                    # 4) Add new inflow to stock and determine future decay of new age-cohort
-                    i_g[t,:] = TypeSplit[t -SwitchTime,:] * i0
-                    for g in range(0,Ng): # Correct for share of inflow leaving during first year.
-                        if SFArrayCombined[t,t,g] != 0: # Else, inflow leaves within the same year and stock modelling is useless
-                            i_g[t,g] = i_g[t,g] / SFArrayCombined[t,t,g] # allow for outflow during first year by rescaling with 1/SF[t,t,g]
-                        s_cg[t -SwitchTime,t,g]  = i_g[t,g] * SFArrayCombined[t,t,g]
-                        o_cg[t -SwitchTime,t,g]  = i_g[t,g] * (1 - SFArrayCombined[t,t,g])
+                if self.backend != 'numpy': # compiled year-by-year computation, same steps as below
+                    get_kernel(kernel_typesplit_futurestock, self.backend)(np.asarray(FutureStock, dtype=float), np.asarray(InitialStock, dtype=float), 
+                                                                          SFArrayCombined, np.asarray(TypeSplit, dtype=float), s_cg, o_cg, i_g, SwitchTime)
+                else:
+                    for t in range(SwitchTime, Ntt):  # for all years t, starting at SwitchTime
+                        # 1) Compute stock at the end of the year:
+                        s_cg[t - SwitchTime,:,:] = np.einsum('cg,cg->cg',i_g,SFArrayCombined[t,:,:])
+                        # 2) Compute outflow during year t from previous age-cohorts:
+                        if t == SwitchTime:
+                            o_cg[t -SwitchTime,:,:] = InitialStock - s_cg[t -SwitchTime,:,:]
+                        else:
+                            o_cg[t -SwitchTime,:,:] = s_cg[t -SwitchTime -1,:,:] - s_cg[t -SwitchTime,:,:] # outflow table is filled row-wise, for each year t.
+                        # 3) Determine total inflow from mass balance:
+                        i0 = FutureStock[t -SwitchTime] - s_cg[t - SwitchTime,:,:].sum()
+                        # 4) Add new inflow to stock and determine future decay of new age-cohort
+                        i_g[t,:] = TypeSplit[t -SwitchTime,:] * i0
+                        # Correct for share of inflow leaving during first year, for all product types with SF[t,t,g] != 0. 
+                        # Else, inflow leaves within the same year and stock modelling is useless.
+                        Nonzero = SFArrayCombined[t,t,:] != 0
+                        i_g[t,Nonzero] = i_g[t,Nonzero] / SFArrayCombined[t,t,Nonzero] # allow for outflow during first year by rescaling with 1/SF[t,t,g]
+                        s_cg[t -SwitchTime,t,:]  = i_g[t,:] * SFArrayCombined[t,t,:]
+                        o_cg[t -SwitchTime,t,:]  = i_g[t,:] * (1 - SFArrayCombined[t,t,:])
                     
                 # Add total values of parameter to enable mass balance check:
                 self.s_c = s_cg.sum(axis =2)
@@ -663,47 +1261,34 @@ class DynamicStockModel(object):
                     # This part was contributed by Sebastiaan Deetman, CML Leiden, and adapted by S.P. so that the mass balance of the stock fits.
                    self.compute_outflow_pdf() # Determine pdf from sf array for computations below.                
                    
-                # Construct historic inflows
-                for c in range(0,SwitchTime): # for all historic age-cohorts til SwitchTime - 1:
-                    for g in range(0,Ng):
-                        if SFArrayCombined[SwitchTime-1,c,g] != 0:
-                            i_g[c,g] = InitialStock[c,g] / SFArrayCombined[SwitchTime-1,c,g]
-                         
-                         # if InitialStock is 0, historic inflow also remains 0, 
-                         # as it has no impact on future anymore.
-                         
-                         # If survival function is 0 but initial stock is not, the data are inconsisent and need to be revised.
-                         # For example, a safety-relevant device with 5 years fixed lifetime but a 10 year old device is present.
-                         # Such items will be ignored and break the mass balance.
+                # Construct historic inflows, for all historic age-cohorts til SwitchTime - 1 and all product types:
+                i_g[0:SwitchTime,:] = self.compute_i_g_historic(InitialStock, SFArrayCombined, SwitchTime)
                          
                 # Compute stocks from historic inflows
                 s_cg[:,0:SwitchTime,:] = np.einsum('tcg,cg->tcg',SFArrayCombined[:,0:SwitchTime,:],i_g[0:SwitchTime,:])
-                # calculate historic outflows
-                for m in range(0,SwitchTime):
-                    o_cg[m,m,:]      = i_g[m,:] * (1 - SFArrayCombined[m,m,:])
-                    o_cg[m+1::,m,:]  = s_cg[m:-1,m,:] - s_cg[m+1::,m,:]
+                # calculate historic outflows: outflow during first year, and stock lost by the historic age-cohorts in all later years
+                Hist = np.arange(0,SwitchTime)
+                o_cg[1::,0:SwitchTime,:]   = np.einsum('tcg,tc->tcg', s_cg[0:-1,0:SwitchTime,:] - s_cg[1::,0:SwitchTime,:], np.tri(Ntt-1, SwitchTime)) # only for years after the inflow year
+                o_cg[Hist,Hist,:]          = i_g[0:SwitchTime,:] * (1 - SFArrayCombined[Hist,Hist,:])
                 # add historic age-cohorts to total stock:
                 self.s[0:SwitchTime] = np.einsum('tcg->t',s_cg[0:SwitchTime,:,:])
                 
                 # for future: year-by-year computation, starting from SwitchTime
-                if NegativeInflowCorrect is False:
+                if self.backend != 'numpy': # compiled year-by-year computation, same steps as below
+                    get_kernel(kernel_typesplit, self.backend)(np.asarray(self.s, dtype=float), SFArrayCombined, np.asarray(TypeSplit, dtype=float), 
+                                                               s_cg, o_cg, i_g, NIC_Flags, SwitchTime, NegativeInflowCorrect)
+                elif NegativeInflowCorrect is False:
                     for m in range(SwitchTime, len(self.t)):  # for all years m, starting at SwitchTime
                         # 1) Determine inflow from mass balance:
                         i0_test = self.s[m] - s_cg[m,:,:].sum()
                         if i0_test < 0:
                             NIC_Flags[m] = i0_test
-                        for g in range(0,Ng):
-                            if SFArrayCombined[m,m,g] != 0: # Else, inflow is 0.
-                                i_g[m,g] = TypeSplit[m,g] * i0_test / SFArrayCombined[m,m,g] # allow for outflow during first year by rescaling with 1/sf[m,m]
-                                # NOTE: The stock-driven method may lead to negative inflows, if the stock development is in contradiction with the lifetime model.
-                                # In such situations the lifetime assumption must be changed, either by directly using different lifetime values or by adjusting the outlfows, 
-                                # cf. the option NegativeInflowCorrect in the method compute_stock_driven_model.
-                                # 2) Add new inflow to stock and determine future decay of new age-cohort
-                            s_cg[m::,m,g]   = i_g[m,g] * SFArrayCombined[m::,m,g]
-                            o_cg[m,m,g]     = i_g[m,g] * (1 - SFArrayCombined[m,m,g])
-                            o_cg[m+1::,m,g] = s_cg[m:-1,m,g] - s_cg[m+1::,m,g]
+                        self.compute_typesplit_new_cohort(m, i0_test, s_cg, o_cg, i_g, SFArrayCombined, TypeSplit)
+                        # NOTE: The stock-driven method may lead to negative inflows, if the stock development is in contradiction with the lifetime model.
+                        # In such situations the lifetime assumption must be changed, either by directly using different lifetime values or by adjusting the outlfows, 
+                        # cf. the option NegativeInflowCorrect in the method compute_stock_driven_model.
                             
-                if NegativeInflowCorrect is True:
+                elif NegativeInflowCorrect is True:
                     for m in range(SwitchTime, len(self.t)):  # for all years m, starting at SwitchTime
                         # 1) Determine inflow from mass balance:
                         i0_test = self.s[m] - s_cg[m,:,:].sum()
@@ -724,16 +1309,7 @@ class DynamicStockModel(object):
                             o_cg[m+1::,:,:] = s_cg[m:-1,:,:] - s_cg[m+1::,:,:]                         # recalculate future outflows
                         
                         else:       
-                            for g in range(0,Ng):
-                                if SFArrayCombined[m,m,g] != 0: # Else, inflow is 0.
-                                    i_g[m,g] = TypeSplit[m,g] * i0_test / SFArrayCombined[m,m,g] # allow for outflow during first year by rescaling with 1/sf[m,m]
-                                    # NOTE: The stock-driven method may lead to negative inflows, if the stock development is in contradiction with the lifetime model.
-                                    # In such situations the lifetime assumption must be changed, either by directly using different lifetime values or by adjusting the outlfows, 
-                                    # cf. the option NegativeInflowCorrect in the method compute_stock_driven_model.
-                                    # 2) Add new inflow to stock and determine future decay of new age-cohort
-                                s_cg[m::,m,g]   = i_g[m,g] * SFArrayCombined[m::,m,g]
-                                o_cg[m,m,g]     = i_g[m,g] * (1 - SFArrayCombined[m,m,g])
-                                o_cg[m+1::,m,g] = s_cg[m:-1,m,g] - s_cg[m+1::,m,g]    
+                            self.compute_typesplit_new_cohort(m, i0_test, s_cg, o_cg, i_g, SFArrayCombined, TypeSplit)
                                 
                 # Add total values of parameter to enable mass balance check:
                 self.s_c = s_cg.sum(axis =2)
@@ -748,7 +1324,782 @@ class DynamicStockModel(object):
         else:
             # No stock specified
             return None, None, None, None
-      
+
+    def compute_i_g_historic(self, InitialStock, SFArrayCombined, SwitchTime):
+        """ Reconstruct the inflow of the historic age-cohorts 0...SwitchTime-1 by product type from the initial stock:
+        i_g[c,g] = InitialStock[c,g] / SFArrayCombined[SwitchTime-1,c,g].
+        If InitialStock is 0, historic inflow also remains 0, as it has no impact on future anymore.
+        If the survival function is 0 but the initial stock is not, the data are inconsisent and need to be revised.
+        For example, a safety-relevant device with 5 years fixed lifetime but a 10 year old device is present.
+        Such items will be ignored (inflow 0) and break the mass balance.
+        """
+        SF_Hist = SFArrayCombined[SwitchTime-1,0:SwitchTime,:]
+        i_g_hist = np.zeros(SF_Hist.shape)
+        Nonzero = SF_Hist != 0
+        i_g_hist[Nonzero] = np.asarray(InitialStock)[0:SwitchTime,:][Nonzero] / SF_Hist[Nonzero]
+        return i_g_hist
+
+    def compute_typesplit_new_cohort(self, m, i0, s_cg, o_cg, i_g, SFArrayCombined, TypeSplit):
+        """ Split the total inflow i0 of year m into product types, and add the new age-cohort m to s_cg and o_cg, for all product types at once.
+        The inflow is rescaled with 1/sf[m,m,g] to allow for outflow during the first year, for product types with sf[m,m,g] == 0, the inflow is 0.
+        s_cg, o_cg, and i_g are changed in place.
+        """
+        Nonzero = SFArrayCombined[m,m,:] != 0 # Else, inflow is 0.
+        i_g[m,Nonzero]  = TypeSplit[m,Nonzero] * i0 / SFArrayCombined[m,m,Nonzero] # allow for outflow during first year by rescaling with 1/sf[m,m]
+        # Add new inflow to stock and determine future decay of new age-cohort
+        s_cg[m::,m,:]   = i_g[m,:] * SFArrayCombined[m::,m,:]
+        o_cg[m,m,:]     = i_g[m,:] * (1 - SFArrayCombined[m,m,:])
+        o_cg[m+1::,m,:] = s_cg[m:-1,m,:] - s_cg[m+1::,m,:]
+
+    """
+    Part 5: Banded storage of survival function and cohort tables
+    The cohort tables are stored as time x age (Band[t,a] = Dense[t,t-a]), and only ages 0...max_age are kept.
+    The survival function is treated as 0 for all ages above max_age, i.e., all remaining items of a cohort leave the stock at age max_age + 1.
+    Memory and computation time are O(T*A), with A = max_age + 1, instead of O(T^2).
+    Default order of methods:
+    1) compute_sf_band (called automatically)
+    2) compute_s_c_inflow_driven_band or compute_stock_driven_model_band
+    3) band_to_dense(self.s_c_band) if the dense year-by-cohort table is needed.
+    """
+    
+    def compute_max_age(self):
+        """ Determine the maximum age A-1 kept in the banded tables.
+        Either max_age is given, or the maximum age is the largest age of all cohorts where the survival function is still larger than sf_tol.
+        For Fixed lifetimes, this is the largest lifetime, also without sf_tol, which is exact.
+        Without either, all ages are kept. The maximum age is limited to T-1."""
+        if self.max_age is not None:
+            MaxAge = int(self.max_age)
+        elif self.sf_tol is not None or self.lt['Type'] == 'Fixed':
+            Cohorts = np.nonzero(self.compute_lt_nonzero())[0]
+            if len(Cohorts) == 0:
+                MaxAge = 0
+            elif self.lt['Type'] == 'Fixed':
+                MaxAge = int(np.ceil(np.asarray(self.lt['Mean'])[Cohorts].max())) - 1
+            else:
+                MaxAge = int(np.floor(np.max(self.compute_sf_age(self.sf_tol, Cohorts, Method = 'isf'))))
+        else:
+            MaxAge = len(self.t) - 1
+        return max(0, min(MaxAge, len(self.t) - 1))
+    
+    def compute_sf_band(self):
+        """ Survival function in banded layout: sf_band[t,a] is the share of the inflow of age-cohort t-a still present at the end of year t.
+        Same values as sf[t,t-a], but only ages 0...max_age are computed. The method does nothing if sf_band already exists."""
+        if self.sf_band is None:
+            NoofAges = self.compute_max_age() + 1
+            Cohort   = np.subtract.outer(np.arange(0,len(self.t)), np.arange(0,NoofAges)) # Cohort[t,a] = t-a
+            if self.sf is not None:
+                self.sf_band = dense_to_band(self.sf, NoofAges)
+            elif self.check_lt_time_invariant() is True:
+                self.sf_band = np.einsum('a,ta->ta', self.compute_sf_age(np.arange(0,NoofAges), 0), np.multiply(1.0, Cohort >= 0))
+            else:
+                self.sf_band = np.zeros((len(self.t), NoofAges))
+                Year, Age = np.nonzero(Cohort >= 0)
+                Nonzero = self.compute_lt_nonzero()[Cohort[Year, Age]] # For products with lifetime of 0, sf == 0
+                self.sf_band[Year[Nonzero], Age[Nonzero]] = self.compute_sf_age(Age[Nonzero], Cohort[Year[Nonzero], Age[Nonzero]])
+        return self.sf_band
+    
+    def compute_o_c_band_from_s_c_band(self):
+        """ Outflow by cohort in banded layout, time x age, with one more age than s_c_band: 
+        the last age column contains the remaining stock of the cohorts that exceed max_age. 
+        o_c_band[t,0] = i[t] * (1 - sf_band[t,0]), o_c_band[t,a] = s_c_band[t-1,a-1] - s_c_band[t,a]."""
+        NoofAges = self.s_c_band.shape[1]
+        self.o_c_band = np.zeros((len(self.t), NoofAges + 1))
+        self.o_c_band[:,0] = np.asarray(self.i, dtype=float) * (1 - self.sf_band[:,0])
+        self.o_c_band[1::,1:NoofAges] = self.s_c_band[0:-1,0:NoofAges-1] - self.s_c_band[1::,1::]
+        self.o_c_band[1::,NoofAges]   = self.s_c_band[0:-1,NoofAges-1]
+        return self.o_c_band
+    
+    def compute_s_c_inflow_driven_band(self):
+        """ With given inflow and lifetime distribution, the method builds the stock by cohort in banded layout, s_c_band[t,a] = i[t-a] * sf_band[t,a],
+        as well as outflow by cohort in banded layout, total stock, and total outflow."""
+        if self.i is not None:
+            if self.lt is not None:
+                self.compute_sf_band()
+                i = np.asarray(self.i, dtype=float)
+                Cohort = np.subtract.outer(np.arange(0,len(self.t)), np.arange(0,self.sf_band.shape[1]))
+                self.s_c_band = i[np.maximum(Cohort, 0)] * self.sf_band # sf_band is 0 for t-a < 0
+                self.compute_o_c_band_from_s_c_band()
+                self.s = self.s_c_band.sum(axis=1)
+                self.o = self.o_c_band.sum(axis=1)
+                return self.s_c_band
+            else:
+                # No lifetime distribution specified
+                return None
+        else:
+            # No inflow specified
+            return None
+    
+    def compute_stock_driven_model_band(self, NegativeInflowCorrect = False):
+        """ With given total stock and lifetime distribution, the method builds the stock by cohort and the outflow by cohort in banded layout, and the inflow.
+        Same method as compute_stock_driven_model, but only the last max_age + 1 age-cohorts enter the mass balance of year m. 
+        For NegativeInflowCorrect, cf. compute_negative_inflow_correct."""
+        if self.s is not None:
+            if self.lt is not None:
+                self.compute_sf_band()
+                NoofAges = self.sf_band.shape[1]
+                s = np.asarray(self.s, dtype=float)
+                self.i = np.zeros(len(self.t))
+                Factor = np.ones(len(self.t))   # remaining share of the stock of previous age-cohorts after negative inflow correction in year m
+                Weight = np.zeros(len(self.t))  # inflow by cohort divided by the cumulative correction factor until the inflow year
+                CumFactor = 1.0
+                for m in range(0, len(self.t)):
+                    Ages = np.arange(1, min(m + 1, NoofAges)) # ages of previous cohorts within the band
+                    StockPrev = CumFactor * Weight[m - Ages].dot(self.sf_band[m, Ages])
+                    InflowTest = s[m] - StockPrev
+                    if NegativeInflowCorrect is True and InflowTest < 0 and m > 0:
+                        self.i[m] = 0 # Set inflow to 0 and remove the same share from all previous age-cohorts
+                        Factor[m] = 1 - (-1 * InflowTest / StockPrev if StockPrev != 0 else 0)
+                        CumFactor = CumFactor * Factor[m]
+                        if CumFactor < 1e-100: # Move cumulative factor into the weights before it underflows or reaches zero.
+                            Weight[0:m] = Weight[0:m] * CumFactor
+                            CumFactor = 1.0
+                    else:
+                        if self.sf_band[m,0] != 0: # Else, inflow is 0.
+                            self.i[m] = InflowTest / self.sf_band[m,0] # allow for outflow during first year by rescaling with 1/sf[m,m]
+                        Weight[m] = self.i[m] / CumFactor
+                Cohort = np.subtract.outer(np.arange(0,len(self.t)), np.arange(0,NoofAges))
+                self.s_c_band = self.i[np.maximum(Cohort, 0)] * self.sf_band
+                if (Factor != 1).any():
+                    # Product of correction factors of all years after the inflow year: Scale[t,a] = Factor[t-a+1] * ... * Factor[t]
+                    FactorBand = np.ones((len(self.t), NoofAges))
+                    FactorBand[:,1::] = Factor[np.maximum(Cohort[:,1::] + 1, 0)]
+                    self.s_c_band = self.s_c_band * np.cumprod(FactorBand, axis=1)
+                self.compute_o_c_band_from_s_c_band()
+                self.o = self.o_c_band.sum(axis=1)
+                return self.s_c_band, self.o_c_band, self.i
+            else:
+                # No lifetime distribution specified
+                return None, None, None
+        else:
+            # No stock specified
+            return None, None, None
+
+    """
+    Part 6: Incremental extension of the stock-driven model
+    Given: a stock-driven model computed with compute_stock_driven_model, and the stock of one or more additional years.
+    The new years are appended to t, s, i, s_c, and o_c, using the inflow, the correction factors of the negative inflow correction,
+    and the survival function of the years already computed. The results are the same as for a full recomputation.
+    sf, s_c, and o_c are views of buffers with spare capacity, which are doubled when they are full (cf. grow_table),
+    so that the old blocks are not copied for every new year. The effort per new year is O(T), amortized over the appended years.
+    """
+
+    def append_years(self, s_new, NegativeInflowCorrect = False, t_new = None, lt_new = None):
+        """ Append the years with the stock s_new to the stock-driven model and determine their inflow, stock by cohort, and outflow by cohort.
+        t_new are the new years, by default the time vector is continued with its last time step.
+        lt_new contains the lifetime parameters of the new age-cohorts (scalar or one value per new year), 
+        by default the parameters of the last age-cohort are used.
+        Returns s_c, o_c, and i for all years, like compute_stock_driven_model.
+        """
+        s_new = np.atleast_1d(np.asarray(s_new, dtype=float))
+        NoofYears_Old = len(self.t)
+        NoofYears     = NoofYears_Old + len(s_new)
+        if t_new is None:
+            TimeStep = self.t[-1] - self.t[-2] if NoofYears_Old > 1 else 1
+            t_new = self.t[-1] + TimeStep * np.arange(1, len(s_new) + 1)
+        self.t = np.concatenate((self.t, t_new))
+        self.s = np.concatenate((np.asarray(self.s, dtype=float), s_new))
+        self.i = np.concatenate((np.asarray(self.i, dtype=float), np.zeros(len(s_new))))
+        self.append_lt(len(s_new), lt_new)
+        # Survival function rows of the new years. The old block of sf does not change.
+        SF_Old = self.sf
+        self.sf, self.pdf = None, None
+        self.sf_band, self.s_c_band, self.o_c_band = None, None, None
+        SF_New = np.zeros((len(s_new), NoofYears))
+        Scale  = np.ones((len(s_new), NoofYears)) # Scale[t,c] = Factor[c+1] * ... * Factor[t]
+        Factor = np.ones(NoofYears)
+        if self.nic_factor is not None:
+            Factor[0:NoofYears_Old] = self.nic_factor
+        for m in range(NoofYears_Old, NoofYears):  # for all new years m
+            SF_New[m - NoofYears_Old,:] = self.compute_sf_row(m)
+            Scale[m - NoofYears_Old, 0:m-1] = np.cumprod(Factor[m-1:0:-1])[::-1] # correction factors of the years before m
+            # stock of previous age-cohorts at the end of year m, before correction:
+            StockPrev = (self.i[0:m] * SF_New[m - NoofYears_Old, 0:m] * Scale[m - NoofYears_Old, 0:m]).sum()
+            InflowTest = self.s[m] - StockPrev
+            if NegativeInflowCorrect is True and InflowTest < 0: # cf. compute_negative_inflow_correct
+                if StockPrev != 0:
+                    Factor[m] = 1 - (-1 * InflowTest) / StockPrev
+                Scale[m - NoofYears_Old, 0:m] = Scale[m - NoofYears_Old, 0:m] * Factor[m]
+            elif SF_New[m - NoofYears_Old, m] != 0: # Else, inflow is 0.
+                self.i[m] = InflowTest / SF_New[m - NoofYears_Old, m] # allow for outflow during first year by rescaling with 1/sf[m,m]
+        if self.nic_factor is not None or NegativeInflowCorrect is True:
+            self.nic_factor = Factor
+        if self.o is not None: # total outflow from mass balance
+            self.o = np.concatenate((self.o, self.i[NoofYears_Old::] - np.diff(self.s[NoofYears_Old-1::])))
+        if self.lazy is True:
+            self.s_c = LazyCohortTable(self, 's_c')
+            self.o_c = LazyCohortTable(self, 'o_c')
+            return self.s_c, self.o_c, self.i
+        if SF_Old is not None:
+            self.sf = self.grow_table('sf', SF_Old, NoofYears)
+            self.sf[NoofYears_Old::,:] = SF_New
+        self.s_c = self.grow_table('s_c', self.s_c, NoofYears)
+        self.s_c[NoofYears_Old::,:] = self.i * SF_New * Scale
+        self.o_c = self.grow_table('o_c', self.o_c, NoofYears)
+        self.o_c[NoofYears_Old::,:] = np.tril(self.s_c[NoofYears_Old-1:-1,:] - self.s_c[NoofYears_Old::,:], NoofYears_Old - 1)
+        NewYears = np.arange(NoofYears_Old, NoofYears)
+        self.o_c[NewYears, NewYears] = self.i[NoofYears_Old::] * (1 - SF_New[NewYears - NoofYears_Old, NewYears]) # outflow during first year
+        return self.s_c, self.o_c, self.i
+
+    def grow_table(self, Name, Table, NoofYears):
+        """ The year x age-cohort table Table, e.g., self.s_c for Name = 's_c', extended with zeros to NoofYears x NoofYears.
+        The result is a view of the buffer self.buffers[Name]. A new buffer with twice the size is allocated only when Table is 
+        not a view of the buffer, e.g., after compute_stock_driven_model, or when the buffer is full.
+        """
+        Buffer = self.buffers.get(Name)
+        if Buffer is None or Table.base is not Buffer or Buffer.shape[0] < NoofYears:
+            Buffer = np.zeros((max(NoofYears, 2 * Table.shape[0]),) * 2, dtype=Table.dtype)
+            Buffer[0:Table.shape[0], 0:Table.shape[1]] = Table
+            self.buffers[Name] = Buffer
+        return Buffer[0:NoofYears, 0:NoofYears]
+
+    def advance(self, year_stock, NegativeInflowCorrect = False):
+        """ Append a single year with the stock year_stock to the stock-driven model, cf. append_years."""
+        return self.append_years(np.array([year_stock]), NegativeInflowCorrect = NegativeInflowCorrect)
+
+    def append_lt(self, NoofYears_New, lt_new = None):
+        """ Extend the lifetime parameters by NoofYears_New age-cohorts, with the values in lt_new or the values of the last age-cohort.
+        The lifetime dictionary is copied first, as it may be shared with other models."""
+        self.lt = dict(self.lt)
+        for ThisKey in LT_PARAMETERS.get(self.lt['Type'], []):
+            if lt_new is not None and ThisKey in lt_new:
+                Par_New = np.asarray(lt_new[ThisKey], dtype=float)
+                if Par_New.ndim == 0 or Par_New.shape[0] == 1:
+                    Par_New = np.tile(Par_New, NoofYears_New)
+            else:
+                Par_New = np.tile(np.asarray(self.lt[ThisKey])[-1], NoofYears_New)
+            self.lt[ThisKey] = np.concatenate((np.asarray(self.lt[ThisKey]), Par_New))
+
+    """
+    Part 7: Lifetime parameter sweep
+    Given: total stock, a grid of Weibull lifetime parameters.
+    The stock-driven model is evaluated for all parameter combinations at once, with a leading parameter axis, cf. BatchDynamicStockModel.
+    """
+
+    def sweep_lifetimes(self, Shapes, Scales, Years = None, NegativeInflowCorrect = False):
+        """ Stock-driven model with the total stock s of this model for many Weibull lifetimes with the parameters Shapes and Scales.
+        Shapes and Scales are broadcast against each other, e.g., Shapes[:,np.newaxis] and Scales[np.newaxis,:] span the full grid.
+        Years are the years in t for which the stock by age-cohort is returned, default is the last year.
+        The lifetimes are time-invariant, so that only the survival function over age is needed for each parameter combination,
+        and the year x age-cohort tables are never built. Memory use is O(P*T) for P parameter combinations.
+        The outflow is determined from the mass balance.
+        Returns inflow and outflow, parameter shape x time, and the stock by age-cohort in the given years, parameter shape x years x age-cohort.
+        The lifetime of this model is not used and not changed.
+        """
+        if self.s is None:
+            return None, None, None
+        Shapes, Scales = np.broadcast_arrays(np.asarray(Shapes, dtype=float), np.asarray(Scales, dtype=float))
+        ParShape = Shapes.shape
+        Shapes, Scales = Shapes.ravel(), Scales.ravel()
+        Years = np.array([self.t[-1]]) if Years is None else np.atleast_1d(Years)
+        YearIndex = [list(self.t).index(Year) for Year in Years]
+        # Survival function over age for all parameter combinations, 0 for products with lifetime 0:
+        SF_Age = np.zeros((len(Shapes), len(self.t)))
+        Nonzero = Shapes != 0
+        SF_Age[Nonzero,:] = scipy.stats.weibull_min.sf(np.arange(0,len(self.t)), Shapes[Nonzero,np.newaxis], 0, Scales[Nonzero,np.newaxis])
+        Batch = BatchDynamicStockModel(t=self.t, s=np.tile(np.asarray(self.s, dtype=float), (len(Shapes), 1)), sf_age=SF_Age)
+        i, Factor = Batch.compute_negative_inflow_correct(NegativeInflowCorrect = NegativeInflowCorrect)
+        o = i - Batch.compute_stock_change() # outflow from mass balance
+        o[SF_Age[:,0] == 0,:] = 0 # inflow leaves within the same year, no stock
+        # Stock by age-cohort in the given years: s_c[p,t,c] = i[p,c] * SF_Age[p,t-c] * Factor[p,c+1] * ... * Factor[p,t]
+        s_c = np.zeros((len(Shapes), len(YearIndex), len(self.t)))
+        for n, m in enumerate(YearIndex):
+            s_c[:,n,0:m+1] = i[:,0:m+1] * SF_Age[:,m::-1]
+            if m > 0:
+                s_c[:,n,0:m] = s_c[:,n,0:m] * np.cumprod(Factor[:,m:0:-1], axis=1)[:,::-1]
+        return i.reshape(ParShape + (len(self.t),)), o.reshape(ParShape + (len(self.t),)), s_c.reshape(ParShape + s_c.shape[1::])
+
+    """
+    Part 8: Sensitivities with respect to the lifetime parameters
+    The derivatives of the survival function with respect to the parameters of the lifetime distribution are propagated through 
+    the inflow-driven and the stock-driven model (forward mode), so that one model run yields the derivatives of all outputs.
+    A parameter derivative refers to changing the parameter of all age-cohorts by the same amount, 
+    as for the scalar lifetime parameters of generate_lt.
+    The results are stored in self.sensitivity[Parameter][Variable], with Variable = 'i', 's', 'o', 's_c', 'o_c'.
+    """
+
+    def compute_sf_derivative(self, Parameter):
+        """ Derivative of the survival table with respect to the lifetime parameter Parameter, e.g., 'Shape' or 'Scale' for Weibull.
+        Element [t,c] is the derivative of sf[t,c] with respect to the parameter of age-cohort c.
+        Analytical derivatives are used for the Weibull and normal distribution, the fixed lifetime has derivative 0 (step function),
+        for the folded normal and lognormal distribution central differences of the survival function are used.
+        """
+        Age = np.subtract.outer(np.arange(0,len(self.t)), np.arange(0,len(self.t))) # Age[m,n] = m-n
+        Cohorts = np.nonzero(self.compute_lt_nonzero())[0] # For products with lifetime of 0, sf == 0 and so is its derivative
+        Age_C = Age[:,Cohorts]
+        D_SF = np.zeros((len(self.t), len(self.t)))
+        if self.lt['Type'] == 'Fixed':
+            return D_SF
+        if self.lt['Type'] == 'Weibull':
+            Shape = np.asarray(self.lt['Shape'], dtype=float)[Cohorts]
+            Scale = np.asarray(self.lt['Scale'], dtype=float)[Cohorts]
+            Z  = np.maximum(Age_C, 0) / Scale
+            ZK = Z ** Shape
+            SF = np.exp(-1 * ZK) # = scipy.stats.weibull_min.sf
+            if Parameter == 'Shape':
+                D_SF[:,Cohorts] = -1 * SF * ZK * np.log(np.where(Z > 0, Z, 1))
+            else:
+                D_SF[:,Cohorts] = SF * ZK * Shape / Scale
+        elif self.lt['Type'] == 'Normal':
+            Mean   = np.asarray(self.lt['Mean'],   dtype=float)[Cohorts]
+            StdDev = np.asarray(self.lt['StdDev'], dtype=float)[Cohorts]
+            PDF = scipy.stats.norm.pdf(Age_C, loc=Mean, scale=StdDev)
+            D_SF[:,Cohorts] = PDF if Parameter == 'Mean' else PDF * (Age_C - Mean) / StdDev
+        else:
+            LT = self.lt
+            Par = np.asarray(LT[Parameter], dtype=float)
+            Step = np.sqrt(np.finfo(float).eps) * np.maximum(np.abs(Par), 1)
+            self.lt = dict(LT, **{Parameter: Par + Step})
+            SF_Up = self.compute_sf_age(Age_C, Cohorts)
+            self.lt = dict(LT, **{Parameter: Par - Step})
+            SF_Down = self.compute_sf_age(Age_C, Cohorts)
+            self.lt = LT
+            D_SF[:,Cohorts] = (SF_Up - SF_Down) / (2 * Step[Cohorts])
+        return np.tril(D_SF) # cohorts cannot be present before they enter the stock.
+
+    def compute_s_c_inflow_driven_sensitivity(self):
+        """ Inflow-driven model with derivatives of stock and outflow with respect to all lifetime parameters.
+        The inflow is given, so that its derivative is 0, and d s_c[t,c] = i[c] * d sf[t,c].
+        Returns s_c and self.sensitivity.
+        """
+        if self.compute_s_c_inflow_driven() is None:
+            return None, None
+        self.compute_o_c_from_s_c()
+        self.sensitivity = {}
+        for Parameter in LT_PARAMETERS[self.lt['Type']]:
+            D_S_C = np.einsum('c,tc->tc', self.i, self.compute_sf_derivative(Parameter))
+            self.sensitivity[Parameter] = self.compute_sensitivity_totals(np.zeros(len(self.t)), D_S_C, self.compute_sf_derivative(Parameter).diagonal(0))
+        return self.s_c, self.sensitivity
+
+    def compute_stock_driven_model_sensitivity(self, NegativeInflowCorrect = False):
+        """ Stock-driven model with derivatives of inflow, stock by cohort, and outflow with respect to all lifetime parameters.
+        The derivatives are propagated through the year-by-year computation of compute_negative_inflow_correct:
+        In years without correction, d i[m] = (-d StockPrev[m] - i[m] * d sf[m,m]) / sf[m,m], 
+        in years with correction, i[m] = 0 and the factor Factor[m] = s[m] / StockPrev[m] has the derivative -s[m] * d StockPrev[m] / StockPrev[m]^2.
+        The total stock is given, so that its derivative is 0 (except where the stock cannot be matched).
+        Returns s_c, o_c, i, and self.sensitivity.
+        """
+        if self.compute_stock_driven_model(NegativeInflowCorrect = NegativeInflowCorrect)[0] is None:
+            return None, None, None, None
+        Factor = self.nic_factor if self.nic_factor is not None else np.ones(len(self.t))
+        Parameters = LT_PARAMETERS[self.lt['Type']]
+        D_SF = np.array([self.compute_sf_derivative(Parameter) for Parameter in Parameters]) # parameter x year x age-cohort
+        D_i = np.zeros((len(Parameters), len(self.t)))
+        D_Factor = np.zeros((len(Parameters), len(self.t)))
+        if self.sf[0,0] != 0:
+            D_i[:,0] = -1 * self.i[0] * D_SF[:,0,0] / self.sf[0,0]
+        # Product of the correction factors of the years c+1...m-1 before year m, Scale[c] = Factor[c+1] * ... * Factor[m-1], and its derivative:
+        Scale = np.ones(len(self.t))
+        D_Scale = np.zeros((len(Parameters), len(self.t)))
+        for m in range(1, len(self.t)):
+            D_Scale[:,0:m-1] = D_Scale[:,0:m-1] * Factor[m-1] + Scale[0:m-1] * D_Factor[:,m-1,np.newaxis]
+            Scale[0:m-1] = Scale[0:m-1] * Factor[m-1]
+            # stock of previous age-cohorts at the end of year m, before correction, and its derivative:
+            StockPrev = (self.i[0:m] * self.sf[m,0:m] * Scale[0:m]).sum()
+            D_StockPrev = D_i[:,0:m].dot(self.sf[m,0:m] * Scale[0:m]) + D_SF[:,m,0:m].dot(self.i[0:m] * Scale[0:m]) + D_Scale[:,0:m].dot(self.i[0:m] * self.sf[m,0:m])
+            if NegativeInflowCorrect is True and self.s[m] - StockPrev < 0: # negative inflow correction, inflow is 0.
+                if StockPrev != 0:
+                    D_Factor[:,m] = -1 * self.s[m] * D_StockPrev / (StockPrev * StockPrev)
+            elif self.sf[m,m] != 0: # Else, inflow is 0.
+                D_i[:,m] = (-1 * D_StockPrev - self.i[m] * D_SF[:,m,m]) / self.sf[m,m]
+        # Derivative of the products of the correction factors of all years after the inflow year, cf. compute_negative_inflow_correct:
+        Scale_TC = np.cumprod(np.tril(np.tile(Factor[:,np.newaxis], (1, len(self.t))), -1) + np.triu(np.ones((len(self.t), len(self.t)))), axis=0)
+        D_Scale_TC = np.zeros((len(Parameters), len(self.t), len(self.t)))
+        for m in range(1, len(self.t)):
+            D_Scale_TC[:,m,0:m] = D_Scale_TC[:,m-1,0:m] * Factor[m] + Scale_TC[m-1,0:m] * D_Factor[:,m,np.newaxis]
+        self.sensitivity = {}
+        for n, Parameter in enumerate(Parameters):
+            D_S_C = (np.einsum('c,tc->tc', D_i[n], self.sf) + np.einsum('c,tc->tc', self.i, D_SF[n])) * Scale_TC + np.einsum('c,tc->tc', self.i, self.sf) * D_Scale_TC[n]
+            self.sensitivity[Parameter] = self.compute_sensitivity_totals(D_i[n], D_S_C, D_SF[n].diagonal(0))
+        return self.s_c, self.o_c, self.i, self.sensitivity
+
+    def compute_sensitivity_totals(self, D_i, D_S_C, D_SF_Diag):
+        """ Derivatives of outflow by cohort, total stock, and total outflow, from the derivatives of inflow, stock by cohort, and of the diagonal of sf,
+        following the mass balance of compute_o_c_from_s_c."""
+        D_O_C = np.zeros((len(self.t), len(self.t)))
+        D_O_C[1::,:] = -1 * np.diff(D_S_C, n=1, axis=0)
+        D_O_C = np.tril(D_O_C)
+        D_O_C[np.diag_indices(len(self.t))] = D_i * (1 - self.sf.diagonal(0)) - self.i * D_SF_Diag # outflow during first year
+        return {'i': D_i, 's': D_S_C.sum(axis=1), 'o': D_O_C.sum(axis=1), 's_c': D_S_C, 'o_c': D_O_C}
+
+    """
+    Part 9: Persistence
+    The model is stored in a directory with one .npy file per array and the file meta.json for the model name and the lifetime type.
+    The .npy files can be memory-mapped when the model is loaded, so that large cohort tables are read from disk on demand.
+    """
+
+    def save(self, path):
+        """ Save t, i, s, o, s_c, o_c, the lifetime dictionary, and the name of the model to the directory path, cf. load.
+        Variables that are None are not saved. LazyCohortTable objects are saved as full arrays, sparse matrices as .npz files (cf. scipy.sparse.save_npz)."""
+        os.makedirs(path, exist_ok = True)
+        Meta = {'name': self.name, 'dtype': self.dtype.str, 'Arrays': [], 'Sparse': [], 'lt': None}
+        for ThisVar in SAVE_VARIABLES:
+            if scipy.sparse.issparse(getattr(self, ThisVar)):
+                scipy.sparse.save_npz(os.path.join(path, ThisVar + '.npz'), getattr(self, ThisVar))
+                Meta['Sparse'].append(ThisVar)
+            elif getattr(self, ThisVar) is not None:
+                np.save(os.path.join(path, ThisVar + '.npy'), np.asarray(getattr(self, ThisVar)))
+                Meta['Arrays'].append(ThisVar)
+        if self.lt is not None:
+            Meta['lt'] = {'Type': self.lt['Type'], 'Parameters': []}
+            for ThisKey in self.lt.keys():
+                if ThisKey != 'Type':
+                    np.save(os.path.join(path, 'lt_' + ThisKey + '.npy'), np.asarray(self.lt[ThisKey]))
+                    Meta['lt']['Parameters'].append(ThisKey)
+        with open(os.path.join(path, 'meta.json'), 'w') as MetaFile:
+            json.dump(Meta, MetaFile, indent = 1)
+
+    @classmethod
+    def load(cls, path, mmap = True):
+        """ Load a model saved with save from the directory path.
+        With mmap = True, the arrays are memory-mapped read-only and not copied into memory (except for sparse matrices), 
+        assign copies (e.g., dsm.s_c = dsm.s_c.copy()) before recomputing them in place."""
+        with open(os.path.join(path, 'meta.json'), 'r') as MetaFile:
+            Meta = json.load(MetaFile)
+        MMapMode = 'r' if mmap is True else None
+        Arrays = {ThisVar: np.load(os.path.join(path, ThisVar + '.npy'), mmap_mode = MMapMode) for ThisVar in Meta['Arrays']}
+        for ThisVar in Meta.get('Sparse', []):
+            Arrays[ThisVar] = scipy.sparse.load_npz(os.path.join(path, ThisVar + '.npz')).tocsr()
+        if Meta['lt'] is not None:
+            Arrays['lt'] = {'Type': Meta['lt']['Type']}
+            for ThisKey in Meta['lt']['Parameters']:
+                Arrays['lt'][ThisKey] = np.load(os.path.join(path, 'lt_' + ThisKey + '.npy'))
+        return cls(name = Meta['name'], dtype = Meta.get('dtype', 'float64'), **Arrays)
+
+    """
+    Part 10: Sparse storage
+    With sparse_threshold, compute_sf stores the survival function as sparse matrix (scipy.sparse, CSR, time x age-cohort) if the share of its nonzero entries
+    is below sparse_threshold. It is built from the banded layout, cf. compute_sf_band: entries above max_age (given, or from sf_tol) are 0, 
+    for Fixed lifetimes, sf is 0 after the lifetime anyway. The pdf, and s_c and o_c of the inflow-driven and stock-driven models 
+    (compute_s_c_inflow_driven, compute_o_c_from_s_c, compute_stock_driven_model) are then sparse matrices as well, with the nonzero entries only.
+    For a Fixed lifetime, o_c has one nonzero entry per age-cohort.
+    The other methods (initial stock, type split, sensitivities, append_years) require a dense sf.
+    """
+
+    def compute_negative_inflow_correct_sparse(self, Factor):
+        """ Stock by cohort and outflow by cohort of compute_negative_inflow_correct for a sparse survival table, with the correction factors Factor:
+        s_c[t,c] = i[c] * sf[t,c] * Factor[c+1] * ... * Factor[t], evaluated for the nonzero entries of sf only.
+        The product of the correction factors is computed from cumulative sums of their logarithms; 
+        after a year with Factor 0 (all stock removed), the stock of all previous age-cohorts is 0."""
+        S_C = self.sf.multiply(np.asarray(self.i, dtype=float)).tocoo()
+        if (Factor != 1).any():
+            CumLog = np.cumsum(np.log(np.where(Factor > 0, Factor, 1)))
+            LastZero = np.maximum.accumulate(np.where(Factor == 0, np.arange(0, len(self.t)), -1)) # last year up to t with Factor 0
+            S_C.data = S_C.data * np.exp(CumLog[S_C.row] - CumLog[S_C.col]) * (LastZero[S_C.row] <= S_C.col)
+        self.s_c = S_C.tocsr()
+        self.s_c.eliminate_zeros()
+        self.o_c = sparse_outflow_by_cohort(self.s_c, self.i * (1 - self.sf.diagonal()))
+        return self.s_c, self.o_c, self.i
+        
+
+
+
+
+class LazyCohortTable(object):
+
+    """ Year-by-cohort table s_c or o_c of a dynamic stock model in lazy mode.
+    
+    The table is not stored. Rows, columns, and single entries are computed on demand from the inflow, 
+    the lifetime distribution, and the factors of the negative inflow correction (if any) of the dynamic stock model:
+    s_c[t,c] = i[c] * sf[t,c] * Factor[c+1] * ... * Factor[t]
+    o_c[t,c] = s_c[t-1,c] - s_c[t,c] for c < t, o_c[t,t] = i[t] * (1 - sf[t,t])
+    The row sums (total stock and outflow) are computed without building the table.
+    The full table is only built when the table is indexed as a whole, or converted with np.asarray or toarray().
+    """
+
+    def __init__(self, DSM, Kind):
+        """ DSM is the dynamic stock model the table belongs to, Kind is 's_c' or 'o_c'."""
+        self.DSM  = DSM
+        self.Kind = Kind
+        self.shape = (len(DSM.t), len(DSM.t))
+        self.ndim  = 2
+        self.dtype = np.dtype(float)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def stock_row(self, t):
+        """ Row t of the stock by cohort."""
+        Row = np.zeros(self.shape[1])
+        if t < 0:
+            return Row
+        Row[0:t+1] = np.asarray(self.DSM.i, dtype=float)[0:t+1] * self.DSM.compute_sf_row(t)[0:t+1]
+        if self.DSM.nic_factor is not None and t > 0:
+            Row[0:t] = Row[0:t] * np.cumprod(self.DSM.nic_factor[t:0:-1])[::-1]
+        return Row
+
+    def stock_column(self, c):
+        """ Column c of the stock by cohort."""
+        Column = np.asarray(self.DSM.i, dtype=float)[c] * self.DSM.compute_sf_column(c)
+        if self.DSM.nic_factor is not None:
+            Column[c+1::] = Column[c+1::] * np.cumprod(self.DSM.nic_factor[c+1::])
+        return Column
+
+    def row(self, t):
+        """ Row t of the table."""
+        if self.Kind == 's_c':
+            return self.stock_row(t)
+        Row = self.stock_row(t-1) - self.stock_row(t)
+        Row[t::] = 0
+        Row[t] = np.asarray(self.DSM.i, dtype=float)[t] * (1 - self.DSM.compute_sf_row(t)[t])
+        return Row
+
+    def column(self, c):
+        """ Column c of the table."""
+        if self.Kind == 's_c':
+            return self.stock_column(c)
+        Column = np.zeros(self.shape[0])
+        Column[c+1::] = -1 * np.diff(self.stock_column(c)[c::])
+        Column[c] = np.asarray(self.DSM.i, dtype=float)[c] * (1 - self.DSM.compute_sf_column(c)[c])
+        return Column
+
+    def __getitem__(self, Key):
+        if not isinstance(Key, tuple):
+            Key = (Key, slice(None))
+        RowKey, ColKey = Key
+        if isinstance(RowKey, (int, np.integer)):
+            return self.row(int(RowKey) % self.shape[0])[ColKey]
+        if isinstance(ColKey, (int, np.integer)):
+            return self.column(int(ColKey) % self.shape[1])[RowKey]
+        Rows = np.arange(0, self.shape[0])[RowKey]
+        return np.array([self.row(t) for t in Rows]).reshape(Rows.shape + (self.shape[1],))[..., ColKey]
+
+    def sum(self, axis=None, dtype=None):
+        """ Sum of the table. The row sums, axis=1, are the total stock or outflow, computed without building the table.
+        The sums are always computed in float64, dtype is accepted for compatibility with numpy arrays."""
+        if axis == 1:
+            if self.Kind == 's_c':
+                if self.DSM.nic_factor is None and self.DSM.sf is None and self.DSM.check_lt_time_invariant() is True:
+                    # constant lifetime: total stock is the convolution of the inflow with the survival curve
+                    return np.convolve(np.asarray(self.DSM.i, dtype=float), self.DSM.compute_sf_age_invariant())[0:self.shape[0]]
+                return np.array([self.stock_row(t).sum() for t in range(0, self.shape[0])])
+            # outflow from mass balance: o[t] = i[t] - (s[t] - s[t-1])
+            Stock = np.zeros(self.shape[0] + 1)
+            Stock[1::] = LazyCohortTable(self.DSM, 's_c').sum(axis=1)
+            return np.asarray(self.DSM.i, dtype=float) - np.diff(Stock)
+        if axis == 0:
+            return np.array([self.column(c).sum() for c in range(0, self.shape[1])])
+        return self.sum(axis=1).sum()
+
+    def toarray(self):
+        """ Build the full year-by-cohort table."""
+        return np.array([self.row(t) for t in range(0, self.shape[0])]).reshape(self.shape)
+
+    def __array__(self, dtype=None, copy=None):
+        Table = self.toarray()
+        return Table if dtype is None else Table.astype(dtype)
+
+
+class BatchDynamicStockModel(object):
+
+    """ Class containing a batch of dynamic stock models with the same time vector
+    
+    All stock and flow variables carry a leading batch dimension b, 
+    so that many stock or inflow trajectories can be computed with a few array operations.
+
+    Attributes
+    ----------
+    t : Series of years or other time intervals, shared by all models in the batch
+    i : Inflow to stock, batch x time
+    
+    o : Outflow from stock, batch x time
+    o_c : Outflow from stock by cohort, batch x time x age-cohort
+
+    s_c : Stock by cohort, batch x time x age-cohort
+    s : Total stock, batch x time
+
+    lt : lifetime distribution: dictionary, shared by all models in the batch,
+         or list of dictionaries, one for each model in the batch
+
+    sf: survival function, year x age-cohort table if lt is shared, batch x year x age-cohort table otherwise
+    
+    sf_age: optional survival function over age, batch x age, for time-invariant lifetimes. 
+            If given, compute_negative_inflow_correct reads the survival function from it, and sf is not needed.
+
+    name : string, optional
+        Name of the batch of dynamic stock models, default is 'DSM_Batch'
+    """
+
+    def __init__(self, t=None, i=None, s=None, lt=None, name='DSM_Batch', sf=None, sf_age=None):
+        """ Init function. Assign the input data to the instance of the object. 
+        i and s are converted to 2D arrays batch x time, a 1D time series is treated as a batch of size 1."""
+        self.t = t
+        self.i = np.atleast_2d(np.asarray(i, dtype=float)) if i is not None else None
+        self.s = np.atleast_2d(np.asarray(s, dtype=float)) if s is not None else None
+        self.o = None
+        self.s_c = None
+        self.o_c = None
+        self.lt = lt
+        self.name = name
+        self.sf = sf
+        self.sf_age = sf_age
+
+    def batch_size(self):
+        """ Return the number of models in the batch."""
+        if self.s is not None:
+            return self.s.shape[0]
+        if self.i is not None:
+            return self.i.shape[0]
+        if isinstance(self.lt, (list, tuple)):
+            return len(self.lt)
+        return None
+
+    def compute_sf(self):
+        """ Survival table, year x age-cohort for a shared lifetime distribution or batch x year x age-cohort for one lifetime per model.
+        The survival functions are computed by DynamicStockModel.compute_sf, and are therefore taken from the process-wide cache if available.
+        The method does nothing if the sf already exists."""
+        if self.sf is None:
+            if isinstance(self.lt, (list, tuple)):
+                self.sf = np.stack([DynamicStockModel(t=self.t, lt=lt).compute_sf() for lt in self.lt])
+            else:
+                self.sf = DynamicStockModel(t=self.t, lt=self.lt).compute_sf()
+        return self.sf
+
+    def compute_sf_row(self, m):
+        """ Row m of the survival table for the age-cohorts 0...m, batch x age-cohort, or 1 x age-cohort for a shared lifetime."""
+        if self.sf_age is not None:
+            return self.sf_age[:,m::-1]
+        SF = self.sf if self.sf.ndim == 3 else self.sf[np.newaxis,:,:]
+        return SF[:,m,0:m+1]
+
+    def compute_s_c_inflow_driven(self):
+        """ With given inflow and lifetime distribution, the method builds the stock by cohort: s_c[b,t,c] = i[b,c] * sf[(b),t,c]."""
+        if self.i is not None:
+            if self.lt is not None:
+                self.compute_sf()
+                if self.sf.ndim == 3:
+                    self.s_c = np.einsum('bc,btc->btc', self.i, self.sf)
+                else:
+                    self.s_c = np.einsum('bc,tc->btc', self.i, self.sf)
+                return self.s_c
+            else:
+                # No lifetime distribution specified
+                return None
+        else:
+            # No inflow specified
+            return None
+
+    def compute_o_c_from_s_c(self):
+        """Compute outflow by cohort from stock by cohort and inflow: all stock lost by previous age-cohorts, plus outflow of new inflow during first year."""
+        if self.s_c is not None:
+            SF = self.sf if self.sf.ndim == 3 else self.sf[np.newaxis,:,:]
+            self.o_c = np.zeros(self.s_c.shape)
+            self.o_c[:,1::,:] = -1 * np.diff(self.s_c, n=1, axis=1)
+            self.o_c = np.tril(self.o_c)
+            Diag = np.arange(0, len(self.t))
+            self.o_c[:,Diag,Diag] = self.i * (1 - SF[:,Diag,Diag])
+            return self.o_c
+        else:
+            # s_c does not exist. Doing nothing
+            return None
+
+    def compute_stock_total(self):
+        """Determine total stock as sum over age-cohorts of cohort-specific stock."""
+        if self.s is None and self.s_c is not None:
+            self.s = self.s_c.sum(axis=2)
+        return self.s
+
+    def compute_outflow_total(self):
+        """Determine total outflow as sum over age-cohorts of cohort-specific outflow."""
+        if self.o is None and self.o_c is not None:
+            self.o = self.o_c.sum(axis=2)
+        return self.o
+
+    def compute_stock_change(self):
+        """ Determine stock change from time series for stock. Formula: stock_change(t) = stock(t) - stock(t-1)."""
+        if self.s is not None:
+            return np.diff(self.s, n=1, axis=1, prepend=0)
+        else:
+            return None
+
+    def check_stock_balance(self):
+        """ Check wether inflow, outflow, and stock are balanced. Balance = inflow - outflow - stock_change, batch x time."""
+        try:
+            return self.i - self.o - self.compute_stock_change()
+        except:
+            # Could not determine balance. At least one of the variables is not defined.
+            return None
+
+    def compute_stock_driven_model(self, NegativeInflowCorrect = False):
+        """ With given total stock and lifetime distribution, the method builds the stock by cohort, the outflow by cohort, the inflow,
+        and the total outflow for all models in the batch, each with a leading batch axis. Same results as DynamicStockModel.compute_stock_driven_model for each model.
+        Without NegativeInflowCorrect, the inflow is the solution of the lower-triangular systems sf @ i[b,:] = s[b,:].
+        With NegativeInflowCorrect, the year-by-year computation is vectorized over the batch, cf. DynamicStockModel.compute_negative_inflow_correct.
+        """
+        if self.s is not None:
+            if self.lt is not None:
+                self.compute_sf()
+                if NegativeInflowCorrect is False:
+                    self.i = self.compute_i_triangular_solve()
+                    Factor = None
+                else:
+                    self.i, Factor = self.compute_negative_inflow_correct()
+                self.compute_s_c_inflow_driven()
+                if Factor is not None and (Factor != 1).any():
+                    # Apply product of correction factors of all years after the inflow year, Scale[b,t,c] = Factor[b,c+1] * ... * Factor[b,t]
+                    Scale = np.tril(np.repeat(Factor[:,:,np.newaxis], len(self.t), axis=2), -1) + np.triu(np.ones((len(self.t), len(self.t))))
+                    self.s_c = self.s_c * np.cumprod(Scale, axis=1)
+                self.compute_o_c_from_s_c()
+                self.o = self.o_c.sum(axis=2)
+                return self.s_c, self.o_c, self.i, self.o
+            else:
+                # No lifetime distribution specified
+                return None, None, None, None
+        else:
+            # No stock specified
+            return None, None, None, None
+
+    def compute_i_triangular_solve(self):
+        """ Determine the inflow of the stock-driven model without negative inflow correction for all models in the batch,
+        cf. DynamicStockModel.compute_i_triangular_solve. For a shared sf, all stock trajectories are solved in one call."""
+        i = np.zeros(self.s.shape)
+        SF = self.sf if self.sf.ndim == 3 else self.sf[np.newaxis,:,:]
+        for b in range(0, SF.shape[0]):
+            Nonzero = SF[b].diagonal(0) != 0 # Else, inflow is 0.
+            Rows = slice(None) if SF.shape[0] == 1 else b
+            i[Rows, Nonzero] = scipy.linalg.solve_triangular(SF[b][np.ix_(Nonzero,Nonzero)], self.s[Rows, Nonzero].T, lower=True).T
+        return i
+
+    def compute_negative_inflow_correct(self, NegativeInflowCorrect = True):
+        """ Year-by-year determination of the inflow with negative inflow correction, vectorized over the batch.
+        Returns the inflow and the yearly factors (1 - Delta_percent) by which the stock of the previous age-cohorts is reduced, batch x time.
+        cf. DynamicStockModel.compute_negative_inflow_correct for a description of the method.
+        With NegativeInflowCorrect = False, the same year-by-year computation is done without correction."""
+        Nb = self.s.shape[0]
+        i = np.zeros((Nb, len(self.t)))
+        Factor = np.ones((Nb, len(self.t)))
+        Weight = np.zeros((Nb, len(self.t)))
+        CumFactor = np.ones(Nb)
+        # First year:
+        Diag = np.broadcast_to(self.compute_sf_row(0)[:,0], (Nb,))
+        i[:,0] = np.divide(self.s[:,0], Diag, out=np.zeros(Nb), where=Diag != 0) # Else, inflow is 0.
+        Weight[:,0] = i[:,0]
+        for m in range(1, len(self.t)):
+            SF_Row = np.broadcast_to(self.compute_sf_row(m), (Nb, m+1))
+            StockPrev = CumFactor * np.einsum('bc,bc->b', Weight[:,0:m], SF_Row[:,0:m])
+            InflowTest = self.s[:,m] - StockPrev
+            Negative = (InflowTest < 0) & NegativeInflowCorrect
+            # Negative inflow: set inflow to 0 and remove the same share Delta_percent from all previous age-cohorts.
+            Delta_percent = np.divide(-1 * InflowTest, StockPrev, out=np.zeros(Nb), where=Negative & (StockPrev != 0))
+            Factor[:,m] = 1 - Delta_percent
+            CumFactor = CumFactor * Factor[:,m]
+            Small = CumFactor < 1e-100 # Move cumulative factor into the weights before it underflows or reaches zero.
+            if Small.any():
+                Weight[Small,0:m] = Weight[Small,0:m] * CumFactor[Small,np.newaxis]
+                CumFactor[Small] = 1.0
+            # No negative inflow: determine inflow from mass balance, allow for outflow during first year by rescaling with 1/sf[m,m]
+            Diag = SF_Row[:,m]
+            i[:,m] = np.divide(InflowTest, Diag, out=np.zeros(Nb), where=~Negative & (Diag != 0))
+            Weight[:,m] = i[:,m] / CumFactor
+        return i, Factor
+
+    def compute_inflow_driven_model(self):
+        """ With given inflow and lifetime distribution, the method builds stock and outflow by cohort and total stock and outflow for all models in the batch."""
+        if self.compute_s_c_inflow_driven() is None:
+            return None, None, None
+        self.compute_o_c_from_s_c()
+        self.s = self.s_c.sum(axis=2)
+        self.o = self.o_c.sum(axis=2)
+        return self.s_c, self.o_c, self.s
         
 
 #
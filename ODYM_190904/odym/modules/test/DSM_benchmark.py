@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Performance benchmark for the class DynamicStockModel.
+
+Times the survival function of each lifetime distribution type and the inflow-driven, stock-driven,
+negative inflow correction, and type split methods for time vectors of different length,
+and records wall time and peak memory of each case in a json file, to compare runs across commits.
+
+Usage:
+    python DSM_benchmark.py                                  # all cases, T = 100, 281, 1000, 5000
+    python DSM_benchmark.py --years 100 281 --repeat 5 --output DSM_benchmark_new.json
+    python DSM_benchmark.py --cases sf_Weibull stock_driven_nic
+    python DSM_benchmark.py --compare DSM_benchmark_old.json DSM_benchmark_new.json
+
+Wall time is the minimum over untraced runs. Peak memory is measured in one separate run with tracemalloc,
+which tracks the numpy array buffers allocated during the case.
+The survival function cache is cleared before each run, so that each case computes its own sf.
+"""
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))) # add ODYM module directory to system path
+
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+import scipy
+
+import dynamic_stock_model as dsm
+
+
+YEARS = [100, 281, 1000, 5000]
+
+# Lifetime distributions, scaled to the building lifetimes of the US floor area model
+LIFETIMES = {'Fixed':        {'Type': 'Fixed',        'Mean': np.array([60.])},
+             'Normal':       {'Type': 'Normal',       'Mean': np.array([60.]), 'StdDev': np.array([18.])},
+             'FoldedNormal': {'Type': 'FoldedNormal', 'Mean': np.array([60.]), 'StdDev': np.array([18.])},
+             'LogNormal':    {'Type': 'LogNormal',    'Mean': np.array([60.]), 'StdDev': np.array([18.])},
+             'Weibull':      {'Type': 'Weibull',      'Shape': np.array([5.5]), 'Scale': np.array([85.8])}}
+
+
+def make_lt(Type, NoofYears):
+    """ Lifetime dictionary of the given type with one parameter value per age-cohort."""
+    return {Key: (Value if Key == 'Type' else np.tile(Value, NoofYears)) for Key, Value in LIFETIMES[Type].items()}
+
+
+def make_stock(NoofYears):
+    """ Logistic stock growth with a dip in the middle of the time frame, which yields negative inflows without correction."""
+    Time = np.arange(0, NoofYears)
+    Stock = 100 / (1 + np.exp(-8 * (Time / NoofYears - 0.4)))
+    Stock[NoofYears // 2::] = Stock[NoofYears // 2::] * (1 - 0.1 * np.sin(np.linspace(0, np.pi, NoofYears - NoofYears // 2)))
+    return Stock
+
+
+""" Benchmark cases: each case function takes the length of the time vector and returns a function without arguments that runs the case."""
+
+def case_sf(Type):
+    def setup(NoofYears):
+        DSM = dsm.DynamicStockModel(t=np.arange(0, NoofYears), lt=make_lt(Type, NoofYears))
+        return DSM.compute_sf
+    return setup
+
+
+def case_inflow_driven(NoofYears):
+    DSM = dsm.DynamicStockModel(t=np.arange(0, NoofYears), i=np.ones(NoofYears), lt=make_lt('Weibull', NoofYears))
+    def run():
+        DSM.compute_s_c_inflow_driven()
+        DSM.compute_o_c_from_s_c()
+        DSM.compute_stock_total()
+        DSM.compute_outflow_total()
+    return run
+
+
+def case_stock_driven(NegativeInflowCorrect):
+    def setup(NoofYears):
+        DSM = dsm.DynamicStockModel(t=np.arange(0, NoofYears), s=make_stock(NoofYears), lt=make_lt('Weibull', NoofYears))
+        return lambda: DSM.compute_stock_driven_model(NegativeInflowCorrect = NegativeInflowCorrect)
+    return setup
+
+
+def case_stock_driven_sparse(NoofYears):
+    """ Stock-driven model with negative inflow correction and Fixed lifetime, with sparse storage (cf. DynamicStockModel Part 10)."""
+    DSM = dsm.DynamicStockModel(t=np.arange(0, NoofYears), s=make_stock(NoofYears), lt=make_lt('Fixed', NoofYears), sparse_threshold=0.1)
+    return lambda: DSM.compute_stock_driven_model(NegativeInflowCorrect = True)
+
+
+def case_typesplit(NoofYears):
+    """ Stock-driven model with initial stock and two product types, with negative inflow correction, switch in the middle of the time frame."""
+    SwitchTime = NoofYears // 2
+    Stock = make_stock(NoofYears)
+    DSM_Historic = dsm.DynamicStockModel(t=np.arange(0, NoofYears), s=Stock, lt=make_lt('Weibull', NoofYears))
+    S_C = DSM_Historic.compute_stock_driven_model()[0]
+    InitialStock = np.zeros((NoofYears, 2))
+    InitialStock[0:SwitchTime, 0] = 0.7 * S_C[SwitchTime - 1, 0:SwitchTime]
+    InitialStock[0:SwitchTime, 1] = 0.3 * S_C[SwitchTime - 1, 0:SwitchTime]
+    TypeSplit = np.zeros((NoofYears, 2))
+    TypeSplit[SwitchTime::, 0] = np.linspace(0.7, 0.2, NoofYears - SwitchTime)
+    TypeSplit[SwitchTime::, 1] = 1 - TypeSplit[SwitchTime::, 0]
+    FutureStock = Stock.copy()
+    FutureStock[0:SwitchTime] = 0
+    SFArrayCombined = np.stack((DSM_Historic.compute_sf(), dsm.DynamicStockModel(t=np.arange(0, NoofYears), lt=make_lt('Normal', NoofYears)).compute_sf()), axis=2)
+    DSM = dsm.DynamicStockModel(t=np.arange(0, NoofYears), s=FutureStock, lt=make_lt('Weibull', NoofYears))
+    return lambda: DSM.compute_stock_driven_model_initialstock_typesplit_negativeinflowcorrect(SwitchTime, InitialStock, SFArrayCombined, TypeSplit, NegativeInflowCorrect = True)
+
+
+CASES = {}
+for ThisType in LIFETIMES.keys():
+    CASES['sf_' + ThisType] = case_sf(ThisType)
+CASES['inflow_driven']    = case_inflow_driven
+CASES['stock_driven']     = case_stock_driven(False)
+CASES['stock_driven_nic'] = case_stock_driven(True)
+CASES['typesplit_nic']    = case_typesplit
+CASES['stock_driven_nic_sparse_fixed'] = case_stock_driven_sparse
+
+
+def measure(Setup, NoofYears, Repeat):
+    """ Run the case Repeat times without tracing and return the minimum wall time in seconds,
+    and the peak memory in MB of one additional run under tracemalloc, which slows down Python-level allocations and is therefore not timed."""
+    Times = []
+    for r in range(Repeat):
+        dsm.sf_cache_clear()
+        Run = Setup(NoofYears)
+        Start = time.perf_counter()
+        Run()
+        Times.append(time.perf_counter() - Start)
+        del Run
+    dsm.sf_cache_clear()
+    Run = Setup(NoofYears)
+    tracemalloc.start()
+    Run()
+    Peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    del Run
+    return min(Times), Peak
+
+
+def git_commit():
+    """ Commit hash of the working tree of this file, or None outside of a git repository."""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(Cases=None, Years=YEARS, Repeat=3, Verbose=True):
+    """ Run the benchmark cases for all lengths of the time vector in Years and return the results as dictionary."""
+    Cases = list(CASES.keys()) if Cases is None else Cases
+    Results = {'meta': {'commit': git_commit(),
+                        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                        'python': platform.python_version(),
+                        'numpy': np.__version__,
+                        'scipy': scipy.__version__,
+                        'machine': platform.platform(),
+                        'repeat': Repeat},
+               'results': []}
+    for NoofYears in Years:
+        for ThisCase in Cases:
+            WallTime, PeakMemory = measure(CASES[ThisCase], NoofYears, Repeat)
+            Results['results'].append({'case': ThisCase, 'T': NoofYears, 'time_s': WallTime, 'peak_memory_MB': PeakMemory})
+            if Verbose is True:
+                print('{:<30s} T = {:>5d}   {:10.4f} s   {:10.1f} MB'.format(ThisCase, NoofYears, WallTime, PeakMemory))
+    return Results
+
+
+def compare(File_Old, File_New):
+    """ Print the ratios new/old of wall time and peak memory for all cases that are in both result files."""
+    with open(File_Old) as f:
+        Old = {(Res['case'], Res['T']): Res for Res in json.load(f)['results']}
+    with open(File_New) as f:
+        New = {(Res['case'], Res['T']): Res for Res in json.load(f)['results']}
+    print('{:<30s} {:>7s}   {:>10s}   {:>10s}'.format('case', 'T', 'time', 'memory'))
+    for Key in sorted(set(Old.keys()) & set(New.keys())):
+        print('{:<30s} {:>7d}   {:9.2f}x   {:9.2f}x'.format(Key[0], Key[1],
+              New[Key]['time_s'] / Old[Key]['time_s'],
+              New[Key]['peak_memory_MB'] / Old[Key]['peak_memory_MB'] if Old[Key]['peak_memory_MB'] > 0 else np.nan))
+
+
+if __name__ == '__main__':
+    Parser = argparse.ArgumentParser(description='Benchmark of the class DynamicStockModel.')
+    Parser.add_argument('--years', type=int, nargs='+', default=YEARS, help='lengths of the time vector')
+    Parser.add_argument('--cases', nargs='+', default=None, choices=list(CASES.keys()), help='cases to run, default: all')
+    Parser.add_argument('--repeat', type=int, default=3, help='untraced runs per case, the minimum wall time is reported')
+    Parser.add_argument('--output', default='DSM_benchmark.json', help='json file for the results')
+    Parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two result files instead of running the benchmark')
+    Args = Parser.parse_args()
+    if Args.compare is not None:
+        compare(*Args.compare)
+    else:
+        Results = run_benchmark(Args.cases, Args.years, Args.repeat)
+        with open(Args.output, 'w') as f:
+            json.dump(Results, f, indent=1)
+        print('Results written to ' + Args.output)
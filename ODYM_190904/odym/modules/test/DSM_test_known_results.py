@@ -17,6 +17,9 @@ imp.reload(dsm)
 import numpy as np
 import unittest
 import scipy
+import scipy.sparse
+import tempfile
+import tracemalloc
 
 
 ###############################################################################
@@ -404,8 +407,6 @@ myDSM0 = dsm.DynamicStockModel(t=Time_T_FixedLT, i=Inflow_T_FixedLT, lt=lifetime
 # For fixed LT
 myDSM = dsm.DynamicStockModel(t=Time_T_FixedLT, i=Inflow_T_FixedLT, lt=lifetime_FixedLT)
 
-myDSM2 = dsm.DynamicStockModel(t=Time_T_FixedLT, s=Stock_T_FixedLT, lt=lifetime_FixedLT)
-
 myDSMx = dsm.DynamicStockModel(t=Time_T_FixedLT_X, lt=lifetime_FixedLT_X)
 TestInflow_X = myDSMx.compute_i_from_s(InitialStock=InitialStock_X)
 
@@ -417,121 +418,18 @@ myDSM0n = dsm.DynamicStockModel(t=Time_T_FixedLT, i=Inflow_T_FixedLT, lt=lifetim
 # For normally distributed Lt
 myDSM3 = dsm.DynamicStockModel(t=Time_T_FixedLT, i=Inflow_T_FixedLT, lt=lifetime_NormLT)
 
-myDSM4 = dsm.DynamicStockModel(t=Time_T_FixedLT, s=Stock_T_NormLT, lt=lifetime_NormLT)
-myDSM4a= dsm.DynamicStockModel(t=Time_T_FixedLT, s=Stock_T_NormLT, lt=lifetime_NormLT)
-
 myDSMX = dsm.DynamicStockModel(t=Time_T_FixedLT_XX, lt=lifetime_NormLT_X)
 TestInflow_XX = myDSMX.compute_i_from_s(InitialStock=InitialStock_XX)
 
 myDSMXY = dsm.DynamicStockModel(t=Time_T_FixedLT_XX, i=TestInflow_XX, lt=lifetime_NormLT_X)
 
-#For negatative inflow correction 
-myDSM_ICF = dsm.DynamicStockModel(t=Time_T_30, s=Stock_SDM_NegInflow_NormLT, lt=lifetime_NormLT8)
-[SC1,OC1,I1] = myDSM_ICF.compute_stock_driven_model(NegativeInflowCorrect = False)
-myDSM_ICT = dsm.DynamicStockModel(t=Time_T_30, s=Stock_SDM_NegInflow_NormLT, lt=lifetime_NormLT8)
-[SC2,OC2,I2] = myDSM_ICT.compute_stock_driven_model(NegativeInflowCorrect = True)
-OT2 = myDSM_ICT.compute_outflow_total()
-SCh2= myDSM_ICT.compute_stock_change()
-Bal2= myDSM_ICT.check_stock_balance()
-
-#For negatative inflow correction with initial stock
-#a) Neg inflow, Correction Flag is False:
-myDSM_ICFIS = dsm.DynamicStockModel(t=Time_T_30, s=Stock_SDM_NegInflow_NormLTNeg.copy(), lt=lifetime_NormLT8)
-[SC1IS,OC1IS,I1IS] = myDSM_ICFIS.compute_stock_driven_model_initialstock(InitialStock = InitialStock_8, SwitchTime = 9, NegativeInflowCorrect = False)
-OT1IS = myDSM_ICFIS.compute_outflow_total()
-SCh1IS= myDSM_ICFIS.compute_stock_change()
-Bal1IS= myDSM_ICFIS.check_stock_balance()
-#b) No neg. inflow, correction flag is True:
-myDSM_ICTIST = dsm.DynamicStockModel(t=Time_T_30, s=Stock_SDM_PosInflow_NormLTNeg.copy(), lt=lifetime_NormLT8)
-[SC3IS,OC3IS,I3IS] = myDSM_ICTIST.compute_stock_driven_model_initialstock(InitialStock = InitialStock_8, SwitchTime = 9, NegativeInflowCorrect = True)
-OT3IS = myDSM_ICTIST.compute_outflow_total()
-SCh3IS= myDSM_ICTIST.compute_stock_change()
-Bal3IS= myDSM_ICTIST.check_stock_balance()
-#c) Neg. inflow: Correction flag is True and neg. inflow occurs.
-myDSM_ICTIS = dsm.DynamicStockModel(t=Time_T_30, s=Stock_SDM_NegInflow_NormLTNeg.copy(), lt=lifetime_NormLT8)
-[SC2IS,OC2IS,I2IS] = myDSM_ICTIS.compute_stock_driven_model_initialstock(InitialStock = InitialStock_8, SwitchTime = 9, NegativeInflowCorrect = True)
-OT2IS = myDSM_ICTIS.compute_outflow_total()
-SCh2IS= myDSM_ICTIS.compute_stock_change()
-Bal2IS= myDSM_ICTIS.check_stock_balance()
-
-# Test compute_stock_driven_model_initialstock:
-TestDSM_IntitialStock = dsm.DynamicStockModel(t=Time_T_FixedLT_2, s=FutureStock_2, lt=lifetime_NormLT_2)
-Sc_InitialStock_2,Oc_InitialStock_2,I_InitialStock_2 = TestDSM_IntitialStock.compute_stock_driven_model_initialstock(InitialStock = InitialStock_2, SwitchTime = ThisSwitchTime)
-OT3 = TestDSM_IntitialStock.compute_outflow_total()
-#TestDSM_IntitialStock.compute_stock_total()
-SCh3= TestDSM_IntitialStock.compute_stock_change()
-Bal3= TestDSM_IntitialStock.check_stock_balance()
-
-# Test stock-driven model with initialstock and type split
-TestDSM_IntitialStockTypeSplit = dsm.DynamicStockModel(t=Time_T_FixedLT_2, s=FutureStock1, lt=lifetime_NormLT_3)
-SFArrayCombined                = TestDSM_IntitialStockTypeSplit.compute_sf().copy()
-[SC_IS_TS,OC_IS_TS,I_IS_TS]    = TestDSM_IntitialStockTypeSplit.compute_stock_driven_model_initialstock_typesplit(FutureStock=FutureStock1,InitialStock=InitialStock1,SFArrayCombined=np.einsum('tc,g->tcg',SFArrayCombined,np.ones(2)),TypeSplit=TypeSplit1)
-OT_IS_TS  = TestDSM_IntitialStockTypeSplit.compute_outflow_total()
-SCh_IS_TS = TestDSM_IntitialStockTypeSplit.compute_stock_change()
-Bal_IS_TS = TestDSM_IntitialStockTypeSplit.check_stock_balance()
-
-# Test stock-driven model with initialstock and type split and NegativeInflowCorrect, lognormal lifetime
-# 1) NegativeInflowCorrect on but does not occur
-TestDSM_IntitialStockTypeSplit1       = dsm.DynamicStockModel(t=Time_T_FixedLT_2, s=FutureStock1a.copy(), lt=lifetime_NormLT_3) 
-SFArrayCombined                       = TestDSM_IntitialStockTypeSplit1.compute_sf().copy()
-[SC_IS_TS1,OC_IS_TS1,I_IS_TS1,Flags1] = TestDSM_IntitialStockTypeSplit1.compute_stock_driven_model_initialstock_typesplit_negativeinflowcorrect(SwitchTime=3,InitialStock=InitialStock1,SFArrayCombined=np.einsum('tc,g->tcg',SFArrayCombined,np.ones(2)),TypeSplit=TypeSplit1a,NegativeInflowCorrect=True)
-OT_IS_TS1                             = TestDSM_IntitialStockTypeSplit1.compute_outflow_total()
-SCh_IS_TS1                            = TestDSM_IntitialStockTypeSplit1.compute_stock_change()
-Bal_IS_TS1                            = TestDSM_IntitialStockTypeSplit1.check_stock_balance()
-
-# 2) NegativeInflowCorrect on but is not fixed
-TestDSM_IntitialStockTypeSplit2       = dsm.DynamicStockModel(t=Time_T_FixedLT_2, s=FutureStock2a.copy(), lt=lifetime_NormLT_3) 
-SFArrayCombined                       = TestDSM_IntitialStockTypeSplit2.compute_sf().copy()
-[SC_IS_TS2,OC_IS_TS2,I_IS_TS2,Flags2] = TestDSM_IntitialStockTypeSplit2.compute_stock_driven_model_initialstock_typesplit_negativeinflowcorrect(SwitchTime=3,InitialStock=InitialStock1,SFArrayCombined=np.einsum('tc,g->tcg',SFArrayCombined,np.ones(2)),TypeSplit=TypeSplit1a,NegativeInflowCorrect=False)
-OT_IS_TS2                             = TestDSM_IntitialStockTypeSplit2.compute_outflow_total()
-SCh_IS_TS2                            = TestDSM_IntitialStockTypeSplit2.compute_stock_change()
-Bal_IS_TS2                            = TestDSM_IntitialStockTypeSplit2.check_stock_balance()
-
-# 3) NegativeInflowCorrect on and fixed
-TestDSM_IntitialStockTypeSplit3       = dsm.DynamicStockModel(t=Time_T_FixedLT_2, s=FutureStock2a.copy(), lt=lifetime_NormLT_3) 
-SFArrayCombined                       = TestDSM_IntitialStockTypeSplit3.compute_sf().copy()
-[SC_IS_TS3,OC_IS_TS3,I_IS_TS3,Flags3] = TestDSM_IntitialStockTypeSplit3.compute_stock_driven_model_initialstock_typesplit_negativeinflowcorrect(SwitchTime=3,InitialStock=InitialStock1,SFArrayCombined=np.einsum('tc,g->tcg',SFArrayCombined,np.ones(2)),TypeSplit=TypeSplit1a,NegativeInflowCorrect=True)
-OT_IS_TS3                             = TestDSM_IntitialStockTypeSplit3.compute_outflow_total()
-SCh_IS_TS3                            = TestDSM_IntitialStockTypeSplit3.compute_stock_change()
-Bal_IS_TS3                            = TestDSM_IntitialStockTypeSplit3.check_stock_balance()
-
-# Test stock-driven model with initialstock and type split and NegativeInflowCorrect, normal lifetime
-# 1) NegativeInflowCorrect on but does not occur
-TestDSM_IntitialStockTypeSplit1a          = dsm.DynamicStockModel(t=Time_T_FixedLT_3, s=Stock_SDM_PosInflow_NormLTNeg.copy(), lt=lifetime_NormLT_4) 
-SFArrayCombineda                          = TestDSM_IntitialStockTypeSplit1a.compute_sf().copy()
-[SC_IS_TS1a,OC_IS_TS1a,I_IS_TS1a,Flags1a] = TestDSM_IntitialStockTypeSplit1a.compute_stock_driven_model_initialstock_typesplit_negativeinflowcorrect(SwitchTime=8,InitialStock=InitialStock2,SFArrayCombined=np.einsum('tc,g->tcg',SFArrayCombineda,np.ones(2)),TypeSplit=TypeSplit2a,NegativeInflowCorrect=True)
-OT_IS_TS1a                                = TestDSM_IntitialStockTypeSplit1a.compute_outflow_total()
-SCh_IS_TS1a                               = TestDSM_IntitialStockTypeSplit1a.compute_stock_change()
-Bal_IS_TS1a                               = TestDSM_IntitialStockTypeSplit1a.check_stock_balance()
-
-# 2) NegativeInflowCorrect on but is not fixed
-TestDSM_IntitialStockTypeSplit2a          = dsm.DynamicStockModel(t=Time_T_FixedLT_3, s=Stock_SDM_NegInflow_NormLTNeg.copy(), lt=lifetime_NormLT_4) 
-SFArrayCombineda                          = TestDSM_IntitialStockTypeSplit2a.compute_sf().copy()
-[SC_IS_TS2a,OC_IS_TS2a,I_IS_TS2a,Flags2a] = TestDSM_IntitialStockTypeSplit2a.compute_stock_driven_model_initialstock_typesplit_negativeinflowcorrect(SwitchTime=8,InitialStock=InitialStock2,SFArrayCombined=np.einsum('tc,g->tcg',SFArrayCombineda,np.ones(2)),TypeSplit=TypeSplit2a,NegativeInflowCorrect=False)
-OT_IS_TS2a                                = TestDSM_IntitialStockTypeSplit2a.compute_outflow_total()
-SCh_IS_TS2a                               = TestDSM_IntitialStockTypeSplit2a.compute_stock_change()
-Bal_IS_TS2a                               = TestDSM_IntitialStockTypeSplit2a.check_stock_balance()
-
-# 3) NegativeInflowCorrect on and fixed
-TestDSM_IntitialStockTypeSplit3a          = dsm.DynamicStockModel(t=Time_T_FixedLT_3, s=Stock_SDM_NegInflow_NormLTNeg.copy(), lt=lifetime_NormLT_4) 
-SFArrayCombineda                          = TestDSM_IntitialStockTypeSplit3a.compute_sf().copy()
-[SC_IS_TS3a,OC_IS_TS3a,I_IS_TS3a,Flags3a] = TestDSM_IntitialStockTypeSplit3a.compute_stock_driven_model_initialstock_typesplit_negativeinflowcorrect(SwitchTime=8,InitialStock=InitialStock2,SFArrayCombined=np.einsum('tc,g->tcg',SFArrayCombineda,np.ones(2)),TypeSplit=TypeSplit2a,NegativeInflowCorrect=True)
-OT_IS_TS3a                                = TestDSM_IntitialStockTypeSplit3a.compute_outflow_total()
-SCh_IS_TS3a                               = TestDSM_IntitialStockTypeSplit3a.compute_stock_change()
-Bal_IS_TS3a                               = TestDSM_IntitialStockTypeSplit3a.check_stock_balance()
-
-# Compute stock back from inflow
-TestDSM_IntitialStock_Verify = dsm.DynamicStockModel(t=Time_T_FixedLT_2, i=I_InitialStock_2, lt=lifetime_NormLT_2)
-Sc_Stock_2 = TestDSM_IntitialStock_Verify.compute_s_c_inflow_driven()
-Sc_Stock_2_Sum = Sc_Stock_2.sum(axis =1)
-Sc_Stock_Sum   = TestDSM_IntitialStock_Verify.compute_stock_total()
-Sc_Outflow_t_c = TestDSM_IntitialStock_Verify.compute_o_c_from_s_c()
+# Survival functions of the stock-driven models with initial stock and type split
+SFArrayCombined  = dsm.DynamicStockModel(t=Time_T_FixedLT_2, lt=lifetime_NormLT_3).compute_sf().copy()
+SFArrayCombineda = dsm.DynamicStockModel(t=Time_T_FixedLT_3, lt=lifetime_NormLT_4).compute_sf().copy()
 
 # For Weibull-distributed Lt
 myDSMWB1 = dsm.DynamicStockModel(t=Time_T_FixedLT, i=Inflow_T_FixedLT, lt=lifetime_WeibullLT)
 
-myDSMWB2 = dsm.DynamicStockModel(t=Time_T_FixedLT, s=Stock_T_WeibullLT, lt=lifetime_WeibullLT)
-
 myDSMWB3 = dsm.DynamicStockModel(t=Time_T_FixedLT_XX, lt=lifetime_WeibullLT)
 TestInflow_WB = myDSMWB3.compute_i_from_s(InitialStock=InitialStock_XX)
 
@@ -551,12 +449,116 @@ FN_Stock_60 = FN_Stock.sum(axis =1)
 
 
 
+# Test Toeplitz structure of sf for time-invariant lifetime
+myDSM_TI = dsm.DynamicStockModel(t=Time_T_30, lt={'Type': 'Weibull', 'Shape': np.array([5.5]), 'Scale': np.array([20])})
+SF_TI    = myDSM_TI.compute_sf()
+SF_TI_Age_Ref = scipy.stats.weibull_min.sf(np.arange(0,30), c=5.5, loc=0, scale=20)
+
+
+
+# Test sf for cohort-dependent lifetime against cohort-wise evaluation
+lifetime_WeibullLT_TV = {'Type': 'Weibull', 'Shape': np.concatenate((np.zeros(2), np.full(28, 3.5))), 'Scale': np.linspace(10, 25, 30)}
+myDSM_TV = dsm.DynamicStockModel(t=Time_T_30, lt=lifetime_WeibullLT_TV)
+SF_TV    = myDSM_TV.compute_sf()
+SF_TV_Ref = np.zeros((30,30))
+for c in range(2,30):
+    SF_TV_Ref[c::,c] = scipy.stats.weibull_min.sf(np.arange(0,30-c), c=3.5, loc=0, scale=lifetime_WeibullLT_TV['Scale'][c])
+
+
+
+# Test shared survival function cache
+dsm.sf_cache_clear()
+myDSM_Cache1 = dsm.DynamicStockModel(t=Time_T_30, lt={'Type': 'Weibull', 'Shape': np.array([2.5]), 'Scale': np.array([12])})
+myDSM_Cache2 = dsm.DynamicStockModel(t=Time_T_30, lt={'Type': 'Weibull', 'Shape': np.array([2.5]), 'Scale': np.array([12])})
+myDSM_Cache3 = dsm.DynamicStockModel(t=Time_T_30, lt={'Type': 'Weibull', 'Shape': np.array([2.5]), 'Scale': np.array([13])})
+SF_Cache1 = myDSM_Cache1.compute_sf()
+SF_Cache2 = myDSM_Cache2.compute_sf()
+SF_Cache3 = myDSM_Cache3.compute_sf()
+SF_Cache_Info = dsm.sf_cache_info()
+
+
+
+# Stock-driven model with triangular solve for the inflow
+myDSM2_TS   = dsm.DynamicStockModel(t=Time_T_FixedLT, s=Stock_T_FixedLT, lt=lifetime_FixedLT)
+myDSM4_TS   = dsm.DynamicStockModel(t=Time_T_FixedLT, s=Stock_T_NormLT, lt=lifetime_NormLT)
+myDSMWB2_TS = dsm.DynamicStockModel(t=Time_T_FixedLT, s=Stock_T_WeibullLT, lt=lifetime_WeibullLT)
+myDSM_ICF_TS= dsm.DynamicStockModel(t=Time_T_30, s=Stock_SDM_NegInflow_NormLT, lt=lifetime_NormLT8)
+
+
+
+# Stock-driven model with negative inflow correction, stock drops to 0 and recovers
+Stock_NIC_Zero = np.concatenate((np.linspace(10, 40, 10), np.linspace(30, 0, 4), np.linspace(5, 60, 16)))
+
+
+
+# Batch of dynamic stock models
+myDSM_Batch_SD  = dsm.BatchDynamicStockModel(t=Time_T_FixedLT, s=np.array([Stock_T_FixedLT, Stock_T_NormLT]), lt=[lifetime_FixedLT, lifetime_NormLT])
+myDSM_Batch_NIC = dsm.BatchDynamicStockModel(t=Time_T_30, s=np.array([Stock_SDM_NegInflow_NormLT, Stock_SDM_NegInflow_NormLT]), lt=lifetime_NormLT8)
+myDSM_Batch_ID  = dsm.BatchDynamicStockModel(t=Time_T_FixedLT, i=np.array([Inflow_T_FixedLT, Inflow_T_FixedLT]), lt=[lifetime_FixedLT, lifetime_WeibullLT])
+
+
+
+# Banded storage of cohort tables, time x age
+myDSM_Band_Fixed = dsm.DynamicStockModel(t=Time_T_FixedLT, s=Stock_T_FixedLT, lt=lifetime_FixedLT, sf_tol=1e-9)
+S_C_Band_Fixed, O_C_Band_Fixed, I_Band_Fixed = myDSM_Band_Fixed.compute_stock_driven_model_band()
+myDSM_Band_WB = dsm.DynamicStockModel(t=Time_T_FixedLT, i=Inflow_T_FixedLT, lt=lifetime_WeibullLT, max_age=9)
+S_C_Band_WB = myDSM_Band_WB.compute_s_c_inflow_driven_band()
+myDSM_Band_NIC = dsm.DynamicStockModel(t=Time_T_30, s=Stock_SDM_NegInflow_NormLT, lt=lifetime_NormLT8)
+
+
+
+# Lazy cohort tables, s_c and o_c computed on demand
+myDSM_Lazy_ID  = dsm.DynamicStockModel(t=Time_T_FixedLT, i=Inflow_T_FixedLT, lt=lifetime_NormLT, lazy=True)
+myDSM_Lazy_SD  = dsm.DynamicStockModel(t=Time_T_FixedLT, s=Stock_T_FixedLT, lt=lifetime_FixedLT, lazy=True)
+myDSM_Lazy_NIC = dsm.DynamicStockModel(t=Time_T_30, s=Stock_SDM_NegInflow_NormLT, lt=lifetime_NormLT8, lazy=True)
+
+
+
+# Sweep over Weibull lifetime parameters
+myDSM_Sweep = dsm.DynamicStockModel(t=Time_T_30, s=Stock_SDM_NegInflow_NormLT)
+Sweep_Shapes, Sweep_Scales = np.array([2.5, 5.5]), np.array([8, 12, 20])
+Sweep_Ref = [[dsm.DynamicStockModel(t=Time_T_30, s=Stock_SDM_NegInflow_NormLT.copy(), lt={'Type': 'Weibull', 'Shape': np.array([Shape]), 'Scale': np.array([Scale])}) for Scale in Sweep_Scales] for Shape in Sweep_Shapes]
+for Ref in sum(Sweep_Ref, []):
+    Ref.compute_stock_driven_model(NegativeInflowCorrect = True)
+    Ref.compute_outflow_total()
+
+
+
+# Sensitivities with respect to the lifetime parameters, compared to central differences
+def lifetime_Weibull_Sens(Shape, Scale):
+    return {'Type': 'Weibull', 'Shape': np.array([Shape]), 'Scale': np.array([Scale])}
+myDSM_Sens_ID = dsm.DynamicStockModel(t=Time_T_FixedLT, i=Inflow_T_FixedLT, lt=lifetime_Weibull_Sens(2.5, 8))
+Sens_FD_SD, Sens_FD_ID = {}, {}
+for Parameter, Step in [('Shape', np.array([1e-6, 0])), ('Scale', np.array([0, 1e-6]))]:
+    Sens_Up   = dsm.DynamicStockModel(t=Time_T_30, s=Stock_SDM_NegInflow_NormLT.copy(), lt=lifetime_Weibull_Sens(*(np.array([2.5, 8]) + Step)))
+    Sens_Down = dsm.DynamicStockModel(t=Time_T_30, s=Stock_SDM_NegInflow_NormLT.copy(), lt=lifetime_Weibull_Sens(*(np.array([2.5, 8]) - Step)))
+    Sens_FD_SD[Parameter] = (Sens_Up.compute_stock_driven_model(NegativeInflowCorrect = True)[2] - Sens_Down.compute_stock_driven_model(NegativeInflowCorrect = True)[2]) / 2e-6
+    Sens_Up   = dsm.DynamicStockModel(t=Time_T_FixedLT, i=Inflow_T_FixedLT, lt=lifetime_Weibull_Sens(*(np.array([2.5, 8]) + Step)))
+    Sens_Down = dsm.DynamicStockModel(t=Time_T_FixedLT, i=Inflow_T_FixedLT, lt=lifetime_Weibull_Sens(*(np.array([2.5, 8]) - Step)))
+    Sens_FD_ID[Parameter] = (Sens_Up.compute_s_c_inflow_driven().sum(axis=1) - Sens_Down.compute_s_c_inflow_driven().sum(axis=1)) / 2e-6
+
+
+
+# Initial stock with several segments, e.g., product types
+myDSM_IS_2D = dsm.DynamicStockModel(t=Time_T_FixedLT_X, lt=lifetime_FixedLT_X)
+TestInflow_X_2D = myDSM_IS_2D.compute_i_from_s(InitialStock=np.array([InitialStock_X, 2 * InitialStock_X]))
+myDSM_Evo_1D = dsm.DynamicStockModel(t=Time_T_FixedLT, lt=lifetime_NormLT)
+myDSM_Evo_2D = dsm.DynamicStockModel(t=Time_T_FixedLT, lt=lifetime_NormLT)
+
+
+
 ###############################################################################
 """Unit Test Class"""
 
 
 class KnownResultsTestCase(unittest.TestCase):
 
+    backend = 'numpy' # backend of the stock-driven models under test, cf. DynamicStockModel(backend = ...)
+
+    def new_dsm(self, **Parameters):
+        """New DynamicStockModel with the backend of the test case, for the tests of the year-by-year stock-driven computations."""
+        return dsm.DynamicStockModel(backend = self.backend, **Parameters)
+
     def test_inflow_driven_model_fixedLifetime_0(self):
         """Test Inflow Driven Model with Fixed product lifetime of 0."""
         np.testing.assert_array_equal(myDSM0.compute_s_c_inflow_driven(), np.zeros(Stock_TC_FixedLT.shape))
@@ -577,6 +579,7 @@ class KnownResultsTestCase(unittest.TestCase):
 
     def test_stock_driven_model_fixedLifetime(self):
         """Test Stock Driven Model with Fixed product lifetime."""
+        myDSM2 = self.new_dsm(t=Time_T_FixedLT, s=Stock_T_FixedLT, lt=lifetime_FixedLT)
         np.testing.assert_array_equal(myDSM2.compute_stock_driven_model()[0], Stock_TC_FixedLT)
         np.testing.assert_array_equal(myDSM2.compute_stock_driven_model()[1], Outflow_TC_FixedLT)
         np.testing.assert_array_equal(myDSM2.compute_stock_driven_model()[2], Inflow_T_FixedLT)
@@ -603,6 +606,7 @@ class KnownResultsTestCase(unittest.TestCase):
 
     def test_stock_driven_model_normallyDistLifetime(self):
         """Test Stock Driven Model with normally distributed product lifetime."""
+        myDSM4 = self.new_dsm(t=Time_T_FixedLT, s=Stock_T_NormLT, lt=lifetime_NormLT)
         np.testing.assert_array_almost_equal(
             myDSM4.compute_stock_driven_model()[0], Stock_TC_NormLT, 8)
         np.testing.assert_array_almost_equal(
@@ -617,6 +621,7 @@ class KnownResultsTestCase(unittest.TestCase):
     def test_stock_driven_model_normallyDistLifetime_NegInflowFlagTrue(self):
         """Test Stock Driven Model with normally distributed product lifetime.
         Set the NegativeInflowCorrect flag as True but use a test case without negative inflows."""
+        myDSM4a = self.new_dsm(t=Time_T_FixedLT, s=Stock_T_NormLT, lt=lifetime_NormLT)
         np.testing.assert_array_almost_equal(
             myDSM4a.compute_stock_driven_model(NegativeInflowCorrect = True)[0], Stock_TC_NormLT, 8)
         np.testing.assert_array_almost_equal(
@@ -630,62 +635,88 @@ class KnownResultsTestCase(unittest.TestCase):
         
     def test_stock_driven_model_normallyDistLifetime_NegInflow(self):
         """Test Stock Driven Model with normally distributed product lifetime, with negative inflow."""
+        myDSM_ICF = self.new_dsm(t=Time_T_30, s=Stock_SDM_NegInflow_NormLT, lt=lifetime_NormLT8)
+        myDSM_ICT = self.new_dsm(t=Time_T_30, s=Stock_SDM_NegInflow_NormLT, lt=lifetime_NormLT8)
         np.testing.assert_array_almost_equal(
             myDSM_ICF.compute_stock_driven_model(NegativeInflowCorrect = False)[2], InflowNeg_NoCorr, 12)
         np.testing.assert_array_almost_equal(
             myDSM_ICT.compute_stock_driven_model(NegativeInflowCorrect = True)[2], InflowNeg_WithCorr, 12)
         np.testing.assert_array_almost_equal(
             myDSM_ICT.compute_stock_change(), StockChange_WithCorr, 12)
+        myDSM_ICT.compute_outflow_total()
         np.testing.assert_array_almost_equal(myDSM_ICT.check_stock_balance(), Bal30.transpose(), 12)   
         
     def test_stock_driven_model_Initialstock_NegInflow(self):
         """Test Stock Driven Model with normally distributed product lifetime, initial stock, with negative inflow and no negative inflow correction."""
-        np.testing.assert_array_almost_equal(myDSM_ICFIS.check_stock_balance(), Bal30.transpose(), 12) 
+        myDSM_ICFIS = self.new_dsm(t=Time_T_30, s=Stock_SDM_NegInflow_NormLTNeg.copy(), lt=lifetime_NormLT8)
         np.testing.assert_array_almost_equal(myDSM_ICFIS.compute_stock_driven_model_initialstock(InitialStock = InitialStock_8, SwitchTime = 9, NegativeInflowCorrect = False)[2], InitialStockInflowNegNoCorrect, 12) 
+        myDSM_ICFIS.compute_outflow_total()
+        np.testing.assert_array_almost_equal(myDSM_ICFIS.check_stock_balance(), Bal30.transpose(), 12) 
         
     def test_stock_driven_model_Initialstock_NegInflowNotUsed(self):
         """Test Stock Driven Model with normally distributed product lifetime, initial stock, with no negative inflow and no negative inflow correction."""
-        np.testing.assert_array_almost_equal(myDSM_ICTIST.check_stock_balance(), Bal30.transpose(), 12) 
+        myDSM_ICTIST = self.new_dsm(t=Time_T_30, s=Stock_SDM_PosInflow_NormLTNeg.copy(), lt=lifetime_NormLT8)
         np.testing.assert_array_almost_equal(myDSM_ICTIST.compute_stock_driven_model_initialstock(InitialStock = InitialStock_8, SwitchTime = 9, NegativeInflowCorrect = False)[2], InitialStockInflowNoNegCorrect, 12) 
+        myDSM_ICTIST.compute_outflow_total()
+        np.testing.assert_array_almost_equal(myDSM_ICTIST.check_stock_balance(), Bal30.transpose(), 12) 
 
     def test_stock_driven_model_Initialstock_NegInflowFixed(self):
         """Test Stock Driven Model with normally distributed product lifetime, initial stock, with negative inflow and negative inflow correction."""
-        np.testing.assert_array_almost_equal(myDSM_ICTIS.check_stock_balance(), Bal30.transpose(), 12) 
+        myDSM_ICTIS = self.new_dsm(t=Time_T_30, s=Stock_SDM_NegInflow_NormLTNeg.copy(), lt=lifetime_NormLT8)
         np.testing.assert_array_almost_equal(myDSM_ICTIS.compute_stock_driven_model_initialstock(InitialStock = InitialStock_8, SwitchTime = 9, NegativeInflowCorrect = True)[2], InitialStockInflowNegCorrect, 12) 
+        myDSM_ICTIS.compute_outflow_total()
+        np.testing.assert_array_almost_equal(myDSM_ICTIS.check_stock_balance(), Bal30.transpose(), 12) 
 
     def test_stock_driven_model_Initialstock_NegInflow_TypeSplit_NotUsed(self):
         """Test Stock Driven Model with lognormally distributed product lifetime, initial stock, typesplit, with negative inflow correction but no negative inflow occurring."""
-        np.testing.assert_array_almost_equal(TestDSM_IntitialStockTypeSplit1.check_stock_balance(), Bal9.transpose(), 12) 
+        TestDSM_IntitialStockTypeSplit1 = self.new_dsm(t=Time_T_FixedLT_2, s=FutureStock1a.copy(), lt=lifetime_NormLT_3)
         np.testing.assert_array_almost_equal(TestDSM_IntitialStockTypeSplit1.compute_stock_driven_model_initialstock_typesplit_negativeinflowcorrect(SwitchTime=3,InitialStock=InitialStock1,SFArrayCombined=np.einsum('tc,g->tcg',SFArrayCombined,np.ones(2)),TypeSplit=TypeSplit1a,NegativeInflowCorrect=True)[0][:,2,:], TypeSplitInitialStockInflowCorrect1StockCheck, 12) 
+        TestDSM_IntitialStockTypeSplit1.compute_outflow_total()
+        np.testing.assert_array_almost_equal(TestDSM_IntitialStockTypeSplit1.check_stock_balance(), Bal9.transpose(), 12) 
      
     def test_stock_driven_model_Initialstock_NegInflow_TypeSplit_NoCorr(self):
         """Test Stock Driven Model with lognormally distributed product lifetime, initial stock, typesplit, with negative inflow correction of but negative inflow occurring."""
-        np.testing.assert_array_almost_equal(TestDSM_IntitialStockTypeSplit2.check_stock_balance(), Bal9.transpose(), 12) 
+        TestDSM_IntitialStockTypeSplit2 = self.new_dsm(t=Time_T_FixedLT_2, s=FutureStock2a.copy(), lt=lifetime_NormLT_3)
         np.testing.assert_array_almost_equal(TestDSM_IntitialStockTypeSplit2.compute_stock_driven_model_initialstock_typesplit_negativeinflowcorrect(SwitchTime=3,InitialStock=InitialStock1,SFArrayCombined=np.einsum('tc,g->tcg',SFArrayCombined,np.ones(2)),TypeSplit=TypeSplit1a,NegativeInflowCorrect=False)[0][:,2,:], TypeSplitInitialStockInflowCorrect2StockCheck, 12) 
+        TestDSM_IntitialStockTypeSplit2.compute_outflow_total()
+        np.testing.assert_array_almost_equal(TestDSM_IntitialStockTypeSplit2.check_stock_balance(), Bal9.transpose(), 12) 
         
     def test_stock_driven_model_Initialstock_NegInflow_TypeSplit_Corr(self):
         """Test Stock Driven Model with lognormally distributed product lifetime, initial stock, typesplit, with negative inflow correction on and negative inflow occurring and corrected."""
-        np.testing.assert_array_almost_equal(TestDSM_IntitialStockTypeSplit3.check_stock_balance(), Bal9.transpose(), 12) 
+        TestDSM_IntitialStockTypeSplit3 = self.new_dsm(t=Time_T_FixedLT_2, s=FutureStock2a.copy(), lt=lifetime_NormLT_3)
         np.testing.assert_array_almost_equal(TestDSM_IntitialStockTypeSplit3.compute_stock_driven_model_initialstock_typesplit_negativeinflowcorrect(SwitchTime=3,InitialStock=InitialStock1,SFArrayCombined=np.einsum('tc,g->tcg',SFArrayCombined,np.ones(2)),TypeSplit=TypeSplit1a,NegativeInflowCorrect=True)[0][:,2,:], TypeSplitInitialStockInflowCorrect3StockCheck, 12) 
+        TestDSM_IntitialStockTypeSplit3.compute_outflow_total()
+        np.testing.assert_array_almost_equal(TestDSM_IntitialStockTypeSplit3.check_stock_balance(), Bal9.transpose(), 12) 
 
     def test_stock_driven_model_Initialstock_NegInflow_TypeSplit_NotUsed_NormalLT(self):
         """Test Stock Driven Model with normally distributed product lifetime, initial stock, typesplit, with negative inflow correction but no negative inflow occurring."""
+        TestDSM_IntitialStockTypeSplit1a = self.new_dsm(t=Time_T_FixedLT_3, s=Stock_SDM_PosInflow_NormLTNeg.copy(), lt=lifetime_NormLT_4)
+        TestDSM_IntitialStockTypeSplit1a.compute_stock_driven_model_initialstock_typesplit_negativeinflowcorrect(SwitchTime=8,InitialStock=InitialStock2,SFArrayCombined=np.einsum('tc,g->tcg',SFArrayCombineda,np.ones(2)),TypeSplit=TypeSplit2a,NegativeInflowCorrect=True)
+        TestDSM_IntitialStockTypeSplit1a.compute_outflow_total()
         np.testing.assert_array_almost_equal(TestDSM_IntitialStockTypeSplit1a.check_stock_balance(), Bal30.transpose(), 12) 
      
     def test_stock_driven_model_Initialstock_NegInflow_TypeSplit_NoCorr_NormalLT(self):
         """Test Stock Driven Model with normally distributed product lifetime, initial stock, typesplit, with negative inflow correction of but negative inflow occurring."""
+        TestDSM_IntitialStockTypeSplit2a = self.new_dsm(t=Time_T_FixedLT_3, s=Stock_SDM_NegInflow_NormLTNeg.copy(), lt=lifetime_NormLT_4)
+        TestDSM_IntitialStockTypeSplit2a.compute_stock_driven_model_initialstock_typesplit_negativeinflowcorrect(SwitchTime=8,InitialStock=InitialStock2,SFArrayCombined=np.einsum('tc,g->tcg',SFArrayCombineda,np.ones(2)),TypeSplit=TypeSplit2a,NegativeInflowCorrect=False)
+        TestDSM_IntitialStockTypeSplit2a.compute_outflow_total()
         np.testing.assert_array_almost_equal(TestDSM_IntitialStockTypeSplit2a.check_stock_balance(), Bal30.transpose(), 12) 
         
     def test_stock_driven_model_Initialstock_NegInflow_TypeSplit_Corr_NormalLT(self):
         """Test Stock Driven Model with normally distributed product lifetime, initial stock, typesplit, with negative inflow correction on and negative inflow occurring and corrected."""
+        TestDSM_IntitialStockTypeSplit3a = self.new_dsm(t=Time_T_FixedLT_3, s=Stock_SDM_NegInflow_NormLTNeg.copy(), lt=lifetime_NormLT_4)
+        TestDSM_IntitialStockTypeSplit3a.compute_stock_driven_model_initialstock_typesplit_negativeinflowcorrect(SwitchTime=8,InitialStock=InitialStock2,SFArrayCombined=np.einsum('tc,g->tcg',SFArrayCombineda,np.ones(2)),TypeSplit=TypeSplit2a,NegativeInflowCorrect=True)
+        TestDSM_IntitialStockTypeSplit3a.compute_outflow_total()
         np.testing.assert_array_almost_equal(TestDSM_IntitialStockTypeSplit3a.check_stock_balance(), Bal30.transpose(), 12) 
 
     def test_stock_driven_model_Initialstock_TypeSplit(self):
         """Test Stock Driven Model with lognormally distributed product lifetime, initial stock, and type split."""
-        np.testing.assert_array_almost_equal(TestDSM_IntitialStockTypeSplit.check_stock_balance()[1::], np.zeros((5)), 12) 
+        TestDSM_IntitialStockTypeSplit = self.new_dsm(t=Time_T_FixedLT_2, s=FutureStock1, lt=lifetime_NormLT_3)
         np.testing.assert_array_almost_equal(TestDSM_IntitialStockTypeSplit.compute_stock_driven_model_initialstock_typesplit(FutureStock=FutureStock1,InitialStock=InitialStock1,SFArrayCombined=np.einsum('tc,g->tcg',SFArrayCombined,np.ones(2)),TypeSplit=TypeSplit1)[0][4,:,0], TypeSplitStockCheckType1, 12) 
         np.testing.assert_array_almost_equal(TestDSM_IntitialStockTypeSplit.compute_stock_driven_model_initialstock_typesplit(FutureStock=FutureStock1,InitialStock=InitialStock1,SFArrayCombined=np.einsum('tc,g->tcg',SFArrayCombined,np.ones(2)),TypeSplit=TypeSplit1)[0][4,:,1], TypeSplitStockCheckType2, 12) 
         np.testing.assert_array_almost_equal(TestDSM_IntitialStockTypeSplit.compute_stock_driven_model_initialstock_typesplit(FutureStock=FutureStock1,InitialStock=InitialStock1,SFArrayCombined=np.einsum('tc,g->tcg',SFArrayCombined,np.ones(2)),TypeSplit=TypeSplit1)[2],        TypeSplitInflowCheckType, 12) 
+        TestDSM_IntitialStockTypeSplit.compute_outflow_total()
+        np.testing.assert_array_almost_equal(TestDSM_IntitialStockTypeSplit.check_stock_balance()[1::], np.zeros((5)), 12) 
 
     def test_inflow_driven_model_WeibullDistLifetime(self):
         """Test Inflow Driven Model with Weibull-distributed product lifetime."""
@@ -700,16 +731,17 @@ class KnownResultsTestCase(unittest.TestCase):
 
     def test_stock_driven_model_WeibullDistLifetime(self):
         """Test Stock Driven Model with Weibull-distributed product lifetime."""
+        myDSMWB2 = self.new_dsm(t=Time_T_FixedLT, s=Stock_T_WeibullLT, lt=lifetime_WeibullLT)
         np.testing.assert_array_almost_equal(
-            myDSMWB1.compute_stock_driven_model()[0], Stock_TC_WeibullLT, 8)
+            myDSMWB2.compute_stock_driven_model()[0], Stock_TC_WeibullLT, 8)
         np.testing.assert_array_almost_equal(
-            myDSMWB1.compute_stock_driven_model()[1], Outflow_TC_WeibullLT, 8)
+            myDSMWB2.compute_stock_driven_model()[1], Outflow_TC_WeibullLT, 8)
         np.testing.assert_array_almost_equal(
-            myDSMWB1.compute_stock_driven_model()[2], Inflow_T_FixedLT, 8)
-        np.testing.assert_array_almost_equal(myDSMWB1.compute_outflow_total(), Outflow_T_WeibullLT, 9)
+            myDSMWB2.compute_stock_driven_model()[2], Inflow_T_FixedLT, 8)
+        np.testing.assert_array_almost_equal(myDSMWB2.compute_outflow_total(), Outflow_T_WeibullLT, 8)
         np.testing.assert_array_almost_equal(
-            myDSMWB1.compute_stock_change(), StockChange_T_WeibullLT, 8)
-        np.testing.assert_array_almost_equal(myDSMWB1.check_stock_balance(), Bal.transpose(), 12)
+            myDSMWB2.compute_stock_change(), StockChange_T_WeibullLT, 8)
+        np.testing.assert_array_almost_equal(myDSMWB2.check_stock_balance(), Bal.transpose(), 12)
 
 
     def test_inflow_from_stock_fixedLifetime(self):
@@ -729,6 +761,8 @@ class KnownResultsTestCase(unittest.TestCase):
         
     def test_compute_stock_driven_model_initialstock(self):
         """Test stock-driven model with initial stock given."""
+        TestDSM_IntitialStock = self.new_dsm(t=Time_T_FixedLT_2, s=FutureStock_2, lt=lifetime_NormLT_2)
+        Sc_InitialStock_2,Oc_InitialStock_2,I_InitialStock_2 = TestDSM_IntitialStock.compute_stock_driven_model_initialstock(InitialStock = InitialStock_2, SwitchTime = ThisSwitchTime)
         np.testing.assert_array_almost_equal(I_InitialStock_2, I_InitialStock_2_Ref, 8) 
         np.testing.assert_array_almost_equal(Sc_InitialStock_2, Sc_InitialStock_2_Ref, 8)
         np.testing.assert_array_almost_equal(Sc_InitialStock_2.sum(axis =1), Sc_InitialStock_2_Ref_Sum, 8)
@@ -743,6 +777,325 @@ class KnownResultsTestCase(unittest.TestCase):
         np.testing.assert_array_almost_equal(FN_Stock_Reference_2060, FN_Stock_60[60], 12) 
 
 
-    if __name__ == '__main__':
-        unittest.main()
-
+    def test_sf_time_invariant_lifetime(self):
+        """Test survival function for time-invariant lifetime: each cohort has the same age curve, shifted down the diagonal."""
+        np.testing.assert_array_almost_equal(SF_TI[:,0], SF_TI_Age_Ref, 14)
+        np.testing.assert_array_almost_equal(SF_TI[29,:], SF_TI_Age_Ref[::-1], 14)
+        np.testing.assert_array_equal(np.triu(SF_TI, 1), np.zeros((30,30)))
+
+
+    def test_sf_time_variant_lifetime(self):
+        """Test survival function for cohort-dependent lifetime, including cohorts with lifetime 0."""
+        np.testing.assert_array_almost_equal(SF_TV, SF_TV_Ref, 14)
+
+
+    def test_sf_cache(self):
+        """Test that dynamic stock models with the same lifetime and time vector share one read-only sf array."""
+        self.assertIs(SF_Cache1, SF_Cache2)
+        self.assertIsNot(SF_Cache1, SF_Cache3)
+        self.assertFalse(SF_Cache1.flags.writeable)
+        self.assertEqual(SF_Cache_Info['hits'], 1)
+        self.assertEqual(SF_Cache_Info['misses'], 2)
+
+
+    def test_stock_driven_model_triangular_solve(self):
+        """Test Stock Driven Model with triangular solve for the inflow against the known results of the year-by-year computation."""
+        S_C, O_C, I = myDSM2_TS.compute_stock_driven_model(Solver = 'Triangular')
+        np.testing.assert_array_almost_equal(S_C, Stock_TC_FixedLT, 12)
+        np.testing.assert_array_almost_equal(O_C, Outflow_TC_FixedLT, 12)
+        np.testing.assert_array_almost_equal(I, Inflow_T_FixedLT, 12)
+        S_C, O_C, I = myDSM4_TS.compute_stock_driven_model(Solver = 'Triangular')
+        np.testing.assert_array_almost_equal(S_C, Stock_TC_NormLT, 8)
+        np.testing.assert_array_almost_equal(O_C, Outflow_TC_NormLT, 8)
+        np.testing.assert_array_almost_equal(I, Inflow_T_FixedLT, 8)
+        np.testing.assert_array_almost_equal(myDSM4_TS.compute_outflow_total(), Outflow_T_NormLT, 8)
+        np.testing.assert_array_almost_equal(myDSM4_TS.check_stock_balance(), Bal.transpose(), 12)
+        S_C, O_C, I = myDSMWB2_TS.compute_stock_driven_model(Solver = 'Triangular')
+        np.testing.assert_array_almost_equal(S_C, Stock_TC_WeibullLT, 8)
+        np.testing.assert_array_almost_equal(O_C, Outflow_TC_WeibullLT, 8)
+        np.testing.assert_array_almost_equal(I, Inflow_T_FixedLT, 8)
+        np.testing.assert_array_almost_equal(myDSM_ICF_TS.compute_stock_driven_model(Solver = 'Triangular')[2], InflowNeg_NoCorr, 12)
+        
+    def test_stock_driven_model_triangular_solve_lifetime_0(self):
+        """Test Stock Driven Model with triangular solve against year-by-year computation for cohort-dependent lifetime with lifetime 0 for some cohorts."""
+        myDSM_TV_Loop = self.new_dsm(t=Time_T_30, s=np.linspace(1,50,30), lt=lifetime_WeibullLT_TV)
+        myDSM_TV_TS = self.new_dsm(t=Time_T_30, s=np.linspace(1,50,30), lt=lifetime_WeibullLT_TV)
+        for Loop, TS in zip(myDSM_TV_Loop.compute_stock_driven_model(), myDSM_TV_TS.compute_stock_driven_model(Solver = 'Triangular')):
+            np.testing.assert_array_almost_equal(Loop, TS, 12)
+
+
+    def test_stock_driven_model_NegInflowCorrect_StockZero(self):
+        """Test Stock Driven Model with negative inflow correction for a stock that drops to 0 and recovers afterwards."""
+        myDSM_NIC_Zero = self.new_dsm(t=Time_T_30, s=Stock_NIC_Zero, lt=lifetime_NormLT8)
+        S_C_NIC_Zero, O_C_NIC_Zero, I_NIC_Zero = myDSM_NIC_Zero.compute_stock_driven_model(NegativeInflowCorrect = True)
+        myDSM_NIC_Zero.compute_outflow_total()
+        np.testing.assert_array_almost_equal(S_C_NIC_Zero.sum(axis =1), Stock_NIC_Zero, 12)
+        np.testing.assert_array_almost_equal(S_C_NIC_Zero[13,:], np.zeros(30), 12)
+        np.testing.assert_array_equal(I_NIC_Zero[10:14], np.zeros(4))
+        np.testing.assert_array_less(-1e-12, I_NIC_Zero)
+        np.testing.assert_array_almost_equal(myDSM_NIC_Zero.check_stock_balance(), Bal30.transpose(), 12)
+
+
+    def test_batch_stock_driven_model(self):
+        """Test batch of stock-driven models with one lifetime distribution per model against the known results for single models."""
+        S_C, O_C, I, O = myDSM_Batch_SD.compute_stock_driven_model()
+        np.testing.assert_array_almost_equal(S_C[0], Stock_TC_FixedLT, 12)
+        np.testing.assert_array_almost_equal(S_C[1], Stock_TC_NormLT, 8)
+        np.testing.assert_array_almost_equal(O_C[0], Outflow_TC_FixedLT, 12)
+        np.testing.assert_array_almost_equal(O_C[1], Outflow_TC_NormLT, 8)
+        np.testing.assert_array_almost_equal(I, np.array([Inflow_T_FixedLT, Inflow_T_FixedLT]), 8)
+        np.testing.assert_array_almost_equal(O, np.array([Outflow_T_FixedLT, Outflow_T_NormLT]), 8)
+        np.testing.assert_array_almost_equal(myDSM_Batch_SD.check_stock_balance(), np.zeros((2,10)), 12)
+        
+    def test_batch_stock_driven_model_NegInflowCorrect(self):
+        """Test batch of stock-driven models with shared lifetime distribution and negative inflow correction."""
+        S_C, O_C, I, O = myDSM_Batch_NIC.compute_stock_driven_model(NegativeInflowCorrect = True)
+        np.testing.assert_array_almost_equal(I, np.array([InflowNeg_WithCorr, InflowNeg_WithCorr]), 12)
+        np.testing.assert_array_almost_equal(myDSM_Batch_NIC.compute_stock_change(), np.array([StockChange_WithCorr, StockChange_WithCorr]), 12)
+        np.testing.assert_array_almost_equal(O, I - myDSM_Batch_NIC.compute_stock_change(), 12)
+        np.testing.assert_array_almost_equal(myDSM_Batch_NIC.check_stock_balance(), np.zeros((2,30)), 12)
+        
+    def test_batch_inflow_driven_model(self):
+        """Test batch of inflow-driven models against the known results for single models."""
+        S_C, O_C, S = myDSM_Batch_ID.compute_inflow_driven_model()
+        np.testing.assert_array_equal(S_C[0], Stock_TC_FixedLT)
+        np.testing.assert_array_almost_equal(S_C[1], Stock_TC_WeibullLT, 9)
+        np.testing.assert_array_almost_equal(O_C[1], Outflow_TC_WeibullLT, 9)
+        np.testing.assert_array_almost_equal(S, np.array([Stock_T_FixedLT, Stock_T_WeibullLT]), 8)
+        np.testing.assert_array_almost_equal(myDSM_Batch_ID.compute_outflow_total(), np.array([Outflow_T_FixedLT, Outflow_T_WeibullLT]), 9)
+
+
+    def test_stock_driven_model_band_fixedLifetime(self):
+        """Test Stock Driven Model in banded layout with Fixed product lifetime, truncated at the lifetime, against the known results."""
+        self.assertEqual(S_C_Band_Fixed.shape, (10, 5))
+        np.testing.assert_array_equal(dsm.band_to_dense(S_C_Band_Fixed), Stock_TC_FixedLT)
+        np.testing.assert_array_equal(O_C_Band_Fixed[:,0:5], np.zeros((10,5)))
+        np.testing.assert_array_equal(O_C_Band_Fixed[:,5], Outflow_T_FixedLT)
+        np.testing.assert_array_equal(I_Band_Fixed, Inflow_T_FixedLT)
+        np.testing.assert_array_equal(dsm.dense_to_band(Stock_TC_FixedLT, 5), S_C_Band_Fixed)
+        
+    def test_inflow_driven_model_band_WeibullDistLifetime(self):
+        """Test Inflow Driven Model in banded layout with Weibull-distributed product lifetime, without truncation, against the known results."""
+        np.testing.assert_array_almost_equal(dsm.band_to_dense(S_C_Band_WB), Stock_TC_WeibullLT, 9)
+        np.testing.assert_array_almost_equal(dsm.band_to_dense(myDSM_Band_WB.o_c_band[:,0:10]), Outflow_TC_WeibullLT, 9)
+        np.testing.assert_array_almost_equal(myDSM_Band_WB.s, Stock_T_WeibullLT, 8)
+        np.testing.assert_array_almost_equal(myDSM_Band_WB.o, Outflow_T_WeibullLT, 9)
+
+    def test_stock_driven_model_band_NegInflowCorrect(self):
+        """Test Stock Driven Model in banded layout with normally distributed product lifetime and negative inflow correction."""
+        np.testing.assert_array_almost_equal(myDSM_Band_NIC.compute_stock_driven_model_band(NegativeInflowCorrect = True)[2], InflowNeg_WithCorr, 12)
+        np.testing.assert_array_almost_equal(myDSM_Band_NIC.check_stock_balance(), Bal30.transpose(), 12)
+
+
+    def test_inflow_driven_model_lazy(self):
+        """Test Inflow Driven Model with normally distributed product lifetime and lazy cohort tables."""
+        S_C_Lazy = myDSM_Lazy_ID.compute_s_c_inflow_driven()
+        np.testing.assert_array_almost_equal(S_C_Lazy[4], Stock_TC_NormLT[4], 8)
+        np.testing.assert_array_almost_equal(S_C_Lazy[:,2], Stock_TC_NormLT[:,2], 8)
+        np.testing.assert_array_almost_equal(myDSM_Lazy_ID.compute_stock_total(), Stock_T_NormLT, 8)
+        myDSM_Lazy_ID.compute_o_c_from_s_c()
+        np.testing.assert_array_almost_equal(myDSM_Lazy_ID.compute_outflow_total(), Outflow_T_NormLT, 8)
+        self.assertIsNone(myDSM_Lazy_ID.sf)
+
+    def test_stock_driven_model_lazy(self):
+        """Test Stock Driven Model with Fixed product lifetime and lazy cohort tables."""
+        S_C_Lazy, O_C_Lazy, I_Lazy = myDSM_Lazy_SD.compute_stock_driven_model()
+        np.testing.assert_array_almost_equal(I_Lazy, Inflow_T_FixedLT, 9)
+        np.testing.assert_array_almost_equal(np.asarray(S_C_Lazy), Stock_TC_FixedLT, 9)
+        np.testing.assert_array_almost_equal(O_C_Lazy.toarray(), Outflow_TC_FixedLT, 9)
+        self.assertIsNone(myDSM_Lazy_SD.sf)
+
+    def test_stock_driven_model_lazy_memory(self):
+        """Test that the lazy Stock Driven Model does not allocate a table of years x age-cohorts."""
+        myDSM_Lazy_Large = dsm.DynamicStockModel(t=np.arange(0, 1000), s=np.linspace(1, 100, 1000), lt={'Type': 'Normal', 'Mean': np.array([8]), 'StdDev': np.array([3])}, lazy=True)
+        tracemalloc.start()
+        myDSM_Lazy_Large.compute_stock_driven_model(NegativeInflowCorrect = True)
+        Peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.assertLess(Peak, 1000 * 1000 * 8 / 10) # one tenth of a table in float64
+
+    def test_stock_driven_model_lazy_NegInflowCorrect(self):
+        """Test Stock Driven Model with normally distributed product lifetime, negative inflow correction, and lazy cohort tables."""
+        S_C_Lazy, O_C_Lazy, I_Lazy = myDSM_Lazy_NIC.compute_stock_driven_model(NegativeInflowCorrect = True)
+        np.testing.assert_array_almost_equal(I_Lazy, InflowNeg_WithCorr, 9)
+        np.testing.assert_array_almost_equal(S_C_Lazy.sum(axis=1), Stock_SDM_NegInflow_NormLT, 9)
+        myDSM_Lazy_NIC.compute_stock_total()
+        myDSM_Lazy_NIC.compute_outflow_total()
+        np.testing.assert_array_almost_equal(myDSM_Lazy_NIC.check_stock_balance(), Bal30.transpose(), 9)
+
+
+    def test_stock_driven_model_append_years(self):
+        """Test Stock Driven Model with Fixed product lifetime, extended year by year."""
+        myDSM_Append = self.new_dsm(t=Time_T_FixedLT[0:6], s=Stock_T_FixedLT[0:6], lt={'Type': 'Fixed', 'Mean': np.array([5])})
+        myDSM_Append.compute_stock_driven_model()
+        myDSM_Append.append_years(Stock_T_FixedLT[6:9])
+        S_C_Append, O_C_Append, I_Append = myDSM_Append.advance(Stock_T_FixedLT[9])
+        self.assertIs(S_C_Append.base, myDSM_Append.buffers['s_c']) # the 10th year is written into the spare capacity left by append_years
+        self.assertEqual(myDSM_Append.buffers['s_c'].shape, (12, 12))
+        np.testing.assert_array_equal(myDSM_Append.t, Time_T_FixedLT)
+        np.testing.assert_array_almost_equal(I_Append, Inflow_T_FixedLT, 9)
+        np.testing.assert_array_almost_equal(S_C_Append, Stock_TC_FixedLT, 9)
+        np.testing.assert_array_almost_equal(O_C_Append, Outflow_TC_FixedLT, 9)
+
+    def test_stock_driven_model_append_years_NegInflowCorrect(self):
+        """Test Stock Driven Model with normally distributed product lifetime and negative inflow correction, extended by ten years."""
+        myDSM_Append_NIC = self.new_dsm(t=Time_T_30[0:20], s=Stock_SDM_NegInflow_NormLT[0:20], lt={'Type': 'Normal', 'Mean': np.array([8]), 'StdDev': np.array([3])})
+        myDSM_Append_NIC.compute_stock_driven_model(NegativeInflowCorrect = True)
+        myDSM_Append_NIC.append_years(Stock_SDM_NegInflow_NormLT[20::], NegativeInflowCorrect = True)
+        np.testing.assert_array_almost_equal(myDSM_Append_NIC.i, InflowNeg_WithCorr, 9)
+        np.testing.assert_array_almost_equal(myDSM_Append_NIC.s_c.sum(axis=1), Stock_SDM_NegInflow_NormLT, 9)
+        myDSM_Append_NIC.compute_outflow_total()
+        np.testing.assert_array_almost_equal(myDSM_Append_NIC.check_stock_balance(), Bal30.transpose(), 9)
+
+    def test_stock_driven_model_append_years_shared_lifetime(self):
+        """Test that extending a Stock Driven Model with new lifetime parameters leaves another model with the same lifetime dictionary unchanged."""
+        Lifetime_Shared = {'Type': 'Weibull', 'Shape': np.full(20, 3.5), 'Scale': np.full(20, 10.)}
+        myDSM_Shared_A = dsm.DynamicStockModel(t=Time_T_30[0:20], s=Stock_SDM_NegInflow_NormLT[0:20], lt=Lifetime_Shared, backend=self.backend)
+        myDSM_Shared_B = dsm.DynamicStockModel(t=Time_T_30[0:20], s=Stock_SDM_NegInflow_NormLT[0:20], lt=Lifetime_Shared, backend=self.backend)
+        myDSM_Shared_A.compute_stock_driven_model(NegativeInflowCorrect = True)
+        myDSM_Shared_B.compute_stock_driven_model(NegativeInflowCorrect = True)
+        myDSM_Shared_A.append_years(Stock_SDM_NegInflow_NormLT[20:21], NegativeInflowCorrect = True, lt_new = {'Scale': 5.})
+        self.assertEqual(len(Lifetime_Shared['Scale']), 20)
+        self.assertIs(myDSM_Shared_B.lt, Lifetime_Shared)
+        myDSM_Shared_B.append_years(Stock_SDM_NegInflow_NormLT[20::], NegativeInflowCorrect = True)
+        myDSM_Shared_Ref = dsm.DynamicStockModel(t=Time_T_30, s=Stock_SDM_NegInflow_NormLT, lt={'Type': 'Weibull', 'Shape': np.full(30, 3.5), 'Scale': np.full(30, 10.)})
+        myDSM_Shared_Ref.compute_stock_driven_model(NegativeInflowCorrect = True)
+        np.testing.assert_array_almost_equal(myDSM_Shared_B.s_c, myDSM_Shared_Ref.s_c, 9)
+        np.testing.assert_array_almost_equal(myDSM_Shared_B.i, myDSM_Shared_Ref.i, 9)
+
+
+    def test_inflow_driven_model_convolution(self):
+        """Test Inflow Driven Model with stock and outflow determined by convolution."""
+        myDSM_Conv_WB   = dsm.DynamicStockModel(t=Time_T_FixedLT, i=Inflow_T_FixedLT, lt=lifetime_WeibullLT)
+        myDSM_Conv_Norm = dsm.DynamicStockModel(t=Time_T_FixedLT, i=Inflow_T_FixedLT, lt=lifetime_NormLT)
+        for Method in ['direct', 'fft']:
+            np.testing.assert_array_almost_equal(myDSM_Conv_WB.compute_inflow_driven_model(Method = Method)[0], Stock_TC_WeibullLT.sum(axis=1), 9)
+            np.testing.assert_array_almost_equal(myDSM_Conv_WB.compute_inflow_driven_model(Method = Method)[1], Outflow_T_WeibullLT, 9)
+            np.testing.assert_array_almost_equal(myDSM_Conv_Norm.compute_inflow_driven_model(Method = Method)[0], Stock_T_NormLT, 8)
+            np.testing.assert_array_almost_equal(myDSM_Conv_Norm.compute_inflow_driven_model(Method = Method)[1], Outflow_T_NormLT, 8)
+        self.assertIsNone(myDSM_Conv_WB.s_c)
+        np.testing.assert_array_almost_equal(myDSM_Conv_WB.compute_inflow_driven_model(CohortDetail = True)[1], Outflow_T_WeibullLT, 9)
+        np.testing.assert_array_almost_equal(myDSM_Conv_WB.s_c, Stock_TC_WeibullLT, 9)
+
+
+    def test_sweep_lifetimes(self):
+        """Test Stock Driven Model with negative inflow correction for a grid of Weibull lifetime parameters."""
+        I_Sweep, O_Sweep, S_C_Sweep = myDSM_Sweep.sweep_lifetimes(Sweep_Shapes[:,np.newaxis], Sweep_Scales[np.newaxis,:], Years = [10, 29], NegativeInflowCorrect = True)
+        self.assertEqual(S_C_Sweep.shape, (2, 3, 2, 30))
+        for m in range(0,2):
+            for n in range(0,3):
+                np.testing.assert_array_almost_equal(I_Sweep[m,n], Sweep_Ref[m][n].i, 9)
+                np.testing.assert_array_almost_equal(O_Sweep[m,n], Sweep_Ref[m][n].o, 9)
+                np.testing.assert_array_almost_equal(S_C_Sweep[m,n], Sweep_Ref[m][n].s_c[[10,29],:], 9)
+
+
+    def test_stock_driven_model_sensitivity(self):
+        """Test derivatives of the inflow of the Stock Driven Model with negative inflow correction with respect to the Weibull parameters."""
+        myDSM_Sens_SD = self.new_dsm(t=Time_T_30, s=Stock_SDM_NegInflow_NormLT.copy(), lt=lifetime_Weibull_Sens(2.5, 8))
+        Sensitivity = myDSM_Sens_SD.compute_stock_driven_model_sensitivity(NegativeInflowCorrect = True)[3]
+        for Parameter in ['Shape', 'Scale']:
+            np.testing.assert_array_almost_equal(Sensitivity[Parameter]['i'], Sens_FD_SD[Parameter], 5)
+            np.testing.assert_array_almost_equal(Sensitivity[Parameter]['s'], np.zeros(30), 9)
+            np.testing.assert_array_almost_equal(Sensitivity[Parameter]['o'], Sensitivity[Parameter]['i'], 9)
+
+    def test_inflow_driven_model_sensitivity(self):
+        """Test derivatives of the stock of the Inflow Driven Model with respect to the Weibull parameters."""
+        Sensitivity = myDSM_Sens_ID.compute_s_c_inflow_driven_sensitivity()[1]
+        for Parameter in ['Shape', 'Scale']:
+            np.testing.assert_array_almost_equal(Sensitivity[Parameter]['s'], Sens_FD_ID[Parameter], 5)
+            np.testing.assert_array_almost_equal(Sensitivity[Parameter]['o'], -1 * np.diff(Sensitivity[Parameter]['s'], prepend=0), 9)
+
+
+    def test_initial_stock_segments(self):
+        """Test inflow from initial stock and evolution of initial stock for several segments at once."""
+        np.testing.assert_array_equal(TestInflow_X_2D, np.array([Inflow_X, 2 * Inflow_X]))
+        S_C_Evo_1D = myDSM_Evo_1D.compute_evolution_initialstock(InitialStock=Stock_TC_NormLT[5,0:5], SwitchTime=5)
+        S_C_Evo_2D = myDSM_Evo_2D.compute_evolution_initialstock(InitialStock=np.array([Stock_TC_NormLT[5,0:5], 0.5 * Stock_TC_NormLT[5,0:5]]), SwitchTime=5)
+        np.testing.assert_array_almost_equal(S_C_Evo_1D[5::,0:5], Stock_TC_NormLT[5::,0:5], 8)
+        np.testing.assert_array_equal(S_C_Evo_2D[0], S_C_Evo_1D)
+        np.testing.assert_array_almost_equal(S_C_Evo_2D[1], 0.5 * S_C_Evo_1D, 12)
+
+
+    def test_kernel_stock_driven(self):
+        """Test compute kernel of the Stock Driven Model with negative inflow correction, evaluated as plain Python function."""
+        SF_Kernel = dsm.DynamicStockModel(t=Time_T_30, lt=lifetime_NormLT8).compute_sf()
+        I_Kernel, Factor_Kernel = np.zeros(30), np.ones(30)
+        I_Kernel[0] = Stock_SDM_NegInflow_NormLT[0] / SF_Kernel[0,0]
+        dsm.kernel_stock_driven(np.asarray(Stock_SDM_NegInflow_NormLT, dtype=float), SF_Kernel, I_Kernel, Factor_Kernel, 1, True)
+        np.testing.assert_array_almost_equal(I_Kernel, InflowNeg_WithCorr, 9)
+
+    def test_save_load(self):
+        """Test that a Stock Driven Model saved to disk is reopened with the same results, with and without memory mapping."""
+        myDSM_Save = dsm.DynamicStockModel(t=Time_T_30, s=Stock_SDM_NegInflow_NormLT, lt=lifetime_NormLT8, name='NIC', backend=self.backend)
+        myDSM_Save.compute_stock_driven_model(NegativeInflowCorrect = True)
+        myDSM_Save.o = myDSM_Save.compute_outflow_total()
+        with tempfile.TemporaryDirectory() as SaveDir:
+            myDSM_Save.save(SaveDir)
+            for MMap in [True, False]:
+                myDSM_Load = dsm.DynamicStockModel.load(SaveDir, mmap = MMap)
+                self.assertEqual(myDSM_Load.name, 'NIC')
+                self.assertEqual(isinstance(myDSM_Load.s_c, np.memmap), MMap)
+                for ThisVar in ['t', 'i', 's', 'o', 's_c', 'o_c']:
+                    np.testing.assert_array_equal(getattr(myDSM_Load, ThisVar), getattr(myDSM_Save, ThisVar))
+                np.testing.assert_array_equal(myDSM_Load.lt['StdDev'], lifetime_NormLT8['StdDev'])
+                np.testing.assert_array_almost_equal(myDSM_Load.compute_sf(), myDSM_Save.compute_sf(), 12)
+                del myDSM_Load # release the memory-mapped files before the directory is removed
+
+    def test_profiling(self):
+        """Test that the profile counts the calls of the public methods while profiling is on, and that the methods are restored afterwards."""
+        Original_Method = dsm.DynamicStockModel.compute_stock_driven_model
+        with dsm.profiling() as Profile:
+            myDSM_Profile = dsm.DynamicStockModel(t=Time_T_30, s=Stock_SDM_NegInflow_NormLT, lt=lifetime_NormLT8, backend=self.backend)
+            myDSM_Profile.compute_stock_driven_model(NegativeInflowCorrect = True)
+            myDSM_Profile.compute_stock_driven_model(NegativeInflowCorrect = True)
+        myDSM_Profile.compute_stock_driven_model(NegativeInflowCorrect = True)
+        self.assertIs(dsm.DynamicStockModel.compute_stock_driven_model, Original_Method)
+        self.assertEqual(Profile['compute_stock_driven_model'][0], 2)
+        self.assertEqual(Profile['compute_stock_driven_model'][2], 2 * (2 * 30 * 30 * 8 + 30 * 8)) # twice s_c and o_c (30 x 30), and i (30), in bytes
+        Summary = dsm.profile_summary()
+        self.assertEqual(Summary[0]['method'], 'compute_stock_driven_model')
+        self.assertIn('compute_negative_inflow_correct', dsm.profile_report())
+
+    def test_dtype_float32(self):
+        """Test the Stock Driven Model with negative inflow correction with cohort tables stored in float32 against float64."""
+        myDSM_32 = dsm.DynamicStockModel(t=Time_T_30, s=Stock_SDM_NegInflow_NormLT, lt=lifetime_NormLT8, dtype=np.float32, backend=self.backend)
+        S_C_32, O_C_32, I_32 = myDSM_32.compute_stock_driven_model(NegativeInflowCorrect = True)
+        self.assertEqual((myDSM_32.sf.dtype, myDSM_32.pdf.dtype, S_C_32.dtype, O_C_32.dtype), (np.dtype(np.float32),) * 4)
+        np.testing.assert_allclose(I_32, InflowNeg_WithCorr, rtol=1e-5, atol=1e-6)
+        myDSM_32.compute_outflow_total()
+        self.assertEqual(myDSM_32.o.dtype, np.float64)
+        Balance, Tolerance = myDSM_32.check_stock_balance(ReportPrecision = True)
+        self.assertTrue((np.abs(Balance) <= Tolerance).all())
+        self.assertTrue(Tolerance.max() > 1e-7)
+        with self.assertRaises(ValueError):
+            dsm.DynamicStockModel(t=Time_T_30, dtype=np.int32)
+
+    def test_sparse_fixedLifetime(self):
+        """Test Stock Driven and Inflow Driven Model with Fixed product lifetime and sparse storage against the known results."""
+        myDSM_Sparse = dsm.DynamicStockModel(t=Time_T_FixedLT, s=Stock_T_FixedLT, lt=lifetime_FixedLT, sparse_threshold=0.5)
+        S_C_Sparse, O_C_Sparse, I_Sparse = myDSM_Sparse.compute_stock_driven_model(NegativeInflowCorrect = True)
+        self.assertTrue(scipy.sparse.issparse(myDSM_Sparse.sf) and scipy.sparse.issparse(S_C_Sparse) and scipy.sparse.issparse(O_C_Sparse))
+        self.assertEqual(O_C_Sparse.nnz, 5) # one outflow per age-cohort that leaves within the time frame
+        np.testing.assert_array_equal(S_C_Sparse.toarray(), Stock_TC_FixedLT)
+        np.testing.assert_array_equal(O_C_Sparse.toarray(), Outflow_TC_FixedLT)
+        np.testing.assert_array_equal(I_Sparse, Inflow_T_FixedLT)
+        np.testing.assert_array_equal(myDSM_Sparse.compute_outflow_total(), Outflow_T_FixedLT)
+        myDSM_Sparse_Inflow = dsm.DynamicStockModel(t=Time_T_FixedLT, i=Inflow_T_FixedLT, lt=lifetime_FixedLT, sparse_threshold=0.5)
+        np.testing.assert_array_equal(myDSM_Sparse_Inflow.compute_s_c_inflow_driven().toarray(), Stock_TC_FixedLT)
+        np.testing.assert_array_equal(myDSM_Sparse_Inflow.compute_o_c_from_s_c().toarray(), Outflow_TC_FixedLT)
+        np.testing.assert_array_equal(myDSM_Sparse_Inflow.compute_stock_total(), Stock_T_FixedLT)
+        np.testing.assert_array_equal(myDSM_Sparse_Inflow.compute_outflow_pdf().toarray(), dsm.DynamicStockModel(t=Time_T_FixedLT, lt=lifetime_FixedLT).compute_outflow_pdf())
+        with tempfile.TemporaryDirectory() as SaveDir:
+            myDSM_Sparse.save(SaveDir)
+            np.testing.assert_array_equal(dsm.DynamicStockModel.load(SaveDir).o_c.toarray(), Outflow_TC_FixedLT)
+
+
+@unittest.skipIf(dsm.numba is None, 'optional package numba is not installed')
+class KnownResultsNumbaTestCase(KnownResultsTestCase):
+    """Same known results with the compiled year-by-year computation of the backend 'numba'."""
+
+    backend = 'numba'
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,28 +1,35 @@
 # Dynamic stock model (DSM) for US building stock
+#
+# Run as a script (python dsm_scenario.py [--no-plots]) to compute the floor area models of all SSP scenarios,
+#   or import the functions, e.g. calc_MFA, without side effects. Input data are read on first use,
+#   and matplotlib and seaborn are only imported when plotting is requested.
 
 # Import libraries
+import argparse
+import functools
+import os
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from scipy.interpolate import interp1d
 from odym import dynamic_stock_model as dsm
-from scipy import stats
+from lifetime_calibration import weighted_quantile, weighted_ks_2samp, weighted_describe
+import lifetime_calibration
 
-# Load in datasets
-data_pop_WiC = pd.read_excel('./InputData/Pop_Data.xlsx', sheet_name='US_pop_WiC')
-data_pop_UN = pd.read_excel('./InputData/Pop_Data.xlsx', sheet_name='US_pop_UN')
-data_gdp = pd.read_excel('./InputData/Pop_Data.xlsx', sheet_name='GDP_pc')
-RECS_Weights = pd.read_excel('./InputData/Pop_Data.xlsx', sheet_name='res_weight')
-CBECS_Weights = pd.read_excel('./InputData/Pop_Data.xlsx', sheet_name='com_weight')
+# Load data (US_pop_WiC, US_pop_UN, GDP_pc, res_weight, com_weight)
+@functools.lru_cache(maxsize=None)
+def read_input_data(sheet_name, path='./InputData/Pop_Data.xlsx'):
+    """ Sheet of the input data, read once per process."""
+    return pd.read_excel(path, sheet_name=sheet_name)
 
 
 # function to interpolate the population data
-def interpolate_population(data_pop=data_pop_UN, data_source='UN', year1=1900, year2=2100, proj='median', kind='cubic', plot=True):
+def interpolate_population(data_pop=None, data_source='UN', year1=1900, year2=2100, proj='median', kind='cubic', plot=True):
     """ Interpolate the population data between the specified years for the US.
         Choose a data source (UN, or WiC)
         Choose a scenario for future population data (median, upper_95, lower_95, upper_80, or lower_80).
         Options for 'kind' are [linear, cubic, nearest, previous, and next] """
+    if data_pop is None:
+        data_pop = read_input_data('US_pop_UN')
     if data_source=='UN':
         # Create interpolations for population
         f_median = interp1d(data_pop.Year, data_pop.Median, kind=kind)
@@ -52,6 +59,7 @@ def interpolate_population(data_pop=data_pop_UN, data_source='UN', year1=1900, y
                                      'US_pop': US_pop})
 
         if plot == True:
+            import matplotlib.pyplot as plt
             # Plot of population forecasts
             plt1, = plt.plot(years, f_upper_95(years))
             plt2, = plt.plot(years, f_upper_80(years))
@@ -112,6 +120,7 @@ def interpolate_population(data_pop=data_pop_UN, data_source='UN', year1=1900, y
 
 
         if plot == True:
+            import matplotlib.pyplot as plt
             # Plot of population forecasts
             plt1, = plt.plot(years, f_SSP1(years))
             plt2, = plt.plot(years, f_SSP2(years))
@@ -169,6 +178,7 @@ def interpolate_gdp(data_gdp, year1=1900, year2=2100, SSP='SSP1', kind='cubic',
     US_gdp_years = pd.concat([years_df, US_gdp], axis=1)
 
     if plot == True:
+        import matplotlib.pyplot as plt
         # Plot of population forecasts
         plt1, = plt.plot(years, f_SSP1(years))
         plt2, = plt.plot(years, f_SSP2(years))
@@ -202,6 +212,7 @@ def FA_elasticity_linear(year1=1900, year2=2100, base_year=2016,
                             'FA_elas': np.concatenate((FA_historic, FA_future), axis=0)
                             }, )
     if plot == True:
+        import matplotlib.pyplot as plt
         # Plot of population forecasts
         plt1, = plt.plot(FA_elas.Year, FA_elas.FA_elas)
         plt2, = plt.plot([base_year, base_year], [0, 300], color='k', LineStyle='--')
@@ -214,104 +225,82 @@ def FA_elasticity_linear(year1=1900, year2=2100, base_year=2016,
 # function to calculate the floor area elasticity by the methodology of the EDGE model
 def FA_elasticity_EDGE(US_gdp, US_pop, SSP='All',
                        base_year=2016,FA_base_year=246, Area_country=9.14759e6, gamma=-0.03,
-                       plot=True):
+                       Beta=0.42, Beta_SSP=None, tidy=False, plot=True):
     """ Area of the USA is 9.834 million km².
-        Base year floor are elasticity for all buildings is 347 m2/person as determined by article (in review)"""
-
-    def calc_FA_elas(gdp, SSP, SSP_split_year=1985):
-        # Beta values for each SSP
+        Base year floor are elasticity for all buildings is 347 m2/person as determined by article (in review)
+        SSP is one SSP, a list of SSPs, or 'All'; only the requested SSPs are computed, as one (SSP, year) array.
+        Up to the base year FA = alpha * gdp^Beta * Pop_Dens^gamma, with alpha such that FA = FA_base_year in the base year,
+        after the base year FA_t = FA_t-1 * (gdp_t/gdp_t-1)^Beta_SSP * (Pop_Dens_t/Pop_Dens_t-1)^gamma, as a cumulative product.
+        Returns a DataFrame indexed by Year with the columns US_pop_, US_gdp_, FA_ of each SSP
+        (for one SSP: US_pop_, gdp_, Pop_Dens_, FA_elas_), or with tidy=True a long DataFrame with one row per (SSP, Year)."""
+
+    # Beta values for each SSP
+    if Beta_SSP is None:
         Beta_SSP = {'SSP1': 0.3,
                     'SSP2': 0.7,
                     'SSP3': 0.8,
                     'SSP4': 0.7,
                     'SSP5': 1.0}
-        # General Beta for floor space demand:
-        Beta = 0.42
-
-        FA_df = pd.merge(US_pop, gdp, on='Year')
-        FA_df = FA_df.set_index('Year', drop=False)
-
-        # calculate historical FA
-        FA_df['Pop_Dens_'+SSP] = FA_df['US_pop_'+SSP] / Area_country
-        base_year_0_df = FA_df.loc[[base_year]]
-        alpha  = FA_base_year / (base_year_0_df['gdp_'+SSP] ** Beta * base_year_0_df['Pop_Dens_'+SSP] ** gamma)
-        # alpha reported by EDGE model is 0.61.
-        # alpha from Arehart et al. 2020 high   = 5.002223
-        #                                median = 4.350305
-        #                                low    = 3.635701
-        # print('Alpha is = ' + str(alpha))
-
-        FA_df.loc[FA_df['Year'] <= base_year, 'FA_elas_'+SSP] = alpha[base_year] * (FA_df['gdp_'+SSP] ** Beta) * FA_df['Pop_Dens_'+SSP] ** gamma
-        for i in range(1,len(FA_df)):
-            year_i = FA_df.index[i]
-            if year_i > base_year:
-                row_t_1 = FA_df.loc[year_i-1]
-                FA_t_1 = row_t_1['FA_elas_'+SSP]
-                I_t_1 = row_t_1['gdp_'+SSP]
-                D_t_1 = row_t_1['Pop_Dens_'+SSP]
-                row_t = FA_df.loc[year_i]
-                I_t = row_t['gdp_'+SSP]
-                D_t = row_t['Pop_Dens_'+SSP]
-                FA_df.loc[int(year_i),'FA_elas_'+SSP] = FA_t_1 * (I_t/I_t_1) ** Beta_SSP[SSP] * (D_t/D_t_1) ** gamma
-        return FA_df
-
-    FA_SSP1 = calc_FA_elas(US_gdp, 'SSP1')
-    FA_SSP2 = calc_FA_elas(US_gdp, 'SSP2')
-    FA_SSP3 = calc_FA_elas(US_gdp, 'SSP3')
-    FA_SSP4 = calc_FA_elas(US_gdp, 'SSP4')
-    FA_SSP5 = calc_FA_elas(US_gdp, 'SSP5')
-
-    if SSP=='SSP1':
-        df_return = FA_SSP1
-    elif SSP=='SSP2':
-        df_return = FA_SSP2
-    elif SSP=='SSP3':
-        df_return = FA_SSP3
-    elif SSP=='SSP4':
-        df_return = FA_SSP4
-    elif SSP=='SSP5':
-        df_return = FA_SSP5
-    elif SSP=='All':
-        df_return = pd.DataFrame({'Year': FA_SSP1['Year'],
-                                  'US_pop_SSP1': FA_SSP1['US_pop_SSP1'],
-                                  'US_pop_SSP2': FA_SSP2['US_pop_SSP2'],
-                                  'US_pop_SSP3': FA_SSP3['US_pop_SSP3'],
-                                  'US_pop_SSP4': FA_SSP4['US_pop_SSP4'],
-                                  'US_pop_SSP5': FA_SSP5['US_pop_SSP5'],
-                                  'US_gdp_SSP1': FA_SSP1['gdp_SSP1'],
-                                  'US_gdp_SSP2': FA_SSP2['gdp_SSP2'],
-                                  'US_gdp_SSP3': FA_SSP3['gdp_SSP3'],
-                                  'US_gdp_SSP4': FA_SSP4['gdp_SSP4'],
-                                  'US_gdp_SSP5': FA_SSP5['gdp_SSP5'],
-                                  'FA_SSP1': FA_SSP1['FA_elas_SSP1'],
-                                  'FA_SSP2': FA_SSP2['FA_elas_SSP2'],
-                                  'FA_SSP3': FA_SSP3['FA_elas_SSP3'],
-                                  'FA_SSP4': FA_SSP4['FA_elas_SSP4'],
-                                  'FA_SSP5': FA_SSP5['FA_elas_SSP5'], })
+    # General Beta for floor space demand: Beta
+    if SSP == 'All':
+        SSP_list = ['SSP1', 'SSP2', 'SSP3', 'SSP4', 'SSP5']
+    elif isinstance(SSP, str):
+        SSP_list = [SSP]
+    else:
+        SSP_list = list(SSP)
+
+    FA_df = pd.merge(US_pop[['Year'] + ['US_pop_' + x for x in SSP_list]],
+                     US_gdp[['Year'] + ['gdp_' + x for x in SSP_list]], on='Year')
+    Years = FA_df['Year'].values
+    pop = FA_df[['US_pop_' + x for x in SSP_list]].values.T     # (SSP, year)
+    gdp = FA_df[['gdp_' + x for x in SSP_list]].values.T
+    pop_dens = pop / Area_country
+    beta_SSP = np.array([Beta_SSP[x] for x in SSP_list])[:, np.newaxis]
+
+    # calculate historical FA
+    base = np.flatnonzero(Years == base_year)[0]
+    alpha = FA_base_year / (gdp[:, base] ** Beta * pop_dens[:, base] ** gamma)
+    # alpha reported by EDGE model is 0.61.
+    # alpha from Arehart et al. 2020 high   = 5.002223
+    #                                median = 4.350305
+    #                                low    = 3.635701
+    FA = np.empty_like(gdp)
+    FA[:, 0:base + 1] = alpha[:, np.newaxis] * gdp[:, 0:base + 1] ** Beta * pop_dens[:, 0:base + 1] ** gamma
+    # future FA: cumulative product of the yearly growth of gdp and population density from the base year
+    growth = (gdp[:, base + 1:] / gdp[:, base:-1]) ** beta_SSP * (pop_dens[:, base + 1:] / pop_dens[:, base:-1]) ** gamma
+    FA[:, base + 1:] = FA[:, [base]] * np.cumprod(growth, axis=1)
+
+    if tidy == True:
+        return pd.DataFrame({'Year': np.tile(Years, len(SSP_list)),
+                             'SSP': np.repeat(SSP_list, len(Years)),
+                             'US_pop': pop.ravel(),
+                             'US_gdp': gdp.ravel(),
+                             'Pop_Dens': pop_dens.ravel(),
+                             'FA_elas': FA.ravel()})
+    if len(SSP_list) == 1:
+        x = SSP_list[0]
+        df_return = pd.DataFrame({'Year': Years, 'US_pop_' + x: pop[0], 'gdp_' + x: gdp[0],
+                                  'Pop_Dens_' + x: pop_dens[0], 'FA_elas_' + x: FA[0]}, index=pd.Index(Years, name='Year'))
+    else:
+        df_return = pd.concat([pd.DataFrame({'Year': Years}),
+                               pd.DataFrame(pop.T, columns=['US_pop_' + x for x in SSP_list]),
+                               pd.DataFrame(gdp.T, columns=['US_gdp_' + x for x in SSP_list]),
+                               pd.DataFrame(FA.T, columns=['FA_' + x for x in SSP_list])], axis=1)
+        df_return.index = pd.Index(Years, name='Year')
 
         if plot == True:
+            import matplotlib.pyplot as plt
             # Plot GFA vs time.
-            max_GFA = max(FA_SSP1.FA_elas_SSP1.max(), FA_SSP2.FA_elas_SSP2.max(), FA_SSP3.FA_elas_SSP3.max(), FA_SSP4.FA_elas_SSP4.max(), FA_SSP5.FA_elas_SSP5.max())
-            plt1, = plt.plot(df_return.index, df_return.FA_SSP1)
-            plt2, = plt.plot(df_return.index, df_return.FA_SSP2)
-            plt3, = plt.plot(df_return.index, df_return.FA_SSP3)
-            plt4, = plt.plot(df_return.index, df_return.FA_SSP4)
-            plt5, = plt.plot(df_return.index, df_return.FA_SSP5)
-            plt6, = plt.plot([base_year, base_year], [0, max_GFA], color='k', LineStyle='--')
-            plt.legend([plt1, plt2, plt3, plt4, plt5],
-                       ['SSP1', 'SSP2', 'SSP3', 'SSP4', 'SSP5'], loc=2)
+            plts = [plt.plot(df_return.index, df_return['FA_' + x])[0] for x in SSP_list]
+            plt6, = plt.plot([base_year, base_year], [0, FA.max()], color='k', LineStyle='--')
+            plt.legend(plts, SSP_list, loc=2)
             plt.xlabel('Year')
             plt.ylabel('Floor Area Elasticity')
             plt.title('Floor Area Elasticity for various SSPs')
             plt.show();
             # Plot GFA vs GDP.
-            plt1, = plt.plot(df_return.US_gdp_SSP1, df_return.FA_SSP1)
-            plt2, = plt.plot(df_return.US_gdp_SSP2, df_return.FA_SSP2)
-            plt3, = plt.plot(df_return.US_gdp_SSP3, df_return.FA_SSP3)
-            plt4, = plt.plot(df_return.US_gdp_SSP4, df_return.FA_SSP4)
-            plt5, = plt.plot(df_return.US_gdp_SSP5, df_return.FA_SSP5)
-            plt.legend([plt1, plt2, plt3, plt4, plt5],
-                       ['SSP1', 'SSP2', 'SSP3', 'SSP4', 'SSP5'], loc=2)
+            plts = [plt.plot(df_return['US_gdp_' + x], df_return['FA_' + x])[0] for x in SSP_list]
+            plt.legend(plts, SSP_list, loc=2)
             plt.xlabel('GDP')
             plt.ylabel('Floor Area Elasticity')
             plt.title('Floor Area Elasticity for various SSPs')
@@ -333,27 +322,38 @@ year1 = 1820
 year2 = 2100
 base_year = 2016
 
-# interpolate population data for the US.
-years, US_pop = interpolate_population(data_pop=data_pop_WiC, data_source='WiC', year1=year1, year2=year2, proj='All', plot=True)
+# Population, gdp, and floor area elasticity of all SSPs, computed once per process by scenario_inputs()
+scenario_data = {}
 
-# interpolate gdp data for the US.
-US_gdp = interpolate_gdp(data_gdp, year1=year1, year2=year2, SSP='All', kind='cubic', plot=True)
-# calculate total floor area elasticity
-FA_all = FA_elasticity_EDGE(US_gdp, US_pop, SSP='All',
-                       base_year=2016,FA_base_year=246, Area_country=8081867, gamma=-0.03,
-                       plot=True)      # area of continguous 48 = 8081867, area of all = 9833517
+def scenario_inputs(plot=False):
+    """ Returns years, US_pop, US_gdp, and the floor area elasticity FA_all of all SSPs (cf. calc_MFA).
+        The inputs are computed on the first call and cached in scenario_data."""
+    if len(scenario_data) == 0:
+        # interpolate population data for the US.
+        years, US_pop = interpolate_population(data_pop=read_input_data('US_pop_WiC'), data_source='WiC', year1=year1, year2=year2, proj='All', plot=plot)
 
+        # interpolate gdp data for the US.
+        US_gdp = interpolate_gdp(read_input_data('GDP_pc'), year1=year1, year2=year2, SSP='All', kind='cubic', plot=plot)
+        # calculate total floor area elasticity
+        FA_all = FA_elasticity_EDGE(US_gdp, US_pop, SSP='All',
+                               base_year=2016,FA_base_year=246, Area_country=8081867, gamma=-0.03,
+                               plot=plot)      # area of continguous 48 = 8081867, area of all = 9833517
 
-US_pop = US_pop.set_index('Year', drop=False)
-US_gdp = US_gdp.set_index('Year', drop=False)
+        US_pop = US_pop.set_index('Year', drop=False)
+        US_gdp = US_gdp.set_index('Year', drop=False)
+        scenario_data.update({'years': years, 'US_pop': US_pop, 'US_gdp': US_gdp, 'FA_all': FA_all})
+    return scenario_data['years'], scenario_data['US_pop'], scenario_data['US_gdp'], scenario_data['FA_all']
 
 
 # ratio of residential floor area to total floor area:
 ratio_res = 0.773497
 ratio_com = 0.142467
 ratio_pub = 0.030018
+# floor area ratio of each occupancy, for calc_MFA_matrix
+occupancy_ratios = {'res': ratio_res, 'com': ratio_com, 'pub': ratio_pub}
 
 def plot_dsm(dsm, plot_name):
+    import matplotlib.pyplot as plt
     plt.subplot(211)
     max_val = dsm.s.max()
     plt2, = plt.plot(dsm.t, dsm.s)
@@ -419,7 +419,7 @@ def generate_lt(type, par1, par2):
     # BldgLife_StdDev_pub = 0.2 * np.array([BldgLife_mean_com] * len(years))
     if type=='Normal':
         # Normal
-        lt = {'Type': type, 'Mean': np.array([par1] * len(years)), 'StdDev': par2}
+        lt = {'Type': type, 'Mean': np.array([par1] * (year2 - year1 + 1)), 'StdDev': par2}
     elif type=='Weibull':
         # Weibull
         # lt_res = {'Type': 'Weibull', 'Shape': np.array([4.16343417]), 'Scale': np.array([85.18683893])}     # deetman_2018_res_distr_weibull
@@ -442,7 +442,9 @@ lt_pub = generate_lt('Weibull',par1=6.1, par2=95.6)
 
 # Plot lifetime distributions:
 plot_lifetime_distr=False
-if plot_lifetime_distr==True:
+
+def plot_lifetime_distributions():
+    import matplotlib.pyplot as plt
     x = np.arange(1,200)
     def weib(x,n,a):
         return (a / n) * (x / n)**(a - 1) * np.exp(-(x / n)**a)
@@ -484,6 +486,7 @@ def calc_MFA(scenario, lt_res, lt_com, lt_pub):
     # select a scenario to consider during debugging
     # scenario = 'SSP1'
     # lifetime = 'Weibull'
+    years, US_pop, US_gdp, FA_all = scenario_inputs()
     scenario_pop = US_pop['US_pop_'+scenario]
     scenario_gdp = US_gdp['gdp_'+scenario]
     scenario_FAE_res = FA_all['FA_'+scenario] * ratio_res
@@ -531,12 +534,99 @@ def calc_MFA(scenario, lt_res, lt_com, lt_pub):
 
     return US_stock_res, US_stock_com, US_stock_pub, MFA_input_data
 
-# Calculate MFA for individual scenarios
-SSP1_dsm_res, SSP1_dsm_com, SSP1_dsm_pub, SSP1_MFA_input = calc_MFA('SSP1', lt_res, lt_com, lt_pub)
-SSP2_dsm_res, SSP2_dsm_com, SSP2_dsm_pub, SSP2_MFA_input = calc_MFA('SSP2', lt_res, lt_com, lt_pub)
-SSP3_dsm_res, SSP3_dsm_com, SSP3_dsm_pub, SSP3_MFA_input = calc_MFA('SSP3', lt_res, lt_com, lt_pub)
-SSP4_dsm_res, SSP4_dsm_com, SSP4_dsm_pub, SSP4_MFA_input = calc_MFA('SSP4', lt_res, lt_com, lt_pub)
-SSP5_dsm_res, SSP5_dsm_com, SSP5_dsm_pub, SSP5_MFA_input = calc_MFA('SSP5', lt_res, lt_com, lt_pub)
+# Floor area models of all (SSP, occupancy) combinations
+class ScenarioMatrix(object):
+    """ Results of calc_MFA_matrix. stock, inflow, and outflow are DataFrames indexed by Year with the columns (SSP, occupancy),
+        s_c and o_c are the stock and outflow by cohort, SSP x occupancy x year x age-cohort, and MFA_input is the
+        summary of the input data of each scenario, as in calc_MFA."""
+
+    def __init__(self, scenarios, occupancies, years, lt, batch, MFA_input):
+        self.scenarios = scenarios
+        self.occupancies = occupancies
+        self.years = years
+        self.lt = lt
+        self.MFA_input = MFA_input
+        shape = (len(scenarios), len(occupancies))
+        self.s = batch.s.reshape(shape + (len(years),))
+        self.i = batch.i.reshape(shape + (len(years),))
+        self.o = batch.o.reshape(shape + (len(years),))
+        self.s_c = batch.s_c.reshape(shape + batch.s_c.shape[1:])
+        self.o_c = batch.o_c.reshape(shape + batch.o_c.shape[1:])
+        columns = pd.MultiIndex.from_product([scenarios, occupancies], names=['SSP', 'occupancy'])
+        index = pd.Index(years, name='Year')
+        self.stock = pd.DataFrame(batch.s.T, index=index, columns=columns)
+        self.inflow = pd.DataFrame(batch.i.T, index=index, columns=columns)
+        self.outflow = pd.DataFrame(batch.o.T, index=index, columns=columns)
+
+    def get_dsm(self, scenario, occupancy):
+        """ DynamicStockModel of one (SSP, occupancy) combination, as returned by do_stock_driven_model."""
+        a, b = self.scenarios.index(scenario), self.occupancies.index(occupancy)
+        return dsm.DynamicStockModel(t=self.years, i=self.i[a, b], o=self.o[a, b], s=self.s[a, b],
+                                     s_c=self.s_c[a, b], o_c=self.o_c[a, b], lt=self.lt[occupancy],
+                                     name=scenario + '_' + occupancy)
+
+    def results(self):
+        """ {scenario: (dsm_res, dsm_com, dsm_pub, MFA_input)}, the results of calc_MFA for each scenario."""
+        return {scenario: (self.get_dsm(scenario, 'res'), self.get_dsm(scenario, 'com'), self.get_dsm(scenario, 'pub'),
+                           self.MFA_input[scenario]) for scenario in self.scenarios}
+
+# function to calculate the dynamic stock of all scenarios and occupancies in one step.
+def calc_MFA_matrix(scenarios=('SSP1', 'SSP2', 'SSP3', 'SSP4', 'SSP5'), lt=None, ratios=None):
+    """ Same results as calc_MFA for each scenario, but the floor area stock of all scenarios and occupancies is built
+        as one SSP x occupancy x year array, and the stock driven models (with negative inflow correction) are computed
+        as one batch, cf. dsm.BatchDynamicStockModel. lt and ratios are dictionaries of the lifetime and the floor area ratio
+        of each occupancy, default {'res': lt_res, 'com': lt_com, 'pub': lt_pub} and occupancy_ratios.
+        Returns a ScenarioMatrix."""
+    years, US_pop, US_gdp, FA_all = scenario_inputs()
+    lt = {'res': lt_res, 'com': lt_com, 'pub': lt_pub} if lt is None else lt
+    ratios = occupancy_ratios if ratios is None else ratios
+    scenarios, occupancies = list(scenarios), list(ratios.keys())
+
+    # calculate demanded floor area stock, SSP x occupancy x year
+    pop = US_pop[['US_pop_' + x for x in scenarios]].values.T
+    FAE = FA_all[['FA_' + x for x in scenarios]].values.T[:, np.newaxis, :] * np.array([ratios[x] for x in occupancies])[np.newaxis, :, np.newaxis]
+    stock = pop[:, np.newaxis, :] * FAE / 1000000
+
+    # Summary of input data for material flow analysis
+    MFA_input = {}
+    for a, scenario in enumerate(scenarios):
+        MFA_input_data = pd.DataFrame({'Year': years,
+                                       'US_pop_' + scenario: pop[a],
+                                       'US_gdp_' + scenario: US_gdp['gdp_' + scenario].values}, index=US_pop.index)
+        for b, occupancy in enumerate(occupancies):
+            MFA_input_data['FA_elasticity_' + occupancy + '_' + scenario] = FAE[a, b]
+        for b, occupancy in enumerate(occupancies):
+            MFA_input_data['stock_' + occupancy + '_' + scenario] = stock[a, b]
+        MFA_input[scenario] = MFA_input_data
+
+    # stock driven models of all trajectories
+    batch = dsm.BatchDynamicStockModel(t=years, s=stock.reshape(-1, len(years)),
+                                       lt=[lt[occupancy] for scenario in scenarios for occupancy in occupancies])
+    batch.compute_stock_driven_model(NegativeInflowCorrect=True)
+    print('The mass balance between inflows and outflows of all scenarios and occupancies is:   ')
+    print(np.abs(batch.check_stock_balance()).sum())  # show sum absolute of all mass balance mismatches.
+    return ScenarioMatrix(scenarios, occupancies, years, lt, batch, MFA_input)
+
+# Set profile_dsm = True (or --profile) to print calls and wall time of the dynamic stock model methods (cf. dsm.profiling)
+profile_dsm = False
+
+# Calibrate the Weibull lifetimes against all RECS (residential) and CBECS (commercial and public) survey years.
+# Set calibrate_lt = True to search the (shape, scale) that minimize the mean ks values (cf. lifetime_calibration),
+# the best parameters are printed and the objective surfaces are written to ./Results/lt_calibration_<occupancy>.csv
+calibrate_lt = False
+
+def calibrate_lifetimes(MFA_input, scenario='SSP1'):
+    """ Calibrate lt_res, lt_com, and lt_pub against the stock of the scenario in MFA_input (cf. calc_MFA)."""
+    RECS_Weights = read_input_data('res_weight')
+    CBECS_Weights = read_input_data('com_weight')
+    years = scenario_inputs()[0]
+    surveys_res = lifetime_calibration.survey_list(RECS_Weights, 'Res_Weight_', lifetime_calibration.RECS_years)
+    surveys_com = lifetime_calibration.survey_list(CBECS_Weights, 'Com_Weight_', lifetime_calibration.CBECS_years)
+    for occupancy, surveys in [('res', surveys_res), ('com', surveys_com), ('pub', surveys_com)]:
+        calibration = lifetime_calibration.calibrate_weibull(years, MFA_input['stock_' + occupancy + '_' + scenario], surveys, occupancy=occupancy)
+        calibration['surface'].to_csv('./Results/lt_calibration_' + occupancy + '.csv', index=False)
+        print('lt_' + occupancy + ' = generate_lt(\'Weibull\', par1=' + str(np.round(calibration['Shape'], 3)) +
+              ', par2=' + str(np.round(calibration['Scale'], 3)) + ')   # mean ks = ' + str(np.round(calibration['objective'], 5)))
 
 
 #
@@ -549,66 +639,52 @@ RECS_comparison = True
 CBECS_comparison = True
 plot_all = True
 
+def plot_age_distribution(summary_df, color, label, n_bins=n_bins):
+    """ Histogram (and KDE) of the ages in summary_df, weighted by floor area."""
+    import seaborn as sns
+    sns.histplot(x=summary_df['age'], weights=summary_df['area'], kde=kde_flag, stat='density', bins=n_bins, color=color, label=label)
+    if rug_flag == True:
+        sns.rugplot(x=summary_df['age'], color=color)
+
 # Plot all RECS data against the DSM simulation distribution
-if RECS_comparison==True:
+def compare_RECS(SSP1_dsm_res, plot=True):
+    """ Compare the age structure of the simulation with the RECS data and print the ks values,
+        plot=False only computes the ks values. Returns the mean ks value."""
+    RECS_Weights = read_input_data('res_weight')
     # number of bins for histogram comparisons
     # function to compute the density function of simulation and RECS data
 
-    def compare_RECS_and_plot(year=2015, index_end=196, RECS_series=RECS_Weights.Res_Weight_2015, plot=False, n_bins=20):
+    def compare_RECS_and_plot(year=2015, index_end=196, RECS_series=RECS_Weights.Res_Weight_2015, plot=False, n_bins=20, n_quantiles=1000):
         index_start = 100    # year to start comparison of histograms
-        age_in_year = np.full(index_end-index_start, year) - SSP1_dsm_res.t[index_start:index_end]
+        age_in_year = year - np.asarray(SSP1_dsm_res.t[index_start:index_end])
 
-        # Create density for dsm values in 2015 (dsm_for_histogram)
-        dsm_summary_df = pd.DataFrame({'year': SSP1_dsm_res.t[index_start:index_end],
-                                       'area': SSP1_dsm_res.s_c[index_end][index_start:index_end].astype(int),
+        # Age structure of the simulation in the survey year, as (age, floor area) pairs
+        dsm_area = np.asarray(SSP1_dsm_res.s_c[index_end][index_start:index_end], dtype=float)
+        dsm_summary_df = pd.DataFrame({'year': np.asarray(SSP1_dsm_res.t[index_start:index_end]).astype(int),
+                                       'area': dsm_area,
                                        'age': age_in_year})
-        dsm_summary_df['year'] = dsm_summary_df['year'].astype(int)
-        dsm_summary_df['area'] = dsm_summary_df['area'].astype(int)
-        dsm_summary_df['age'] = dsm_summary_df['age'].astype(int)
-        dsm_for_histogram = []
-        for index, row in dsm_summary_df.iterrows():
-            age_reps = list(np.full(row['area'], row['age']))
-            dsm_for_histogram.extend(age_reps)
-
-        # Create desnity for RECS valeus in 2015
-        RECS_summary_df = pd.DataFrame({'year': SSP1_dsm_res.t[index_start:index_end],
-                                        'area': RECS_series[index_start:index_end] * SSP1_dsm_res.s_c[index_end][index_start:index_end].astype(int).sum(),
+
+        # Age structure of the RECS data, weights scaled to the floor area of the simulation
+        RECS_summary_df = pd.DataFrame({'year': np.asarray(SSP1_dsm_res.t[index_start:index_end]).astype(int),
+                                        'area': np.asarray(RECS_series[index_start:index_end], dtype=float) * dsm_area.sum(),
                                         'age': age_in_year})
-        RECS_summary_df['year'] = RECS_summary_df['year'].astype(int)
-        RECS_summary_df['area'] = RECS_summary_df['area'].astype(int)
-        RECS_summary_df['age'] = RECS_summary_df['age'].astype(int)
-        RECS_for_histogram = []
-        for index, row in RECS_summary_df.iterrows():
-            age_reps = list(np.full(row['area'], row['age']))
-            RECS_for_histogram.extend(age_reps)
-
-        dsm_for_histogram = np.array(dsm_for_histogram)
-        RECS_for_histogram = np.array(RECS_for_histogram)
-        print(stats.describe(dsm_for_histogram))
-        print(stats.describe(RECS_for_histogram))
+        print(weighted_describe(dsm_summary_df['age'], dsm_summary_df['area']))
+        print(weighted_describe(RECS_summary_df['age'], RECS_summary_df['area']))
 
         # ks test
-        ks = (stats.ks_2samp(dsm_for_histogram, RECS_for_histogram))
+        ks = weighted_ks_2samp(dsm_summary_df['age'], dsm_summary_df['area'], RECS_summary_df['age'], RECS_summary_df['area'])
         print(ks)
 
         # qq plot
-        # Calculate quantiles
-        dsm_for_histogram.sort()
-        quantile_levels1 = np.arange(len(dsm_for_histogram), dtype=float) / len(dsm_for_histogram)
-
-        RECS_for_histogram.sort()
-        quantile_levels2 = np.arange(len(RECS_for_histogram), dtype=float) / len(RECS_for_histogram)
-        # Use the smaller set of quantile levels to create the plot
-        quantile_levels = quantile_levels2
-        # We already have the set of quantiles for the smaller data set
-        quantiles2 = RECS_for_histogram
-        # We find the set of quantiles for the larger data set using linear interpolation
-        quantiles1 = np.interp(quantile_levels, quantile_levels1, dsm_for_histogram)
+        # Calculate quantiles of both age structures at the same levels
+        quantile_levels = np.arange(n_quantiles, dtype=float) / n_quantiles
+        quantiles1 = weighted_quantile(dsm_summary_df['age'], dsm_summary_df['area'], quantile_levels)
+        quantiles2 = weighted_quantile(RECS_summary_df['age'], RECS_summary_df['area'], quantile_levels)
 
         if plot == True:
-            sns.distplot(dsm_for_histogram, kde=kde_flag, rug=rug_flag, color="r", bins=n_bins, label='DSM Simulation')
-            sns.distplot(RECS_for_histogram, kde=kde_flag, rug=rug_flag, color="black", bins=n_bins,
-                         label=str(year) + ' RECS')
+            import matplotlib.pyplot as plt
+            plot_age_distribution(dsm_summary_df, color="r", label='DSM Simulation', n_bins=n_bins)
+            plot_age_distribution(RECS_summary_df, color="black", label=str(year) + ' RECS', n_bins=n_bins)
             plt.legend();
             # plt.title('Residential Floor Age Structure ' + str(year))
             # plt.xlabel('Age')
@@ -617,8 +693,8 @@ if RECS_comparison==True:
             # Plot the quantiles to create the qq plot
             plt.plot(quantiles1, quantiles2)
             # Add a reference line
-            maxval = max(dsm_for_histogram[-1], RECS_for_histogram[-1])
-            minval = min(dsm_for_histogram[0], RECS_for_histogram[0])
+            maxval = max(quantiles1[-1], quantiles2[-1])
+            minval = min(quantiles1[0], quantiles2[0])
             plt.plot([minval, maxval], [minval, maxval], 'k-')
             plt.xlabel('Simulation Quantiles')
             plt.ylabel('RECS Quantiles')
@@ -630,7 +706,7 @@ if RECS_comparison==True:
             plt.legend(loc=2);
             plt.show();
 
-        return dsm_for_histogram, RECS_for_histogram, quantiles1, quantiles2, ks
+        return dsm_summary_df, RECS_summary_df, quantiles1, quantiles2, ks
 
     if plot_all==True:
         # Compute the density functions for each
@@ -643,182 +719,163 @@ if RECS_comparison==True:
         DSM_age_1987, RECS_age_1987, q1_1987, q2_1987, ks_1987 = compare_RECS_and_plot(year=1987, index_end=168, RECS_series=RECS_Weights.Res_Weight_1987)
         DSM_age_1980, RECS_age_1980, q1_1980, q2_1980, ks_1980 = compare_RECS_and_plot(year=1980, index_end=161, RECS_series=RECS_Weights.Res_Weight_1980)
 
-        print('mean ks values for each is = ', str(np.round(np.mean([ks_2015, ks_2009, ks_2005, ks_2001, ks_1997, ks_1993, ks_1987, ks_1980]),5)))
-        # multiplot of each RECS year data against the data for that year in the DSM simulation
-        fig = plt.figure(figsize=(16,8))
-        axes1 = fig.add_subplot(241)
-        sns.distplot(DSM_age_2015, kde=kde_flag, color="red", bins=n_bins, label='DSM Simulation'),
-        sns.distplot(RECS_age_2015, kde=kde_flag, color="black", bins=n_bins, label='2015 RECS'),
-        # plot cdfs next to one another
-        axes2 = axes1.twinx()
-        plt.hist(q1_2015, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation', color='gray')
-        plt.hist(q2_2015, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='2015 RECS',color='darksalmon')
-        axes2.set_ylabel('CDF')
-        axes1.set_ylabel('Density')
-        plt.legend(loc=9, fontsize='x-small');
-        plt.xlabel(None)
-        plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_2015[0],4)), ha='right', va='top', transform=axes1.transAxes, fontsize='x-small')
-        # plt.show()
-
-        axes1 = fig.add_subplot(242)
-        sns.distplot(DSM_age_2009, kde=kde_flag, color="red", bins=n_bins, label='DSM Simulation'),
-        sns.distplot(RECS_age_2009, kde=kde_flag, color="black", bins=n_bins, label='2009 RECS'),
-        # plot cdfs next to one another
-        axes2 = axes1.twinx()
-        plt.hist(q1_2009, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation', color='gray')
-        plt.hist(q2_2009, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='2009 RECS',color='darksalmon')
-        axes2.set_ylabel('CDF')
-        axes1.set_ylabel('Density')
-        plt.legend(loc=9, fontsize='x-small');
-        plt.xlabel(None)
-        plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_2009[0],4)), ha='right', va='top', transform=axes1.transAxes, fontsize='x-small')
-
-
-        axes1 = fig.add_subplot(243)
-        sns.distplot(DSM_age_2005, kde=kde_flag, color="red", bins=n_bins, label='DSM Simulation'),
-        sns.distplot(RECS_age_2005, kde=kde_flag, color="black", bins=n_bins, label='2005 RECS'),
-        # plot cdfs next to one another
-        axes2 = axes1.twinx()
-        plt.hist(q1_2005, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation', color='gray')
-        plt.hist(q2_2005, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='2005 RECS',color='darksalmon')
-        axes2.set_ylabel('CDF')
-        axes1.set_ylabel('Density')
-        plt.legend(loc=9, fontsize='x-small');
-        plt.xlabel(None)
-        plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_2005[0],4)), ha='right', va='top', transform=axes1.transAxes, fontsize='x-small')
-
-
-
-        axes1 = fig.add_subplot(244)
-        sns.distplot(DSM_age_2001, kde=kde_flag, color="red", bins=n_bins, label='DSM Simulation'),
-        sns.distplot(RECS_age_2001, kde=kde_flag, color="black", bins=n_bins, label='2001 RECS'),
-        # plot cdfs next to one another
-        axes2 = axes1.twinx()
-        plt.hist(q1_2001, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation', color='gray')
-        plt.hist(q2_2001, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='2001 RECS',color='darksalmon')
-        axes2.set_ylabel('CDF')
-        axes1.set_ylabel('Density')
-        plt.legend(loc=9, fontsize='x-small');
-        plt.xlabel(None)
-        plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_2001[0],4)), ha='right', va='top', transform=axes1.transAxes, fontsize='x-small')
-
-
-        axes1 = fig.add_subplot(245)
-        sns.distplot(DSM_age_1997, kde=kde_flag, color="red", bins=n_bins, label='DSM Simulation'),
-        sns.distplot(RECS_age_1997, kde=kde_flag, color="black", bins=n_bins, label='1997 RECS'),
-        # plot cdfs next to one another
-        axes2 = axes1.twinx()
-        plt.hist(q1_1997, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation', color='gray')
-        plt.hist(q2_1997, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='1997 RECS',color='darksalmon')
-        axes2.set_ylabel('CDF')
-        axes1.set_ylabel('Density')
-        plt.legend(loc=9, fontsize='x-small');
-        plt.xlabel(None)
-        plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_1997[0],4)), ha='right', va='top', transform=axes1.transAxes, fontsize='x-small')
-
-        axes1 = fig.add_subplot(246)
-        sns.distplot(DSM_age_1993, kde=kde_flag, color="red", bins=n_bins, label='DSM Simulation'),
-        sns.distplot(RECS_age_1993, kde=kde_flag, color="black", bins=n_bins, label='1993 RECS'),
-        # plot cdfs next to one another
-        axes2 = axes1.twinx()
-        plt.hist(q1_1993, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation', color='gray')
-        plt.hist(q2_1993, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='1993 RECS',color='darksalmon')
-        axes2.set_ylabel('CDF')
-        axes1.set_ylabel('Density')
-        plt.legend(loc=9, fontsize='x-small');
-        plt.xlabel(None)
-        plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_1993[0],4)), ha='right', va='top', transform=axes1.transAxes, fontsize='x-small')
-
-        axes1 = fig.add_subplot(247)
-        sns.distplot(DSM_age_1987, kde=kde_flag, color="red", bins=n_bins, label='DSM Simulation'),
-        sns.distplot(RECS_age_1987, kde=kde_flag, color="black", bins=n_bins, label='1987 RECS'),
-        # plot cdfs next to one another
-        axes2 = axes1.twinx()
-        plt.hist(q1_1987, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation', color='gray')
-        plt.hist(q2_1987, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='1987 RECS',color='darksalmon')
-        axes2.set_ylabel('CDF')
-        axes1.set_ylabel('Density')
-        plt.legend(loc=9, fontsize='x-small');
-        plt.xlabel('Age')
-        plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_1987[0],4)), ha='right', va='top', transform=axes1.transAxes, fontsize='x-small')
-
-        axes1 = fig.add_subplot(248)
-        sns.distplot(DSM_age_1980, kde=kde_flag, color="red", bins=n_bins, label='DSM Simulation'),
-        sns.distplot(RECS_age_1980, kde=kde_flag, color="black", bins=n_bins, label='1980 RECS'),
-        # plot cdfs next to one another
-        axes2 = axes1.twinx()
-        plt.hist(q1_1980, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation', color='gray')
-        plt.hist(q2_1980, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='1980 RECS',color='darksalmon')
-        axes2.set_ylabel('CDF')
-        axes1.set_ylabel('Density')
-        plt.legend(loc=9, fontsize='x-small');
-        plt.xlabel('Age')
-        plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_1980[0],4)), ha='right', va='top', transform=axes1.transAxes, fontsize='x-small')
-        plt.show();
+        mean_ks = np.mean([ks_2015[0], ks_2009[0], ks_2005[0], ks_2001[0], ks_1997[0], ks_1993[0], ks_1987[0], ks_1980[0]])
+        print('mean ks values for each is = ', str(np.round(mean_ks, 5)))
+        if plot == True:
+            import matplotlib.pyplot as plt
+            # multiplot of each RECS year data against the data for that year in the DSM simulation
+            fig = plt.figure(figsize=(16,8))
+            axes1 = fig.add_subplot(241)
+            plot_age_distribution(DSM_age_2015, color="red", label='DSM Simulation')
+            plot_age_distribution(RECS_age_2015, color="black", label='2015 RECS')
+            # plot cdfs next to one another
+            axes2 = axes1.twinx()
+            plt.hist(q1_2015, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation', color='gray')
+            plt.hist(q2_2015, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='2015 RECS',color='darksalmon')
+            axes2.set_ylabel('CDF')
+            axes1.set_ylabel('Density')
+            plt.legend(loc=9, fontsize='x-small');
+            plt.xlabel(None)
+            plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_2015[0],4)), ha='right', va='top', transform=axes1.transAxes, fontsize='x-small')
+            # plt.show()
+
+            axes1 = fig.add_subplot(242)
+            plot_age_distribution(DSM_age_2009, color="red", label='DSM Simulation')
+            plot_age_distribution(RECS_age_2009, color="black", label='2009 RECS')
+            # plot cdfs next to one another
+            axes2 = axes1.twinx()
+            plt.hist(q1_2009, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation', color='gray')
+            plt.hist(q2_2009, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='2009 RECS',color='darksalmon')
+            axes2.set_ylabel('CDF')
+            axes1.set_ylabel('Density')
+            plt.legend(loc=9, fontsize='x-small');
+            plt.xlabel(None)
+            plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_2009[0],4)), ha='right', va='top', transform=axes1.transAxes, fontsize='x-small')
+
+
+            axes1 = fig.add_subplot(243)
+            plot_age_distribution(DSM_age_2005, color="red", label='DSM Simulation')
+            plot_age_distribution(RECS_age_2005, color="black", label='2005 RECS')
+            # plot cdfs next to one another
+            axes2 = axes1.twinx()
+            plt.hist(q1_2005, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation', color='gray')
+            plt.hist(q2_2005, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='2005 RECS',color='darksalmon')
+            axes2.set_ylabel('CDF')
+            axes1.set_ylabel('Density')
+            plt.legend(loc=9, fontsize='x-small');
+            plt.xlabel(None)
+            plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_2005[0],4)), ha='right', va='top', transform=axes1.transAxes, fontsize='x-small')
+
+
+            axes1 = fig.add_subplot(244)
+            plot_age_distribution(DSM_age_2001, color="red", label='DSM Simulation')
+            plot_age_distribution(RECS_age_2001, color="black", label='2001 RECS')
+            # plot cdfs next to one another
+            axes2 = axes1.twinx()
+            plt.hist(q1_2001, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation', color='gray')
+            plt.hist(q2_2001, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='2001 RECS',color='darksalmon')
+            axes2.set_ylabel('CDF')
+            axes1.set_ylabel('Density')
+            plt.legend(loc=9, fontsize='x-small');
+            plt.xlabel(None)
+            plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_2001[0],4)), ha='right', va='top', transform=axes1.transAxes, fontsize='x-small')
+
+
+            axes1 = fig.add_subplot(245)
+            plot_age_distribution(DSM_age_1997, color="red", label='DSM Simulation')
+            plot_age_distribution(RECS_age_1997, color="black", label='1997 RECS')
+            # plot cdfs next to one another
+            axes2 = axes1.twinx()
+            plt.hist(q1_1997, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation', color='gray')
+            plt.hist(q2_1997, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='1997 RECS',color='darksalmon')
+            axes2.set_ylabel('CDF')
+            axes1.set_ylabel('Density')
+            plt.legend(loc=9, fontsize='x-small');
+            plt.xlabel(None)
+            plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_1997[0],4)), ha='right', va='top', transform=axes1.transAxes, fontsize='x-small')
+
+            axes1 = fig.add_subplot(246)
+            plot_age_distribution(DSM_age_1993, color="red", label='DSM Simulation')
+            plot_age_distribution(RECS_age_1993, color="black", label='1993 RECS')
+            # plot cdfs next to one another
+            axes2 = axes1.twinx()
+            plt.hist(q1_1993, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation', color='gray')
+            plt.hist(q2_1993, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='1993 RECS',color='darksalmon')
+            axes2.set_ylabel('CDF')
+            axes1.set_ylabel('Density')
+            plt.legend(loc=9, fontsize='x-small');
+            plt.xlabel(None)
+            plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_1993[0],4)), ha='right', va='top', transform=axes1.transAxes, fontsize='x-small')
+
+            axes1 = fig.add_subplot(247)
+            plot_age_distribution(DSM_age_1987, color="red", label='DSM Simulation')
+            plot_age_distribution(RECS_age_1987, color="black", label='1987 RECS')
+            # plot cdfs next to one another
+            axes2 = axes1.twinx()
+            plt.hist(q1_1987, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation', color='gray')
+            plt.hist(q2_1987, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='1987 RECS',color='darksalmon')
+            axes2.set_ylabel('CDF')
+            axes1.set_ylabel('Density')
+            plt.legend(loc=9, fontsize='x-small');
+            plt.xlabel('Age')
+            plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_1987[0],4)), ha='right', va='top', transform=axes1.transAxes, fontsize='x-small')
+
+            axes1 = fig.add_subplot(248)
+            plot_age_distribution(DSM_age_1980, color="red", label='DSM Simulation')
+            plot_age_distribution(RECS_age_1980, color="black", label='1980 RECS')
+            # plot cdfs next to one another
+            axes2 = axes1.twinx()
+            plt.hist(q1_1980, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation', color='gray')
+            plt.hist(q2_1980, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='1980 RECS',color='darksalmon')
+            axes2.set_ylabel('CDF')
+            axes1.set_ylabel('Density')
+            plt.legend(loc=9, fontsize='x-small');
+            plt.xlabel('Age')
+            plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_1980[0],4)), ha='right', va='top', transform=axes1.transAxes, fontsize='x-small')
+            plt.show();
 
     else:
-        compare_RECS_and_plot(year=2015, index_end=196, RECS_series=RECS_Weights.Res_Weight_2015, plot=True, n_bins=n_bins)
+        mean_ks = compare_RECS_and_plot(year=2015, index_end=196, RECS_series=RECS_Weights.Res_Weight_2015, plot=plot, n_bins=n_bins)[4][0]
+    return mean_ks
 
 # Plot all CBECS data against the DSM simulation distribution
-if CBECS_comparison == True:
+def compare_CBECS(SSP1_dsm_com, plot=True):
+    """ Compare the age structure of the simulation with the CBECS data and print the ks values,
+        plot=False only computes the ks values. Returns the mean ks value."""
+    CBECS_Weights = read_input_data('com_weight')
 
     # function to comput the desnity function of simualtion and CBECS data
-    def compare_CBECS_and_plot(year=2012, index_end=193, CBECS_series=CBECS_Weights.Com_Weight_2012, plot=False, n_bins=20):
+    def compare_CBECS_and_plot(year=2012, index_end=193, CBECS_series=CBECS_Weights.Com_Weight_2012, plot=False, n_bins=20, n_quantiles=1000):
         index_start = 100    # year to start comparison of histograms
-        age_in_year = np.full(index_end-index_start, year) - SSP1_dsm_com.t[index_start:index_end]
+        age_in_year = year - np.asarray(SSP1_dsm_com.t[index_start:index_end])
 
-        # Create density for dsm values in 2015 (dsm_for_histogram)
-        dsm_summary_df = pd.DataFrame({'year': SSP1_dsm_com.t[index_start:index_end],
-                                       'area': SSP1_dsm_com.s_c[index_end][index_start:index_end].astype(int),
+        # Age structure of the simulation in the survey year, as (age, floor area) pairs
+        dsm_area = np.asarray(SSP1_dsm_com.s_c[index_end][index_start:index_end], dtype=float)
+        dsm_summary_df = pd.DataFrame({'year': np.asarray(SSP1_dsm_com.t[index_start:index_end]).astype(int),
+                                       'area': dsm_area,
                                        'age': age_in_year})
-        dsm_summary_df['year'] = dsm_summary_df['year'].astype(int)
-        dsm_summary_df['area'] = dsm_summary_df['area'].astype(int)
-        dsm_summary_df['age'] = dsm_summary_df['age'].astype(int)
-
-        dsm_for_histogram = []
-        for index, row in dsm_summary_df.iterrows():
-            age_reps = list(np.full(row['area'], row['age']))
-            dsm_for_histogram.extend(age_reps)
-
-        # Create desnity for CBECS valeus in 2015
-        CBECS_summary_df = pd.DataFrame({'year': SSP1_dsm_com.t[index_start:index_end],
-                                        'area': CBECS_series[index_start:index_end] * SSP1_dsm_com.s_c[index_end][index_start:index_end].sum(),
+
+        # Age structure of the CBECS data, weights scaled to the floor area of the simulation
+        CBECS_summary_df = pd.DataFrame({'year': np.asarray(SSP1_dsm_com.t[index_start:index_end]).astype(int),
+                                        'area': np.asarray(CBECS_series[index_start:index_end], dtype=float) * dsm_area.sum(),
                                         'age': age_in_year})
-        CBECS_summary_df['year'] = CBECS_summary_df['year'].astype(int)
-        CBECS_summary_df['area'] = CBECS_summary_df['area'].astype(int)
-        CBECS_summary_df['age'] = CBECS_summary_df['age'].astype(int)
-        CBECS_for_histogram = []
-        for index, row in CBECS_summary_df.iterrows():
-            age_reps = list(np.full(row['area'], row['age']))
-            CBECS_for_histogram.extend(age_reps)
-
-        dsm_for_histogram = np.array(dsm_for_histogram)
-        CBECS_for_histogram = np.array(CBECS_for_histogram)
-        print(stats.describe(dsm_for_histogram))
-        print(stats.describe(CBECS_for_histogram))
+        print(weighted_describe(dsm_summary_df['age'], dsm_summary_df['area']))
+        print(weighted_describe(CBECS_summary_df['age'], CBECS_summary_df['area']))
 
         # ks test
-        ks = (stats.ks_2samp(dsm_for_histogram, CBECS_for_histogram))
+        ks = weighted_ks_2samp(dsm_summary_df['age'], dsm_summary_df['area'], CBECS_summary_df['age'], CBECS_summary_df['area'])
         print(ks)
 
         # qq plot
-        # Calculate quantiles
-        dsm_for_histogram.sort()
-        quantile_levels1 = np.arange(len(dsm_for_histogram), dtype=float) / len(dsm_for_histogram)
-
-        CBECS_for_histogram.sort()
-        quantile_levels2 = np.arange(len(CBECS_for_histogram), dtype=float) / len(CBECS_for_histogram)
-        # Use the smaller set of quantile levels to create the plot
-        quantile_levels = quantile_levels2
-        # We already have the set of quantiles for the smaller data set
-        quantiles2 = CBECS_for_histogram
-        # We find the set of quantiles for the larger data set using linear interpolation
-        quantiles1 = np.interp(quantile_levels, quantile_levels1, dsm_for_histogram)
+        # Calculate quantiles of both age structures at the same levels
+        quantile_levels = np.arange(n_quantiles, dtype=float) / n_quantiles
+        quantiles1 = weighted_quantile(dsm_summary_df['age'], dsm_summary_df['area'], quantile_levels)
+        quantiles2 = weighted_quantile(CBECS_summary_df['age'], CBECS_summary_df['area'], quantile_levels)
 
         if plot == True:
-            sns.distplot(dsm_for_histogram, kde=kde_flag, rug=rug_flag, color="blue", bins=n_bins, label='DSM Simulation')
-            sns.distplot(CBECS_for_histogram, kde=kde_flag, rug=rug_flag, color="black", bins=n_bins,
-                         label=str(year) + ' CBECS')
+            import matplotlib.pyplot as plt
+            plot_age_distribution(dsm_summary_df, color="blue", label='DSM Simulation', n_bins=n_bins)
+            plot_age_distribution(CBECS_summary_df, color="black", label=str(year) + ' CBECS', n_bins=n_bins)
             plt.legend();
             # plt.title('Residential Floor Age Structure ' + str(year))
             # plt.xlabel('Age')
@@ -827,8 +884,8 @@ if CBECS_comparison == True:
             # Plot the quantiles to create the qq plot
             plt.plot(quantiles1, quantiles2)
             # Add a reference line
-            maxval = max(dsm_for_histogram[-1], CBECS_for_histogram[-1])
-            minval = min(dsm_for_histogram[0], CBECS_for_histogram[0])
+            maxval = max(quantiles1[-1], quantiles2[-1])
+            minval = min(quantiles1[0], quantiles2[0])
             plt.plot([minval, maxval], [minval, maxval], 'k-')
             plt.xlabel('Simulation Quantiles')
             plt.ylabel('CBECS Quantiles')
@@ -840,7 +897,7 @@ if CBECS_comparison == True:
             plt.legend(loc=2);
             plt.show();
 
-        return dsm_for_histogram, CBECS_for_histogram, quantiles1, quantiles2, ks
+        return dsm_summary_df, CBECS_summary_df, quantiles1, quantiles2, ks
 
     if plot_all==True:
         # Compute the density functions for each
@@ -854,500 +911,510 @@ if CBECS_comparison == True:
         DSM_age_1979, CBECS_age_1979, q1_1979, q2_1979, ks_1979 = compare_CBECS_and_plot(year=1979, index_end=160, CBECS_series=CBECS_Weights.Com_Weight_1979)
 
         # multiplot of each RECS year data against the data for that year in the DSM simulation
-        print('mean ks values for each is = ',
-              str(np.round(np.mean([ks_2012[0], ks_2003[0], ks_1999[0], ks_1995[0], ks_1992[0], ks_1986[0], ks_1983[0], ks_1979[0]]), 5)))
+        mean_ks = np.mean([ks_2012[0], ks_2003[0], ks_1999[0], ks_1995[0], ks_1992[0], ks_1986[0], ks_1983[0], ks_1979[0]])
+        print('mean ks values for each is = ', str(np.round(mean_ks, 5)))
 
-        # multiplot of each RECS year data against the data for that year in the DSM simulation
-        fig = plt.figure(figsize=(16, 8))
-        axes1 = fig.add_subplot(241)
-        sns.distplot(DSM_age_2012, kde=kde_flag, color="blue", bins=n_bins, label='DSM Simulation'),
-        sns.distplot(CBECS_age_2012, kde=kde_flag, color="black", bins=n_bins, label='2012 CBECS'),
-        # plot cdfs next to one another
-        axes2 = axes1.twinx()
-        plt.hist(q1_2012, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation',
-                 color='gray')
-        plt.hist(q2_2012, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='2012 CBECS',
-                 color='lightblue')
-        axes2.set_ylabel('CDF')
-        axes1.set_ylabel('Density')
-        plt.legend(loc=9, fontsize='x-small');
-        plt.xlabel(None)
-        plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_2012[0], 4)), ha='right', va='top', transform=axes1.transAxes,
-                 fontsize='x-small')
-        # plt.show()
-
-        axes1 = fig.add_subplot(242)
-        sns.distplot(DSM_age_2003, kde=kde_flag, color="blue", bins=n_bins, label='DSM Simulation'),
-        sns.distplot(CBECS_age_2003, kde=kde_flag, color="black", bins=n_bins, label='2003 CBECS'),
-        # plot cdfs next to one another
-        axes2 = axes1.twinx()
-        plt.hist(q1_2003, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation',
-                 color='gray')
-        plt.hist(q2_2003, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='2003 CBECS',
-                 color='lightblue')
-        axes2.set_ylabel('CDF')
-        axes1.set_ylabel('Density')
-        plt.legend(loc=9, fontsize='x-small');
-        plt.xlabel(None)
-        plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_2003[0], 4)), ha='right', va='top', transform=axes1.transAxes,
-                 fontsize='x-small')
-
-        axes1 = fig.add_subplot(243)
-        sns.distplot(DSM_age_1999, kde=kde_flag, color="blue", bins=n_bins, label='DSM Simulation'),
-        sns.distplot(CBECS_age_1999, kde=kde_flag, color="black", bins=n_bins, label='1999 CECS'),
-        # plot cdfs next to one another
-        axes2 = axes1.twinx()
-        plt.hist(q1_1999, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation',
-                 color='gray')
-        plt.hist(q2_1999, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='1999 CBECS',
-                 color='lightblue')
-        axes2.set_ylabel('CDF')
-        axes1.set_ylabel('Density')
-        plt.legend(loc=9, fontsize='x-small');
-        plt.xlabel(None)
-        plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_1999[0], 4)), ha='right', va='top', transform=axes1.transAxes,
-                 fontsize='x-small')
-
-        axes1 = fig.add_subplot(244)
-        sns.distplot(DSM_age_1995, kde=kde_flag, color="blue", bins=n_bins, label='DSM Simulation'),
-        sns.distplot(CBECS_age_1995, kde=kde_flag, color="black", bins=n_bins, label='1995 CBECS'),
-        # plot cdfs next to one another
-        axes2 = axes1.twinx()
-        plt.hist(q1_1995, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation',
-                 color='gray')
-        plt.hist(q2_1995, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='1995 CBECS',
-                 color='lightblue')
-        axes2.set_ylabel('CDF')
-        axes1.set_ylabel('Density')
-        plt.legend(loc=9, fontsize='x-small');
-        plt.xlabel(None)
-        plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_1995[0], 4)), ha='right', va='top', transform=axes1.transAxes,
-                 fontsize='x-small')
-
-        axes1 = fig.add_subplot(245)
-        sns.distplot(DSM_age_1992, kde=kde_flag, color="blue", bins=n_bins, label='DSM Simulation'),
-        sns.distplot(CBECS_age_1992, kde=kde_flag, color="black", bins=n_bins, label='1992 CBECS'),
-        # plot cdfs next to one another
-        axes2 = axes1.twinx()
-        plt.hist(q1_1992, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation',
-                 color='gray')
-        plt.hist(q2_1992, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='1992 CBECS',
-                 color='lightblue')
-        axes2.set_ylabel('CDF')
-        axes1.set_ylabel('Density')
-        plt.legend(loc=9, fontsize='x-small');
-        plt.xlabel(None)
-        plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_1992[0], 4)), ha='right', va='top', transform=axes1.transAxes,
-                 fontsize='x-small')
-
-        axes1 = fig.add_subplot(246)
-        sns.distplot(DSM_age_1986, kde=kde_flag, color="blue", bins=n_bins, label='DSM Simulation'),
-        sns.distplot(CBECS_age_1986, kde=kde_flag, color="black", bins=n_bins, label='1986 CBECS'),
-        # plot cdfs next to one another
-        axes2 = axes1.twinx()
-        plt.hist(q1_1986, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation',
-                 color='gray')
-        plt.hist(q2_1986, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='1986 CBECS',
-                 color='lightblue')
-        axes2.set_ylabel('CDF')
-        axes1.set_ylabel('Density')
-        plt.legend(loc=9, fontsize='x-small');
-        plt.xlabel(None)
-        plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_1986[0], 4)), ha='right', va='top', transform=axes1.transAxes,
-                 fontsize='x-small')
-
-        axes1 = fig.add_subplot(247)
-        sns.distplot(DSM_age_1983, kde=kde_flag, color="blue", bins=n_bins, label='DSM Simulation'),
-        sns.distplot(CBECS_age_1983, kde=kde_flag, color="black", bins=n_bins, label='1983 CBECS'),
-        # plot cdfs next to one another
-        axes2 = axes1.twinx()
-        plt.hist(q1_1983, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation',
-                 color='gray')
-        plt.hist(q2_1983, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='1983 CBECS',
-                 color='lightblue')
-        axes2.set_ylabel('CDF')
-        axes1.set_ylabel('Density')
-        plt.legend(loc=9, fontsize='x-small');
-        plt.xlabel('Age')
-        plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_1983[0], 4)), ha='right', va='top', transform=axes1.transAxes,
-                 fontsize='x-small')
-
-        axes1 = fig.add_subplot(248)
-        sns.distplot(DSM_age_1979, kde=kde_flag, color="blue", bins=n_bins, label='DSM Simulation'),
-        sns.distplot(CBECS_age_1979, kde=kde_flag, color="black", bins=n_bins, label='1979 CBECS'),
-        # plot cdfs next to one another
-        axes2 = axes1.twinx()
-        plt.hist(q1_1979, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation',
-                 color='gray')
-        plt.hist(q2_1979, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='1979 CBECS',
-                 color='lightblue')
-        axes2.set_ylabel('CDF')
-        axes1.set_ylabel('Density')
-        plt.legend(loc=9, fontsize='x-small');
-        plt.xlabel('Age')
-        plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_1979[0], 4)), ha='right', va='top', transform=axes1.transAxes,
-                 fontsize='x-small')
-        plt.show();
+        if plot == True:
+            import matplotlib.pyplot as plt
+            # multiplot of each RECS year data against the data for that year in the DSM simulation
+            fig = plt.figure(figsize=(16, 8))
+            axes1 = fig.add_subplot(241)
+            plot_age_distribution(DSM_age_2012, color="blue", label='DSM Simulation')
+            plot_age_distribution(CBECS_age_2012, color="black", label='2012 CBECS')
+            # plot cdfs next to one another
+            axes2 = axes1.twinx()
+            plt.hist(q1_2012, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation',
+                     color='gray')
+            plt.hist(q2_2012, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='2012 CBECS',
+                     color='lightblue')
+            axes2.set_ylabel('CDF')
+            axes1.set_ylabel('Density')
+            plt.legend(loc=9, fontsize='x-small');
+            plt.xlabel(None)
+            plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_2012[0], 4)), ha='right', va='top', transform=axes1.transAxes,
+                     fontsize='x-small')
+            # plt.show()
+
+            axes1 = fig.add_subplot(242)
+            plot_age_distribution(DSM_age_2003, color="blue", label='DSM Simulation')
+            plot_age_distribution(CBECS_age_2003, color="black", label='2003 CBECS')
+            # plot cdfs next to one another
+            axes2 = axes1.twinx()
+            plt.hist(q1_2003, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation',
+                     color='gray')
+            plt.hist(q2_2003, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='2003 CBECS',
+                     color='lightblue')
+            axes2.set_ylabel('CDF')
+            axes1.set_ylabel('Density')
+            plt.legend(loc=9, fontsize='x-small');
+            plt.xlabel(None)
+            plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_2003[0], 4)), ha='right', va='top', transform=axes1.transAxes,
+                     fontsize='x-small')
+
+            axes1 = fig.add_subplot(243)
+            plot_age_distribution(DSM_age_1999, color="blue", label='DSM Simulation')
+            plot_age_distribution(CBECS_age_1999, color="black", label='1999 CECS')
+            # plot cdfs next to one another
+            axes2 = axes1.twinx()
+            plt.hist(q1_1999, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation',
+                     color='gray')
+            plt.hist(q2_1999, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='1999 CBECS',
+                     color='lightblue')
+            axes2.set_ylabel('CDF')
+            axes1.set_ylabel('Density')
+            plt.legend(loc=9, fontsize='x-small');
+            plt.xlabel(None)
+            plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_1999[0], 4)), ha='right', va='top', transform=axes1.transAxes,
+                     fontsize='x-small')
+
+            axes1 = fig.add_subplot(244)
+            plot_age_distribution(DSM_age_1995, color="blue", label='DSM Simulation')
+            plot_age_distribution(CBECS_age_1995, color="black", label='1995 CBECS')
+            # plot cdfs next to one another
+            axes2 = axes1.twinx()
+            plt.hist(q1_1995, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation',
+                     color='gray')
+            plt.hist(q2_1995, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='1995 CBECS',
+                     color='lightblue')
+            axes2.set_ylabel('CDF')
+            axes1.set_ylabel('Density')
+            plt.legend(loc=9, fontsize='x-small');
+            plt.xlabel(None)
+            plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_1995[0], 4)), ha='right', va='top', transform=axes1.transAxes,
+                     fontsize='x-small')
+
+            axes1 = fig.add_subplot(245)
+            plot_age_distribution(DSM_age_1992, color="blue", label='DSM Simulation')
+            plot_age_distribution(CBECS_age_1992, color="black", label='1992 CBECS')
+            # plot cdfs next to one another
+            axes2 = axes1.twinx()
+            plt.hist(q1_1992, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation',
+                     color='gray')
+            plt.hist(q2_1992, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='1992 CBECS',
+                     color='lightblue')
+            axes2.set_ylabel('CDF')
+            axes1.set_ylabel('Density')
+            plt.legend(loc=9, fontsize='x-small');
+            plt.xlabel(None)
+            plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_1992[0], 4)), ha='right', va='top', transform=axes1.transAxes,
+                     fontsize='x-small')
+
+            axes1 = fig.add_subplot(246)
+            plot_age_distribution(DSM_age_1986, color="blue", label='DSM Simulation')
+            plot_age_distribution(CBECS_age_1986, color="black", label='1986 CBECS')
+            # plot cdfs next to one another
+            axes2 = axes1.twinx()
+            plt.hist(q1_1986, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation',
+                     color='gray')
+            plt.hist(q2_1986, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='1986 CBECS',
+                     color='lightblue')
+            axes2.set_ylabel('CDF')
+            axes1.set_ylabel('Density')
+            plt.legend(loc=9, fontsize='x-small');
+            plt.xlabel(None)
+            plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_1986[0], 4)), ha='right', va='top', transform=axes1.transAxes,
+                     fontsize='x-small')
+
+            axes1 = fig.add_subplot(247)
+            plot_age_distribution(DSM_age_1983, color="blue", label='DSM Simulation')
+            plot_age_distribution(CBECS_age_1983, color="black", label='1983 CBECS')
+            # plot cdfs next to one another
+            axes2 = axes1.twinx()
+            plt.hist(q1_1983, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation',
+                     color='gray')
+            plt.hist(q2_1983, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='1983 CBECS',
+                     color='lightblue')
+            axes2.set_ylabel('CDF')
+            axes1.set_ylabel('Density')
+            plt.legend(loc=9, fontsize='x-small');
+            plt.xlabel('Age')
+            plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_1983[0], 4)), ha='right', va='top', transform=axes1.transAxes,
+                     fontsize='x-small')
+
+            axes1 = fig.add_subplot(248)
+            plot_age_distribution(DSM_age_1979, color="blue", label='DSM Simulation')
+            plot_age_distribution(CBECS_age_1979, color="black", label='1979 CBECS')
+            # plot cdfs next to one another
+            axes2 = axes1.twinx()
+            plt.hist(q1_1979, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='Simulation',
+                     color='gray')
+            plt.hist(q2_1979, density=True, bins=100, cumulative=True, alpha=1.0, histtype='step', label='1979 CBECS',
+                     color='lightblue')
+            axes2.set_ylabel('CDF')
+            axes1.set_ylabel('Density')
+            plt.legend(loc=9, fontsize='x-small');
+            plt.xlabel('Age')
+            plt.text(1.0, 0.99, 'ks = ' + str(np.round(ks_1979[0], 4)), ha='right', va='top', transform=axes1.transAxes,
+                     fontsize='x-small')
+            plt.show();
     else:
-        compare_CBECS_and_plot(year=2012, index_end=193, CBECS_series=CBECS_Weights.Com_Weight_2012, plot=True, n_bins=n_bins)
-
-# Save the floor area models as .csv files.
-SSP1_dsm_df = pd.DataFrame({'time': SSP1_dsm_res.t,
-                            'stock_res': SSP1_dsm_res.s,
-                            'inflow_res': SSP1_dsm_res.i,
-                            'outflow_res': SSP1_dsm_res.o,
-                            'stock_com': SSP1_dsm_com.s,
-                            'inflow_com': SSP1_dsm_com.i,
-                            'outflow_com': SSP1_dsm_com.o,
-                            'stock_pub': SSP1_dsm_pub.s,
-                            'inflow_pub': SSP1_dsm_pub.i,
-                            'outflow_pub': SSP1_dsm_pub.o,
-                            'stock_total': SSP1_dsm_res.s + SSP1_dsm_com.s + SSP1_dsm_pub.s,
-                            'inflow_total': SSP1_dsm_res.i + SSP1_dsm_com.i + SSP1_dsm_pub.i,
-                            'outflow_total': SSP1_dsm_res.o + SSP1_dsm_com.o + SSP1_dsm_pub.o
-                            })
-SSP2_dsm_df = pd.DataFrame({'time': SSP2_dsm_res.t,
-                            'stock_res': SSP2_dsm_res.s,
-                            'inflow_res': SSP2_dsm_res.i,
-                            'outflow_res': SSP2_dsm_res.o,
-                            'stock_com': SSP2_dsm_com.s,
-                            'inflow_com': SSP2_dsm_com.i,
-                            'outflow_com': SSP2_dsm_com.o,
-                            'stock_pub': SSP2_dsm_pub.s,
-                            'inflow_pub': SSP2_dsm_pub.i,
-                            'outflow_pub': SSP2_dsm_pub.o,
-                            'stock_total': SSP2_dsm_res.s + SSP2_dsm_com.s + SSP2_dsm_pub.s,
-                            'inflow_total': SSP2_dsm_res.i + SSP2_dsm_com.i + SSP2_dsm_pub.i,
-                            'outflow_total': SSP2_dsm_res.o + SSP2_dsm_com.o + SSP2_dsm_pub.o
-                            })
-SSP3_dsm_df = pd.DataFrame({'time': SSP3_dsm_res.t,
-                            'stock_res': SSP3_dsm_res.s,
-                            'inflow_res': SSP3_dsm_res.i,
-                            'outflow_res': SSP3_dsm_res.o,
-                            'stock_com': SSP3_dsm_com.s,
-                            'inflow_com': SSP3_dsm_com.i,
-                            'outflow_com': SSP3_dsm_com.o,
-                            'stock_pub': SSP3_dsm_pub.s,
-                            'inflow_pub': SSP3_dsm_pub.i,
-                            'outflow_pub': SSP3_dsm_pub.o,
-                            'stock_total': SSP3_dsm_res.s + SSP3_dsm_com.s + SSP3_dsm_pub.s,
-                            'inflow_total': SSP3_dsm_res.i + SSP3_dsm_com.i + SSP3_dsm_pub.i,
-                            'outflow_total': SSP3_dsm_res.o + SSP3_dsm_com.o + SSP3_dsm_pub.o
-                            })
-SSP4_dsm_df = pd.DataFrame({'time': SSP4_dsm_res.t,
-                            'stock_res': SSP4_dsm_res.s,
-                            'inflow_res': SSP4_dsm_res.i,
-                            'outflow_res': SSP4_dsm_res.o,
-                            'stock_com': SSP4_dsm_com.s,
-                            'inflow_com': SSP4_dsm_com.i,
-                            'outflow_com': SSP4_dsm_com.o,
-                            'stock_pub': SSP4_dsm_pub.s,
-                            'inflow_pub': SSP4_dsm_pub.i,
-                            'outflow_pub': SSP4_dsm_pub.o,
-                            'stock_total': SSP4_dsm_res.s + SSP4_dsm_com.s + SSP4_dsm_pub.s,
-                            'inflow_total': SSP4_dsm_res.i + SSP4_dsm_com.i + SSP4_dsm_pub.i,
-                            'outflow_total': SSP4_dsm_res.o + SSP4_dsm_com.o + SSP4_dsm_pub.o
-                            })
-SSP5_dsm_df = pd.DataFrame({'time': SSP5_dsm_res.t,
-                            'stock_res': SSP5_dsm_res.s,
-                            'inflow_res': SSP5_dsm_res.i,
-                            'outflow_res': SSP5_dsm_res.o,
-                            'stock_com': SSP5_dsm_com.s,
-                            'inflow_com': SSP5_dsm_com.i,
-                            'outflow_com': SSP5_dsm_com.o,
-                            'stock_pub': SSP5_dsm_pub.s,
-                            'inflow_pub': SSP5_dsm_pub.i,
-                            'outflow_pub': SSP5_dsm_pub.o,
-                            'stock_total': SSP5_dsm_res.s + SSP5_dsm_com.s + SSP5_dsm_pub.s,
-                            'inflow_total': SSP5_dsm_res.i + SSP5_dsm_com.i + SSP5_dsm_pub.i,
-                            'outflow_total': SSP5_dsm_res.o + SSP5_dsm_com.o + SSP5_dsm_pub.o
-                            })
-
-SSP1_sc_df = pd.DataFrame(SSP1_dsm_res.s_c + SSP1_dsm_com.s_c + SSP1_dsm_pub.s_c)
-SSP2_sc_df = pd.DataFrame(SSP2_dsm_res.s_c + SSP2_dsm_com.s_c + SSP2_dsm_pub.s_c)
-SSP3_sc_df = pd.DataFrame(SSP3_dsm_res.s_c + SSP3_dsm_com.s_c + SSP3_dsm_pub.s_c)
-SSP4_sc_df = pd.DataFrame(SSP4_dsm_res.s_c + SSP4_dsm_com.s_c + SSP4_dsm_pub.s_c)
-SSP5_sc_df = pd.DataFrame(SSP5_dsm_res.s_c + SSP5_dsm_com.s_c + SSP5_dsm_pub.s_c)
-
-
-# write to excel
-writer = pd.ExcelWriter('./Results/SSP_dsm.xlsx', engine='xlsxwriter')
-SSP1_dsm_df.to_excel(writer, sheet_name='SSP1')
-SSP2_dsm_df.to_excel(writer, sheet_name='SSP2')
-SSP3_dsm_df.to_excel(writer, sheet_name='SSP3')
-SSP4_dsm_df.to_excel(writer, sheet_name='SSP4')
-SSP5_dsm_df.to_excel(writer, sheet_name='SSP5')
-SSP1_sc_df.to_excel(writer, sheet_name='SSP1_sc', index=False)
-SSP2_sc_df.to_excel(writer, sheet_name='SSP2_sc', index=False)
-SSP3_sc_df.to_excel(writer, sheet_name='SSP3_sc', index=False)
-SSP4_sc_df.to_excel(writer, sheet_name='SSP4_sc', index=False)
-SSP5_sc_df.to_excel(writer, sheet_name='SSP5_sc', index=False)
-writer.save()
+        mean_ks = compare_CBECS_and_plot(year=2012, index_end=193, CBECS_series=CBECS_Weights.Com_Weight_2012, plot=plot, n_bins=n_bins)[4][0]
+    return mean_ks
+
+# Summary of the floor area models of one scenario, and the total stock by cohort
+def dsm_summary(dsm_res, dsm_com, dsm_pub):
+    """ Returns the stock, inflow, and outflow of each occupancy and in total, and the total stock by cohort, as DataFrames."""
+    dsm_df = pd.DataFrame({'time': dsm_res.t,
+                           'stock_res': dsm_res.s,
+                           'inflow_res': dsm_res.i,
+                           'outflow_res': dsm_res.o,
+                           'stock_com': dsm_com.s,
+                           'inflow_com': dsm_com.i,
+                           'outflow_com': dsm_com.o,
+                           'stock_pub': dsm_pub.s,
+                           'inflow_pub': dsm_pub.i,
+                           'outflow_pub': dsm_pub.o,
+                           'stock_total': dsm_res.s + dsm_com.s + dsm_pub.s,
+                           'inflow_total': dsm_res.i + dsm_com.i + dsm_pub.i,
+                           'outflow_total': dsm_res.o + dsm_com.o + dsm_pub.o
+                           })
+    sc_df = pd.DataFrame(dsm_res.s_c + dsm_com.s_c + dsm_pub.s_c)
+    return dsm_df, sc_df
+
+
+# Save the floor area models in binary form, one directory per model (cf. DynamicStockModel.save).
+# material_demand.py memory-maps the stock by cohort from ./Results/SSP_dsm/<SSP>_total instead of parsing SSP_dsm.xlsx.
+def save_dsm_binary(scenario, dsm_res, dsm_com, dsm_pub, path='./Results/SSP_dsm'):
+    dsm_res.save(os.path.join(path, scenario + '_res'))
+    dsm_com.save(os.path.join(path, scenario + '_com'))
+    dsm_pub.save(os.path.join(path, scenario + '_pub'))
+    dsm_total = dsm.DynamicStockModel(t=np.asarray(dsm_res.t),
+                                      i=dsm_res.i + dsm_com.i + dsm_pub.i,
+                                      o=dsm_res.o + dsm_com.o + dsm_pub.o,
+                                      s=dsm_res.s + dsm_com.s + dsm_pub.s,
+                                      s_c=dsm_res.s_c + dsm_com.s_c + dsm_pub.s_c,
+                                      name=scenario + '_total')
+    dsm_total.save(os.path.join(path, scenario + '_total'))
+
+# write to excel (optional, material_demand.py reads the binary results above)
+export_excel = False
+
+def export_results_excel(results, path='./Results/SSP_dsm.xlsx'):
+    """ Write the summary and the stock by cohort of each scenario in results {scenario: (dsm_res, dsm_com, dsm_pub, MFA_input)}."""
+    writer = pd.ExcelWriter(path, engine='xlsxwriter')
+    for scenario, (dsm_res, dsm_com, dsm_pub, MFA_input) in results.items():
+        dsm_df, sc_df = dsm_summary(dsm_res, dsm_com, dsm_pub)
+        dsm_df.to_excel(writer, sheet_name=scenario)
+        sc_df.to_excel(writer, sheet_name=scenario + '_sc', index=False)
+    writer.close()
 
-# Plot the material flow analyses
-plot_MFA_all_scenarios = False
-if plot_MFA_all_scenarios==True:
-    plot_dsm(SSP1_dsm_res, 'SSP1 Residential')
-    plot_dsm(SSP1_dsm_com, 'SSP1 Commercial')
-    plot_dsm(SSP1_dsm_pub, 'SSP1 Public')
-    plot_dsm(SSP2_dsm_res, 'SSP2 Residential')
-    plot_dsm(SSP2_dsm_com, 'SSP2 Commercial')
-    plot_dsm(SSP2_dsm_pub, 'SSP2 Public')
-    plot_dsm(SSP3_dsm_res, 'SSP3 Residential')
-    plot_dsm(SSP3_dsm_com, 'SSP3 Commercial')
-    plot_dsm(SSP3_dsm_pub, 'SSP3 Public')
-    plot_dsm(SSP4_dsm_res, 'SSP4 Residential')
-    plot_dsm(SSP4_dsm_com, 'SSP4 Commercial')
-    plot_dsm(SSP4_dsm_pub, 'SSP4 Public')
-    plot_dsm(SSP5_dsm_res, 'SSP5 Residential')
-    plot_dsm(SSP5_dsm_com, 'SSP5 Commercial')
-    plot_dsm(SSP5_dsm_pub, 'SSP5 Public')
-else:
-    print('')
-    # plot_dsm(SSP1_dsm_res, 'SSP1 Residential')
 
-# # ----------------------------------------------------------------------------------------------------------------------
-# # Plot all scenarios together for all buildings
-plot_MFA_all_same_graph = True
-no_SSP5 = True      # True for ignoring SSP5, False for including SSP5
-if plot_MFA_all_same_graph == True:
-    plt.subplot(211)
-    plt1, = plt.plot(SSP1_dsm_res.t, SSP1_dsm_res.s + SSP1_dsm_com.s + SSP1_dsm_pub.s)
-    plt2, = plt.plot(SSP2_dsm_res.t, SSP2_dsm_res.s + SSP2_dsm_com.s + SSP2_dsm_pub.s)
-    plt3, = plt.plot(SSP3_dsm_res.t, SSP3_dsm_res.s + SSP3_dsm_com.s + SSP3_dsm_pub.s)
-    plt4, = plt.plot(SSP4_dsm_res.t, SSP4_dsm_res.s + SSP4_dsm_com.s + SSP4_dsm_pub.s)
-    plt16, = plt.plot([base_year, base_year], [0, 200000], color='k', LineStyle='--')
-
-    plt.legend([plt1, plt2, plt3, plt4], ['SSP1', 'SSP2', 'SSP3', 'SSP4'], loc=(1.05, 0.5))
-    # plt.legend([plt1, plt2, plt3, plt4, plt5], ['SSP1', 'SSP2', 'SSP3', 'SSP4', 'SSP5'], loc=(1.05, 0.5))
-    # plt.legend(loc=(1.05, 0.5))
-    plt.tight_layout()
-    plt.xlabel('Year')
-    plt.xlim(left=1980)
-    plt.ylabel('million $m^2$')
-    plt.title('Total Floor Space - Stock')
-    # plt.show();
-
-    plt.subplot(212)
-    plt1, = plt.plot(SSP1_dsm_res.t, SSP1_dsm_res.i + SSP1_dsm_com.i + SSP1_dsm_pub.i, LineStyle='dashed', color='#1f77b4')
-    plt2, = plt.plot(SSP1_dsm_res.t, SSP1_dsm_res.o + SSP1_dsm_com.o + SSP1_dsm_pub.o, color = '#1f77b4')
-    plt3, = plt.plot(SSP2_dsm_res.t, SSP2_dsm_res.i + SSP2_dsm_com.i + SSP2_dsm_pub.i, LineStyle='dashed', color='#ff7f0e' )
-    plt4, = plt.plot(SSP2_dsm_res.t, SSP2_dsm_res.o + SSP2_dsm_com.o + SSP2_dsm_pub.o, color='#ff7f0e')
-    plt5, = plt.plot(SSP3_dsm_res.t, SSP3_dsm_res.i + SSP3_dsm_com.i + SSP3_dsm_pub.i, LineStyle='dashed', color='#2ca02c')
-    plt6, = plt.plot(SSP3_dsm_res.t, SSP3_dsm_res.o + SSP3_dsm_com.o + SSP3_dsm_pub.o, color='#2ca02c')
-    plt7, = plt.plot(SSP4_dsm_res.t, SSP4_dsm_res.i + SSP4_dsm_com.i + SSP4_dsm_pub.i, LineStyle='dashed', color='#d62728')
-    plt8, = plt.plot(SSP4_dsm_res.t, SSP4_dsm_res.o + SSP4_dsm_com.o + SSP4_dsm_pub.o, color='#d62728')
-
-    plt11, = plt.plot([base_year, base_year], [0, 3000], color='k', LineStyle='--')
-
-    plt.legend([plt1, plt2, plt3, plt4, plt5, plt6, plt7, plt8],
-               ['Inflow SSP1', 'Outflow SSP1',
-                'Inflow SSP2', 'Outflow SSP2',
-                'Inflow SSP3', 'Outflow SSP3',
-                'Inflow SSP4', 'Outflow SSP4'], loc='center left', bbox_to_anchor=(1, 0.5))
-
-    # plt.ylim(top=5000)
-    # plt.xlim(left=SSP1_dsm_res.t[0] + 5)
-    plt.xlim(left=1980)
-    plt.xlabel('Year')
-    plt.ylabel('million m$^2/year$')
-    plt.title('Total Floor Space - Flows')
-    plt.show();
-
-
-# # Plot all scenarios together for residential buildings
-plot_MFA_all_same_graph = True
-no_SSP5 = True      # True for ignoring SSP5, False for including SSP5
-if plot_MFA_all_same_graph == True:
-    plt.subplot(211)
-    plt1, = plt.plot(SSP1_dsm_res.t, SSP1_dsm_res.s)
-    plt2, = plt.plot(SSP2_dsm_res.t, SSP2_dsm_res.s)
-    plt3, = plt.plot(SSP3_dsm_res.t, SSP3_dsm_res.s)
-    plt4, = plt.plot(SSP4_dsm_res.t, SSP4_dsm_res.s)
-    plt16, = plt.plot([base_year, base_year], [0, 175000], color='k', LineStyle='--')
-    if no_SSP5 == True:
-        temp = 'bleh'
-    else:
-        plt5, = plt.plot(SSP5_dsm_res.t, SSP5_dsm_res.s)
-    if no_SSP5 == True:
-        plt.legend([plt1, plt2, plt3, plt4], ['SSP1', 'SSP2', 'SSP3', 'SSP4'], loc=(1.05, 0.5))
-    else:
-        plt.legend([plt1, plt2, plt3, plt4, plt5], ['SSP1', 'SSP2', 'SSP3', 'SSP4', 'SSP5'], loc=(1.05, 0.5))
-    # plt.legend([plt1, plt2, plt3, plt4, plt5], ['SSP1', 'SSP2', 'SSP3', 'SSP4', 'SSP5'], loc=(1.05, 0.5))
-    # plt.legend(loc=(1.05, 0.5))
-    plt.tight_layout()
-    plt.xlabel('Year')
-    plt.xlim(left=1980)
-    plt.ylabel('million $m^2$')
-    plt.title('Residential Floor Space - Stock')
-    # plt.show();
-
-    plt.subplot(212)
-    plt1, = plt.plot(SSP1_dsm_res.t, SSP1_dsm_res.i, LineStyle='dashed', color='#1f77b4')
-    plt2, = plt.plot(SSP1_dsm_res.t, SSP1_dsm_res.o, color='#1f77b4')
-    plt3, = plt.plot(SSP2_dsm_res.t, SSP2_dsm_res.i, LineStyle='dashed', color='#ff7f0e' )
-    plt4, = plt.plot(SSP2_dsm_res.t, SSP2_dsm_res.o, color='#ff7f0e' )
-    plt5, = plt.plot(SSP3_dsm_res.t, SSP3_dsm_res.i, LineStyle='dashed', color='#2ca02c')
-    plt6, = plt.plot(SSP3_dsm_res.t, SSP3_dsm_res.o, color='#2ca02c')
-    plt7, = plt.plot(SSP4_dsm_res.t, SSP4_dsm_res.i, LineStyle='dashed', color='#d62728')
-    plt8, = plt.plot(SSP4_dsm_res.t, SSP4_dsm_res.o, color='#d62728')
-    if no_SSP5 == True:
-        temp = 'bleh'
+# Plot the material flow analyses
+def plot_MFA_results(results):
+    """ Plot the floor area models of all scenarios in results {scenario: (dsm_res, dsm_com, dsm_pub, MFA_input)}."""
+    import matplotlib.pyplot as plt
+    SSP1_dsm_res, SSP1_dsm_com, SSP1_dsm_pub, SSP1_MFA_input = results['SSP1']
+    SSP2_dsm_res, SSP2_dsm_com, SSP2_dsm_pub, SSP2_MFA_input = results['SSP2']
+    SSP3_dsm_res, SSP3_dsm_com, SSP3_dsm_pub, SSP3_MFA_input = results['SSP3']
+    SSP4_dsm_res, SSP4_dsm_com, SSP4_dsm_pub, SSP4_MFA_input = results['SSP4']
+    SSP5_dsm_res, SSP5_dsm_com, SSP5_dsm_pub, SSP5_MFA_input = results['SSP5']
+    plot_MFA_all_scenarios = False
+    if plot_MFA_all_scenarios==True:
+        plot_dsm(SSP1_dsm_res, 'SSP1 Residential')
+        plot_dsm(SSP1_dsm_com, 'SSP1 Commercial')
+        plot_dsm(SSP1_dsm_pub, 'SSP1 Public')
+        plot_dsm(SSP2_dsm_res, 'SSP2 Residential')
+        plot_dsm(SSP2_dsm_com, 'SSP2 Commercial')
+        plot_dsm(SSP2_dsm_pub, 'SSP2 Public')
+        plot_dsm(SSP3_dsm_res, 'SSP3 Residential')
+        plot_dsm(SSP3_dsm_com, 'SSP3 Commercial')
+        plot_dsm(SSP3_dsm_pub, 'SSP3 Public')
+        plot_dsm(SSP4_dsm_res, 'SSP4 Residential')
+        plot_dsm(SSP4_dsm_com, 'SSP4 Commercial')
+        plot_dsm(SSP4_dsm_pub, 'SSP4 Public')
+        plot_dsm(SSP5_dsm_res, 'SSP5 Residential')
+        plot_dsm(SSP5_dsm_com, 'SSP5 Commercial')
+        plot_dsm(SSP5_dsm_pub, 'SSP5 Public')
     else:
-        plt9, = plt.plot(SSP5_dsm_res.t, SSP5_dsm_res.i, LineStyle='dashed')
-        plt0, = plt.plot(SSP5_dsm_res.t, SSP5_dsm_res.o)
+        print('')
+        # plot_dsm(SSP1_dsm_res, 'SSP1 Residential')
+
+    # # ----------------------------------------------------------------------------------------------------------------------
+    # # Plot all scenarios together for all buildings
+    plot_MFA_all_same_graph = True
+    no_SSP5 = True      # True for ignoring SSP5, False for including SSP5
+    if plot_MFA_all_same_graph == True:
+        plt.subplot(211)
+        plt1, = plt.plot(SSP1_dsm_res.t, SSP1_dsm_res.s + SSP1_dsm_com.s + SSP1_dsm_pub.s)
+        plt2, = plt.plot(SSP2_dsm_res.t, SSP2_dsm_res.s + SSP2_dsm_com.s + SSP2_dsm_pub.s)
+        plt3, = plt.plot(SSP3_dsm_res.t, SSP3_dsm_res.s + SSP3_dsm_com.s + SSP3_dsm_pub.s)
+        plt4, = plt.plot(SSP4_dsm_res.t, SSP4_dsm_res.s + SSP4_dsm_com.s + SSP4_dsm_pub.s)
+        plt16, = plt.plot([base_year, base_year], [0, 200000], color='k', LineStyle='--')
 
-    plt11, = plt.plot([base_year, base_year], [0, 2500], color='k', LineStyle='--')
+        plt.legend([plt1, plt2, plt3, plt4], ['SSP1', 'SSP2', 'SSP3', 'SSP4'], loc=(1.05, 0.5))
+        # plt.legend([plt1, plt2, plt3, plt4, plt5], ['SSP1', 'SSP2', 'SSP3', 'SSP4', 'SSP5'], loc=(1.05, 0.5))
+        # plt.legend(loc=(1.05, 0.5))
+        plt.tight_layout()
+        plt.xlabel('Year')
+        plt.xlim(left=1980)
+        plt.ylabel('million $m^2$')
+        plt.title('Total Floor Space - Stock')
+        # plt.show();
+
+        plt.subplot(212)
+        plt1, = plt.plot(SSP1_dsm_res.t, SSP1_dsm_res.i + SSP1_dsm_com.i + SSP1_dsm_pub.i, LineStyle='dashed', color='#1f77b4')
+        plt2, = plt.plot(SSP1_dsm_res.t, SSP1_dsm_res.o + SSP1_dsm_com.o + SSP1_dsm_pub.o, color = '#1f77b4')
+        plt3, = plt.plot(SSP2_dsm_res.t, SSP2_dsm_res.i + SSP2_dsm_com.i + SSP2_dsm_pub.i, LineStyle='dashed', color='#ff7f0e' )
+        plt4, = plt.plot(SSP2_dsm_res.t, SSP2_dsm_res.o + SSP2_dsm_com.o + SSP2_dsm_pub.o, color='#ff7f0e')
+        plt5, = plt.plot(SSP3_dsm_res.t, SSP3_dsm_res.i + SSP3_dsm_com.i + SSP3_dsm_pub.i, LineStyle='dashed', color='#2ca02c')
+        plt6, = plt.plot(SSP3_dsm_res.t, SSP3_dsm_res.o + SSP3_dsm_com.o + SSP3_dsm_pub.o, color='#2ca02c')
+        plt7, = plt.plot(SSP4_dsm_res.t, SSP4_dsm_res.i + SSP4_dsm_com.i + SSP4_dsm_pub.i, LineStyle='dashed', color='#d62728')
+        plt8, = plt.plot(SSP4_dsm_res.t, SSP4_dsm_res.o + SSP4_dsm_com.o + SSP4_dsm_pub.o, color='#d62728')
+
+        plt11, = plt.plot([base_year, base_year], [0, 3000], color='k', LineStyle='--')
 
-    if no_SSP5 == True:
         plt.legend([plt1, plt2, plt3, plt4, plt5, plt6, plt7, plt8],
                    ['Inflow SSP1', 'Outflow SSP1',
                     'Inflow SSP2', 'Outflow SSP2',
                     'Inflow SSP3', 'Outflow SSP3',
                     'Inflow SSP4', 'Outflow SSP4'], loc='center left', bbox_to_anchor=(1, 0.5))
-    else:
-        plt.legend([plt1, plt2, plt3, plt4, plt5, plt6, plt7, plt8, plt9, plt0],
-                   ['Inflow SSP1', 'Outflow SSP1',
-                    'Inflow SSP2', 'Outflow SSP2',
-                    'Inflow SSP3', 'Outflow SSP3',
-                    'Inflow SSP4', 'Outflow SSP4',
-                    'Inflow SSP5', 'Outflow SSP5'], loc='center left', bbox_to_anchor=(1, 0.5))
-    # plt.ylim(top=5000)
-    # plt.xlim(left=SSP1_dsm_res.t[0] + 5)
-    plt.xlim(left=1980)
-    plt.xlabel('Year')
-    plt.ylabel('million m$^2/year$')
-    plt.title('Residential Floor Space - Flows')
-    plt.show();
 
+        # plt.ylim(top=5000)
+        # plt.xlim(left=SSP1_dsm_res.t[0] + 5)
+        plt.xlim(left=1980)
+        plt.xlabel('Year')
+        plt.ylabel('million m$^2/year$')
+        plt.title('Total Floor Space - Flows')
+        plt.show();
 
-# # Plot all scenarios together for commercial buildings
-plot_MFA_all_same_graph = True
-no_SSP5 = True      # True for ignoring SSP5, False for including SSP5
-if plot_MFA_all_same_graph == True:
-    plt.subplot(211)
-    plt1, = plt.plot(SSP1_dsm_com.t, SSP1_dsm_com.s)
-    plt2, = plt.plot(SSP2_dsm_com.t, SSP2_dsm_com.s)
-    plt3, = plt.plot(SSP3_dsm_com.t, SSP3_dsm_com.s)
-    plt4, = plt.plot(SSP4_dsm_com.t, SSP4_dsm_com.s)
-    plt16, = plt.plot([base_year, base_year], [0, 35000], color='k', LineStyle='--')
-    if no_SSP5 == True:
-        temp = 'bleh'
-    else:
-        plt5, = plt.plot(SSP5_dsm_com.t, SSP5_dsm_com.s)
-    if no_SSP5 == True:
-        plt.legend([plt1, plt2, plt3, plt4], ['SSP1', 'SSP2', 'SSP3', 'SSP4'], loc=(1.05, 0.5))
-    else:
-        plt.legend([plt1, plt2, plt3, plt4, plt5], ['SSP1', 'SSP2', 'SSP3', 'SSP4', 'SSP5'], loc=(1.05, 0.5))
-    # plt.legend([plt1, plt2, plt3, plt4, plt5], ['SSP1', 'SSP2', 'SSP3', 'SSP4', 'SSP5'], loc=(1.05, 0.5))
-    # plt.legend(loc=(1.05, 0.5))
-    plt.tight_layout()
-    plt.xlim(left=1980)
-    plt.xlabel('Year')
-    plt.ylabel('million $m^2$')
-    plt.title('Commercial Floor Space - Stock')
-    # plt.show();
 
-    plt.subplot(212)
-    plt1, = plt.plot(SSP1_dsm_com.t, SSP1_dsm_com.i, LineStyle='dashed', color='#1f77b4')
-    plt2, = plt.plot(SSP1_dsm_com.t, SSP1_dsm_com.o, color='#1f77b4')
-    plt3, = plt.plot(SSP2_dsm_com.t, SSP2_dsm_com.i, LineStyle='dashed', color='#ff7f0e' )
-    plt4, = plt.plot(SSP2_dsm_com.t, SSP2_dsm_com.o, color='#ff7f0e' )
-    plt5, = plt.plot(SSP3_dsm_com.t, SSP3_dsm_com.i, LineStyle='dashed',color='#2ca02c')
-    plt6, = plt.plot(SSP3_dsm_com.t, SSP3_dsm_com.o, color='#2ca02c')
-    plt7, = plt.plot(SSP4_dsm_com.t, SSP4_dsm_com.i, LineStyle='dashed', color='#d62728')
-    plt8, = plt.plot(SSP4_dsm_com.t, SSP4_dsm_com.o, color='#d62728')
-    if no_SSP5 == True:
-        temp = 'bleh'
-    else:
-        plt9, = plt.plot(SSP5_dsm_com.t, SSP5_dsm_com.i, LineStyle='dashed')
-        plt0, = plt.plot(SSP5_dsm_com.t, SSP5_dsm_com.o)
+    # # Plot all scenarios together for residential buildings
+    plot_MFA_all_same_graph = True
+    no_SSP5 = True      # True for ignoring SSP5, False for including SSP5
+    if plot_MFA_all_same_graph == True:
+        plt.subplot(211)
+        plt1, = plt.plot(SSP1_dsm_res.t, SSP1_dsm_res.s)
+        plt2, = plt.plot(SSP2_dsm_res.t, SSP2_dsm_res.s)
+        plt3, = plt.plot(SSP3_dsm_res.t, SSP3_dsm_res.s)
+        plt4, = plt.plot(SSP4_dsm_res.t, SSP4_dsm_res.s)
+        plt16, = plt.plot([base_year, base_year], [0, 175000], color='k', LineStyle='--')
+        if no_SSP5 == True:
+            temp = 'bleh'
+        else:
+            plt5, = plt.plot(SSP5_dsm_res.t, SSP5_dsm_res.s)
+        if no_SSP5 == True:
+            plt.legend([plt1, plt2, plt3, plt4], ['SSP1', 'SSP2', 'SSP3', 'SSP4'], loc=(1.05, 0.5))
+        else:
+            plt.legend([plt1, plt2, plt3, plt4, plt5], ['SSP1', 'SSP2', 'SSP3', 'SSP4', 'SSP5'], loc=(1.05, 0.5))
+        # plt.legend([plt1, plt2, plt3, plt4, plt5], ['SSP1', 'SSP2', 'SSP3', 'SSP4', 'SSP5'], loc=(1.05, 0.5))
+        # plt.legend(loc=(1.05, 0.5))
+        plt.tight_layout()
+        plt.xlabel('Year')
+        plt.xlim(left=1980)
+        plt.ylabel('million $m^2$')
+        plt.title('Residential Floor Space - Stock')
+        # plt.show();
+
+        plt.subplot(212)
+        plt1, = plt.plot(SSP1_dsm_res.t, SSP1_dsm_res.i, LineStyle='dashed', color='#1f77b4')
+        plt2, = plt.plot(SSP1_dsm_res.t, SSP1_dsm_res.o, color='#1f77b4')
+        plt3, = plt.plot(SSP2_dsm_res.t, SSP2_dsm_res.i, LineStyle='dashed', color='#ff7f0e' )
+        plt4, = plt.plot(SSP2_dsm_res.t, SSP2_dsm_res.o, color='#ff7f0e' )
+        plt5, = plt.plot(SSP3_dsm_res.t, SSP3_dsm_res.i, LineStyle='dashed', color='#2ca02c')
+        plt6, = plt.plot(SSP3_dsm_res.t, SSP3_dsm_res.o, color='#2ca02c')
+        plt7, = plt.plot(SSP4_dsm_res.t, SSP4_dsm_res.i, LineStyle='dashed', color='#d62728')
+        plt8, = plt.plot(SSP4_dsm_res.t, SSP4_dsm_res.o, color='#d62728')
+        if no_SSP5 == True:
+            temp = 'bleh'
+        else:
+            plt9, = plt.plot(SSP5_dsm_res.t, SSP5_dsm_res.i, LineStyle='dashed')
+            plt0, = plt.plot(SSP5_dsm_res.t, SSP5_dsm_res.o)
 
-    plt11, = plt.plot([base_year, base_year], [0, 600], color='k', LineStyle='--')
+        plt11, = plt.plot([base_year, base_year], [0, 2500], color='k', LineStyle='--')
 
-    if no_SSP5 == True:
-        plt.legend([plt1, plt2, plt3, plt4, plt5, plt6, plt7, plt8],
-                   ['Inflow SSP1', 'Outflow SSP1',
-                    'Inflow SSP2', 'Outflow SSP2',
-                    'Inflow SSP3', 'Outflow SSP3',
-                    'Inflow SSP4', 'Outflow SSP4'], loc='center left', bbox_to_anchor=(1, 0.5))
-    else:
-        plt.legend([plt1, plt2, plt3, plt4, plt5, plt6, plt7, plt8, plt9, plt0],
-                   ['Inflow SSP1', 'Outflow SSP1',
-                    'Inflow SSP2', 'Outflow SSP2',
-                    'Inflow SSP3', 'Outflow SSP3',
-                    'Inflow SSP4', 'Outflow SSP4',
-                    'Inflow SSP5', 'Outflow SSP5'], loc='center left', bbox_to_anchor=(1, 0.5))
-    # plt.ylim(top=5000)
-    # plt.xlim(left=SSP1_dsm_com.t[0] + 5)
-    plt.xlim(left=1980)
-    plt.xlabel('Year')
-    plt.ylabel('million m$^2/year$')
-    plt.title('Commercial Floor Space - Flows')
-    plt.show();
+        if no_SSP5 == True:
+            plt.legend([plt1, plt2, plt3, plt4, plt5, plt6, plt7, plt8],
+                       ['Inflow SSP1', 'Outflow SSP1',
+                        'Inflow SSP2', 'Outflow SSP2',
+                        'Inflow SSP3', 'Outflow SSP3',
+                        'Inflow SSP4', 'Outflow SSP4'], loc='center left', bbox_to_anchor=(1, 0.5))
+        else:
+            plt.legend([plt1, plt2, plt3, plt4, plt5, plt6, plt7, plt8, plt9, plt0],
+                       ['Inflow SSP1', 'Outflow SSP1',
+                        'Inflow SSP2', 'Outflow SSP2',
+                        'Inflow SSP3', 'Outflow SSP3',
+                        'Inflow SSP4', 'Outflow SSP4',
+                        'Inflow SSP5', 'Outflow SSP5'], loc='center left', bbox_to_anchor=(1, 0.5))
+        # plt.ylim(top=5000)
+        # plt.xlim(left=SSP1_dsm_res.t[0] + 5)
+        plt.xlim(left=1980)
+        plt.xlabel('Year')
+        plt.ylabel('million m$^2/year$')
+        plt.title('Residential Floor Space - Flows')
+        plt.show();
 
 
-# # Plot all scenarios together for public buildings
-plot_MFA_all_same_graph = True
-no_SSP5 = True      # True for ignoring SSP5, False for including SSP5
-if plot_MFA_all_same_graph == True:
-    plt.subplot(211)
-    plt1, = plt.plot(SSP1_dsm_pub.t, SSP1_dsm_pub.s)
-    plt2, = plt.plot(SSP2_dsm_pub.t, SSP2_dsm_pub.s)
-    plt3, = plt.plot(SSP3_dsm_pub.t, SSP3_dsm_pub.s)
-    plt4, = plt.plot(SSP4_dsm_pub.t, SSP4_dsm_pub.s)
-    plt16, = plt.plot([base_year, base_year], [0, 6500], color='k', LineStyle='--')
-    if no_SSP5 == True:
-        temp = 'bleh'
-    else:
-        plt5, = plt.plot(SSP5_dsm_pub.t, SSP5_dsm_pub.s)
-    if no_SSP5 == True:
-        plt.legend([plt1, plt2, plt3, plt4], ['SSP1', 'SSP2', 'SSP3', 'SSP4'], loc=(1.05, 0.5))
-    else:
-        plt.legend([plt1, plt2, plt3, plt4, plt5], ['SSP1', 'SSP2', 'SSP3', 'SSP4', 'SSP5'], loc=(1.05, 0.5))
-    # plt.legend([plt1, plt2, plt3, plt4, plt5], ['SSP1', 'SSP2', 'SSP3', 'SSP4', 'SSP5'], loc=(1.05, 0.5))
-    # plt.legend(loc=(1.05, 0.5))
-    plt.tight_layout()
-    plt.xlabel('Year')
-    plt.xlim(left=1980)
-    plt.ylabel('million $m^2$ ')
-    plt.title('Public Floor Space - Stock')
-    # plt.show();
+    # # Plot all scenarios together for commercial buildings
+    plot_MFA_all_same_graph = True
+    no_SSP5 = True      # True for ignoring SSP5, False for including SSP5
+    if plot_MFA_all_same_graph == True:
+        plt.subplot(211)
+        plt1, = plt.plot(SSP1_dsm_com.t, SSP1_dsm_com.s)
+        plt2, = plt.plot(SSP2_dsm_com.t, SSP2_dsm_com.s)
+        plt3, = plt.plot(SSP3_dsm_com.t, SSP3_dsm_com.s)
+        plt4, = plt.plot(SSP4_dsm_com.t, SSP4_dsm_com.s)
+        plt16, = plt.plot([base_year, base_year], [0, 35000], color='k', LineStyle='--')
+        if no_SSP5 == True:
+            temp = 'bleh'
+        else:
+            plt5, = plt.plot(SSP5_dsm_com.t, SSP5_dsm_com.s)
+        if no_SSP5 == True:
+            plt.legend([plt1, plt2, plt3, plt4], ['SSP1', 'SSP2', 'SSP3', 'SSP4'], loc=(1.05, 0.5))
+        else:
+            plt.legend([plt1, plt2, plt3, plt4, plt5], ['SSP1', 'SSP2', 'SSP3', 'SSP4', 'SSP5'], loc=(1.05, 0.5))
+        # plt.legend([plt1, plt2, plt3, plt4, plt5], ['SSP1', 'SSP2', 'SSP3', 'SSP4', 'SSP5'], loc=(1.05, 0.5))
+        # plt.legend(loc=(1.05, 0.5))
+        plt.tight_layout()
+        plt.xlim(left=1980)
+        plt.xlabel('Year')
+        plt.ylabel('million $m^2$')
+        plt.title('Commercial Floor Space - Stock')
+        # plt.show();
+
+        plt.subplot(212)
+        plt1, = plt.plot(SSP1_dsm_com.t, SSP1_dsm_com.i, LineStyle='dashed', color='#1f77b4')
+        plt2, = plt.plot(SSP1_dsm_com.t, SSP1_dsm_com.o, color='#1f77b4')
+        plt3, = plt.plot(SSP2_dsm_com.t, SSP2_dsm_com.i, LineStyle='dashed', color='#ff7f0e' )
+        plt4, = plt.plot(SSP2_dsm_com.t, SSP2_dsm_com.o, color='#ff7f0e' )
+        plt5, = plt.plot(SSP3_dsm_com.t, SSP3_dsm_com.i, LineStyle='dashed',color='#2ca02c')
+        plt6, = plt.plot(SSP3_dsm_com.t, SSP3_dsm_com.o, color='#2ca02c')
+        plt7, = plt.plot(SSP4_dsm_com.t, SSP4_dsm_com.i, LineStyle='dashed', color='#d62728')
+        plt8, = plt.plot(SSP4_dsm_com.t, SSP4_dsm_com.o, color='#d62728')
+        if no_SSP5 == True:
+            temp = 'bleh'
+        else:
+            plt9, = plt.plot(SSP5_dsm_com.t, SSP5_dsm_com.i, LineStyle='dashed')
+            plt0, = plt.plot(SSP5_dsm_com.t, SSP5_dsm_com.o)
 
-    plt.subplot(212)
-    plt1, = plt.plot(SSP1_dsm_pub.t, SSP1_dsm_pub.i, LineStyle='dashed', color='#1f77b4')
-    plt2, = plt.plot(SSP1_dsm_pub.t, SSP1_dsm_pub.o, color='#1f77b4')
-    plt3, = plt.plot(SSP2_dsm_pub.t, SSP2_dsm_pub.i, LineStyle='dashed', color='#ff7f0e' )
-    plt4, = plt.plot(SSP2_dsm_pub.t, SSP2_dsm_pub.o, color='#ff7f0e' )
-    plt5, = plt.plot(SSP3_dsm_pub.t, SSP3_dsm_pub.i, LineStyle='dashed', color='#2ca02c')
-    plt6, = plt.plot(SSP3_dsm_pub.t, SSP3_dsm_pub.o, color='#2ca02c')
-    plt7, = plt.plot(SSP4_dsm_pub.t, SSP4_dsm_pub.i, LineStyle='dashed', color='#d62728')
-    plt8, = plt.plot(SSP4_dsm_pub.t, SSP4_dsm_pub.o, color='#d62728')
-    if no_SSP5 == True:
-        temp = 'bleh'
-    else:
-        plt9, = plt.plot(SSP5_dsm_pub.t, SSP5_dsm_pub.i, LineStyle='dashed')
-        plt0, = plt.plot(SSP5_dsm_pub.t, SSP5_dsm_pub.o)
+        plt11, = plt.plot([base_year, base_year], [0, 600], color='k', LineStyle='--')
 
-    plt11, = plt.plot([base_year, base_year], [0, 100], color='k', LineStyle='--')
+        if no_SSP5 == True:
+            plt.legend([plt1, plt2, plt3, plt4, plt5, plt6, plt7, plt8],
+                       ['Inflow SSP1', 'Outflow SSP1',
+                        'Inflow SSP2', 'Outflow SSP2',
+                        'Inflow SSP3', 'Outflow SSP3',
+                        'Inflow SSP4', 'Outflow SSP4'], loc='center left', bbox_to_anchor=(1, 0.5))
+        else:
+            plt.legend([plt1, plt2, plt3, plt4, plt5, plt6, plt7, plt8, plt9, plt0],
+                       ['Inflow SSP1', 'Outflow SSP1',
+                        'Inflow SSP2', 'Outflow SSP2',
+                        'Inflow SSP3', 'Outflow SSP3',
+                        'Inflow SSP4', 'Outflow SSP4',
+                        'Inflow SSP5', 'Outflow SSP5'], loc='center left', bbox_to_anchor=(1, 0.5))
+        # plt.ylim(top=5000)
+        # plt.xlim(left=SSP1_dsm_com.t[0] + 5)
+        plt.xlim(left=1980)
+        plt.xlabel('Year')
+        plt.ylabel('million m$^2/year$')
+        plt.title('Commercial Floor Space - Flows')
+        plt.show();
 
-    if no_SSP5 == True:
-        plt.legend([plt1, plt2, plt3, plt4, plt5, plt6, plt7, plt8],
-                   ['Inflow SSP1', 'Outflow SSP1',
-                    'Inflow SSP2', 'Outflow SSP2',
-                    'Inflow SSP3', 'Outflow SSP3',
-                    'Inflow SSP4', 'Outflow SSP4'], loc='center left', bbox_to_anchor=(1, 0.5))
-    else:
-        plt.legend([plt1, plt2, plt3, plt4, plt5, plt6, plt7, plt8, plt9, plt0],
-                   ['Inflow SSP1', 'Outflow SSP1',
-                    'Inflow SSP2', 'Outflow SSP2',
-                    'Inflow SSP3', 'Outflow SSP3',
-                    'Inflow SSP4', 'Outflow SSP4',
-                    'Inflow SSP5', 'Outflow SSP5'], loc='center left', bbox_to_anchor=(1, 0.5))
-    # plt.ylim(top=5000)
-    # plt.xlim(left=SSP1_dsm_pub.t[0] + 5)
-    plt.xlim(left=1980)
-    plt.xlabel('Year')
-    plt.ylabel('million m$^2/year$')
-    plt.title('Public Floor Space - Flows')
-    plt.show();
+
+    # # Plot all scenarios together for public buildings
+    plot_MFA_all_same_graph = True
+    no_SSP5 = True      # True for ignoring SSP5, False for including SSP5
+    if plot_MFA_all_same_graph == True:
+        plt.subplot(211)
+        plt1, = plt.plot(SSP1_dsm_pub.t, SSP1_dsm_pub.s)
+        plt2, = plt.plot(SSP2_dsm_pub.t, SSP2_dsm_pub.s)
+        plt3, = plt.plot(SSP3_dsm_pub.t, SSP3_dsm_pub.s)
+        plt4, = plt.plot(SSP4_dsm_pub.t, SSP4_dsm_pub.s)
+        plt16, = plt.plot([base_year, base_year], [0, 6500], color='k', LineStyle='--')
+        if no_SSP5 == True:
+            temp = 'bleh'
+        else:
+            plt5, = plt.plot(SSP5_dsm_pub.t, SSP5_dsm_pub.s)
+        if no_SSP5 == True:
+            plt.legend([plt1, plt2, plt3, plt4], ['SSP1', 'SSP2', 'SSP3', 'SSP4'], loc=(1.05, 0.5))
+        else:
+            plt.legend([plt1, plt2, plt3, plt4, plt5], ['SSP1', 'SSP2', 'SSP3', 'SSP4', 'SSP5'], loc=(1.05, 0.5))
+        # plt.legend([plt1, plt2, plt3, plt4, plt5], ['SSP1', 'SSP2', 'SSP3', 'SSP4', 'SSP5'], loc=(1.05, 0.5))
+        # plt.legend(loc=(1.05, 0.5))
+        plt.tight_layout()
+        plt.xlabel('Year')
+        plt.xlim(left=1980)
+        plt.ylabel('million $m^2$ ')
+        plt.title('Public Floor Space - Stock')
+        # plt.show();
+
+        plt.subplot(212)
+        plt1, = plt.plot(SSP1_dsm_pub.t, SSP1_dsm_pub.i, LineStyle='dashed', color='#1f77b4')
+        plt2, = plt.plot(SSP1_dsm_pub.t, SSP1_dsm_pub.o, color='#1f77b4')
+        plt3, = plt.plot(SSP2_dsm_pub.t, SSP2_dsm_pub.i, LineStyle='dashed', color='#ff7f0e' )
+        plt4, = plt.plot(SSP2_dsm_pub.t, SSP2_dsm_pub.o, color='#ff7f0e' )
+        plt5, = plt.plot(SSP3_dsm_pub.t, SSP3_dsm_pub.i, LineStyle='dashed', color='#2ca02c')
+        plt6, = plt.plot(SSP3_dsm_pub.t, SSP3_dsm_pub.o, color='#2ca02c')
+        plt7, = plt.plot(SSP4_dsm_pub.t, SSP4_dsm_pub.i, LineStyle='dashed', color='#d62728')
+        plt8, = plt.plot(SSP4_dsm_pub.t, SSP4_dsm_pub.o, color='#d62728')
+        if no_SSP5 == True:
+            temp = 'bleh'
+        else:
+            plt9, = plt.plot(SSP5_dsm_pub.t, SSP5_dsm_pub.i, LineStyle='dashed')
+            plt0, = plt.plot(SSP5_dsm_pub.t, SSP5_dsm_pub.o)
+
+        plt11, = plt.plot([base_year, base_year], [0, 100], color='k', LineStyle='--')
+
+        if no_SSP5 == True:
+            plt.legend([plt1, plt2, plt3, plt4, plt5, plt6, plt7, plt8],
+                       ['Inflow SSP1', 'Outflow SSP1',
+                        'Inflow SSP2', 'Outflow SSP2',
+                        'Inflow SSP3', 'Outflow SSP3',
+                        'Inflow SSP4', 'Outflow SSP4'], loc='center left', bbox_to_anchor=(1, 0.5))
+        else:
+            plt.legend([plt1, plt2, plt3, plt4, plt5, plt6, plt7, plt8, plt9, plt0],
+                       ['Inflow SSP1', 'Outflow SSP1',
+                        'Inflow SSP2', 'Outflow SSP2',
+                        'Inflow SSP3', 'Outflow SSP3',
+                        'Inflow SSP4', 'Outflow SSP4',
+                        'Inflow SSP5', 'Outflow SSP5'], loc='center left', bbox_to_anchor=(1, 0.5))
+        # plt.ylim(top=5000)
+        # plt.xlim(left=SSP1_dsm_pub.t[0] + 5)
+        plt.xlim(left=1980)
+        plt.xlabel('Year')
+        plt.ylabel('million m$^2/year$')
+        plt.title('Public Floor Space - Flows')
+        plt.show();
+
+
+def main(argv=None):
+    """ Compute the floor area models of all SSP scenarios, compare them with the RECS and CBECS data,
+        and save the results (cf. save_dsm_binary). Returns {scenario: (dsm_res, dsm_com, dsm_pub, MFA_input)}."""
+    parser = argparse.ArgumentParser(description='Dynamic stock model (DSM) for US building stock of the SSP scenarios.')
+    parser.add_argument('--no-plots', action='store_true', help='headless run without figures, matplotlib and seaborn are not imported')
+    parser.add_argument('--calibrate', action='store_true', help='calibrate the Weibull lifetimes against RECS and CBECS (cf. calibrate_lt)')
+    parser.add_argument('--profile', action='store_true', help='profile the dynamic stock model methods (cf. profile_dsm)')
+    parser.add_argument('--export-excel', action='store_true', help='write ./Results/SSP_dsm.xlsx (cf. export_excel)')
+    args = parser.parse_args(argv)
+    plot = not args.no_plots
+
+    # interpolate population and gdp data, and calculate the floor area elasticity
+    scenario_inputs(plot=plot)
+    if plot == True and plot_lifetime_distr == True:
+        plot_lifetime_distributions()
+
+    # Calculate MFA for individual scenarios
+    if profile_dsm == True or args.profile == True: dsm.profile_start()
+    results = calc_MFA_matrix(['SSP1', 'SSP2', 'SSP3', 'SSP4', 'SSP5'], {'res': lt_res, 'com': lt_com, 'pub': lt_pub}).results()
+    if profile_dsm == True or args.profile == True:
+        dsm.profile_stop()
+        print(dsm.profile_report())
+
+    if calibrate_lt == True or args.calibrate == True:
+        calibrate_lifetimes(results['SSP1'][3])
+    if RECS_comparison == True:
+        compare_RECS(results['SSP1'][0], plot=plot)
+    if CBECS_comparison == True:
+        compare_CBECS(results['SSP1'][1], plot=plot)
+
+    for scenario, (dsm_res, dsm_com, dsm_pub, MFA_input) in results.items():
+        save_dsm_binary(scenario, dsm_res, dsm_com, dsm_pub)
+    if export_excel == True or args.export_excel == True:
+        export_results_excel(results)
+
+    if plot == True:
+        plot_MFA_results(results)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+# Calibration of the Weibull building lifetime distributions against the RECS and CBECS age structures
+#
+# For each occupancy, search the (shape, scale) of the Weibull lifetime that minimizes the mean KS statistic
+#   between the age structure of the stock-driven model and the floor area weights of all survey years.
+#   A coarse grid is evaluated first, fanned out across a process pool, followed by a Nelder-Mead search
+#   from the best grid point. Every evaluation is appended to a cache file on disk, so that an interrupted
+#   search resumes where it stopped, and the full objective surface is returned with the best parameters.
+
+# Import libraries
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from scipy import optimize
+from scipy import stats
+from odym import dynamic_stock_model as dsm
+
+# Survey years and the index of the survey year in the time vector of the model (1900 - 2100)
+RECS_years = {2015: 196, 2009: 190, 2005: 186, 2001: 181, 1997: 178, 1993: 174, 1987: 168, 1980: 161}
+CBECS_years = {2012: 193, 2003: 184, 1999: 180, 1995: 176, 1992: 173, 1986: 167, 1983: 164, 1979: 160}
+index_start = 100    # year to start comparison of the age structures
+
+# Coarse grid of the Weibull parameters
+shape_grid = np.linspace(2, 10, 17)
+scale_grid = np.linspace(50, 150, 21)
+
+
+# Weighted statistics of the age structure: (age, floor area) pairs are compared directly,
+# instead of repeating each age once per unit of floor area.
+def weighted_ecdf(x, w, points):
+    """ Empirical CDF of the values x with weights w, evaluated at points."""
+    x, w = np.asarray(x, dtype=float), np.asarray(w, dtype=float)
+    order = np.argsort(x, kind='stable')
+    cum_w = np.concatenate(([0], np.cumsum(w[order])))
+    return cum_w[np.searchsorted(x[order], points, side='right')] / cum_w[-1]
+
+def weighted_quantile(x, w, q):
+    """ Quantiles at the levels q of the values x with weights w, the inverse of weighted_ecdf.
+        Same as the value at position q * sum(w) of the sorted sample in which each x is repeated w times."""
+    x, w = np.asarray(x, dtype=float), np.asarray(w, dtype=float)
+    order = np.argsort(x, kind='stable')
+    cum_w = np.cumsum(w[order])
+    return x[order][np.minimum(np.searchsorted(cum_w, np.asarray(q) * cum_w[-1], side='right'), len(x) - 1)]
+
+def weighted_ks_2samp(x1, w1, x2, w2):
+    """ Two-sample Kolmogorov-Smirnov test for the values x1, x2 with weights w1, w2.
+        Returns the statistic max|F1 - F2| of the weighted ECDFs and the p-value of the two-sided test,
+        with the sums of the weights as sample sizes. For integer weights, both are the same as
+        stats.ks_2samp(..., method='asymp') of the samples in which each x is repeated w times."""
+    points = np.union1d(np.asarray(x1, dtype=float), np.asarray(x2, dtype=float))
+    statistic = np.max(np.abs(weighted_ecdf(x1, w1, points) - weighted_ecdf(x2, w2, points)))
+    n1, n2 = np.sum(w1), np.sum(w2)
+    pvalue = stats.kstwo.sf(statistic, max(np.round(n1 * n2 / (n1 + n2)), 1))    # at least one observation for weights that sum to less than 1
+    return statistic, pvalue
+
+def weighted_describe(x, w):
+    """ Total weight, weighted mean, and weighted standard deviation of x."""
+    x, w = np.asarray(x, dtype=float), np.asarray(w, dtype=float)
+    mean = np.average(x, weights=w)
+    return {'nobs': w.sum(), 'mean': mean, 'std': np.sqrt(np.average((x - mean) ** 2, weights=w))}
+
+
+def survey_list(Weights, prefix, survey_years):
+    """ List of (year, index_end, weights) of the survey years, from the columns prefix + year of the weights DataFrame,
+        e.g. survey_list(RECS_Weights, 'Res_Weight_', RECS_years)"""
+    return [(year, index_end, np.asarray(Weights[prefix + str(year)], dtype=float)) for year, index_end in survey_years.items()]
+
+def mean_ks(shape, scale, t, s, surveys):
+    """ Mean KS statistic between the age structure of the stock driven model with a Weibull(shape, scale) lifetime
+        and the survey weights, and the KS statistic of each survey year.
+        The model is causal, so it is only computed up to the last survey year."""
+    n_years = max(index_end for year, index_end, weights in surveys) + 1
+    my_dsm = dsm.DynamicStockModel(t=np.asarray(t)[0:n_years], s=np.asarray(s, dtype=float)[0:n_years],
+                                   lt={'Type': 'Weibull', 'Shape': np.array([shape]), 'Scale': np.array([scale])})
+    S_C = my_dsm.compute_stock_driven_model(NegativeInflowCorrect=True)[0]
+    ks = []
+    for year, index_end, weights in surveys:
+        age_in_year = year - np.asarray(my_dsm.t[index_start:index_end])
+        dsm_area = np.asarray(S_C[index_end][index_start:index_end], dtype=float)
+        ks.append(weighted_ks_2samp(age_in_year, dsm_area, age_in_year, weights[index_start:index_end] * dsm_area.sum())[0])
+    return float(np.mean(ks)), [float(k) for k in ks]
+
+def inputs_hash(t, s, surveys):
+    """ Fingerprint of the stock and survey data, so that cached evaluations are only reused for the same inputs."""
+    h = hashlib.sha1()
+    for array in [t, s] + [np.append([year, index_end], weights) for year, index_end, weights in surveys]:
+        h.update(np.ascontiguousarray(array, dtype=float).tobytes())
+    return h.hexdigest()
+
+def cache_key(shape, scale):
+    return (round(float(shape), 6), round(float(scale), 6))
+
+def load_cache(cache_path, occupancy, inputs):
+    """ Cached evaluations {(shape, scale): record} of this occupancy and inputs from the json lines file cache_path."""
+    cache = {}
+    if cache_path is not None and os.path.exists(cache_path):
+        with open(cache_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue    # line cut off by an interrupted run
+                if record['occupancy'] == occupancy and record['inputs'] == inputs:
+                    cache[cache_key(record['shape'], record['scale'])] = record
+    return cache
+
+def evaluate_points(points, t, s, surveys, cache, cache_path, occupancy, inputs, executor=None):
+    """ Objective of each (shape, scale) in points. Points that are not in the cache are computed,
+        in parallel when an executor is given, and appended to the cache and the cache file as they finish."""
+    new_points = list(dict.fromkeys(cache_key(shape, scale) for shape, scale in points if cache_key(shape, scale) not in cache))
+
+    def store(point, result):
+        record = {'occupancy': occupancy, 'inputs': inputs, 'shape': point[0], 'scale': point[1],
+                  'objective': result[0], 'ks': result[1]}
+        cache[point] = record
+        if cache_path is not None:
+            with open(cache_path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+    if executor is None:
+        for point in new_points:
+            store(point, mean_ks(point[0], point[1], t, s, surveys))
+    else:
+        futures = {executor.submit(mean_ks, point[0], point[1], t, s, surveys): point for point in new_points}
+        for future in as_completed(futures):
+            store(futures[future], future.result())
+    return [cache[cache_key(shape, scale)]['objective'] for shape, scale in points]
+
+def calibrate_weibull(t, s, surveys, occupancy='res', shapes=shape_grid, scales=scale_grid, local=True,
+                      cache_path='./Results/lt_calibration_cache.jsonl', max_workers=None):
+    """ Weibull (shape, scale) that minimizes the mean KS statistic between the stock driven model of the stock s
+        and the survey weights (cf. survey_list).
+        Returns a dictionary with the best 'Shape', 'Scale', 'objective', and the KS statistic of each survey year 'ks',
+        the lifetime 'lt' for generate_lt / calc_MFA, all evaluations 'surface' (DataFrame with shape, scale, objective),
+        and the objective on the coarse grid 'grid' (DataFrame with index shape and columns scale).
+        max_workers = 1 evaluates in this process; cache_path = None disables the cache file."""
+    inputs = inputs_hash(t, s, surveys)
+    cache = load_cache(cache_path, occupancy, inputs)
+    grid_points = [(shape, scale) for shape in shapes for scale in scales]
+
+    # coarse grid
+    if max_workers == 1:
+        objectives = evaluate_points(grid_points, t, s, surveys, cache, cache_path, occupancy, inputs)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            objectives = evaluate_points(grid_points, t, s, surveys, cache, cache_path, occupancy, inputs, executor)
+    best = grid_points[int(np.argmin(objectives))]
+
+    # local search from the best grid point, within the bounds of the grid
+    if local == True:
+        result = optimize.minimize(lambda p: evaluate_points([tuple(p)], t, s, surveys, cache, cache_path, occupancy, inputs)[0],
+                                   x0=np.array(best), method='Nelder-Mead',
+                                   bounds=[(min(shapes), max(shapes)), (min(scales), max(scales))],
+                                   options={'xatol': 1e-3, 'fatol': 1e-6})
+        best = tuple(result.x)
+
+    evaluate_points([best], t, s, surveys, cache, cache_path, occupancy, inputs)
+    best_record = cache[cache_key(*best)]
+    surface = pd.DataFrame([{'shape': record['shape'], 'scale': record['scale'], 'objective': record['objective']}
+                            for record in cache.values()]).sort_values(['shape', 'scale']).reset_index(drop=True)
+    grid = pd.DataFrame(np.reshape(objectives, (len(shapes), len(scales))), index=pd.Index(shapes, name='shape'),
+                        columns=pd.Index(scales, name='scale'))
+    return {'Shape': best_record['shape'], 'Scale': best_record['scale'], 'objective': best_record['objective'],
+            'ks': best_record['ks'], 'lt': {'Type': 'Weibull', 'Shape': np.array([best_record['shape']]), 'Scale': np.array([best_record['scale']])},
+            'surface': surface, 'grid': grid}
@@ -5,6 +5,7 @@
 #   with top-down economic data.
 
 # import libraries
+import os
 import pandas as pd
 import matplotlib.pyplot as plt
 from odym import dynamic_stock_model as dsm
@@ -22,22 +23,32 @@ from statsmodels.nonparametric.kde import kernel_switch
 # load in data from other scripts and excels
 structure_data_historical = pd.read_csv('./InputData/HAZUS_weight.csv')
 
-FA_dsm_SSP1 = pd.read_excel('./Results/SSP_dsm.xlsx', sheet_name='SSP1')
-FA_dsm_SSP1 = FA_dsm_SSP1.set_index('time', drop=False)
-FA_dsm_SSP2 = pd.read_excel('./Results/SSP_dsm.xlsx', sheet_name='SSP2')
-FA_dsm_SSP2 = FA_dsm_SSP2.set_index('time',drop=False)
-FA_dsm_SSP3 = pd.read_excel('./Results/SSP_dsm.xlsx', sheet_name='SSP3')
-FA_dsm_SSP3 = FA_dsm_SSP3.set_index('time',drop=False)
-# FA_dsm_SSP4 = pd.read_excel('./Results/SSP_dsm.xlsx', sheet_name='SSP4')
-# FA_dsm_SSP4 = FA_dsm_SSP4.set_index('time',drop=False)
-# FA_dsm_SSP5 = pd.read_excel('./Results/SSP_dsm.xlsx', sheet_name='SSP5')
-# FA_dsm_SSP5 = FA_dsm_SSP5.set_index('time',drop=False)
-
-FA_sc_SSP1 = pd.read_excel('./Results/SSP_dsm.xlsx', sheet_name='SSP1_sc')
-FA_sc_SSP2 = pd.read_excel('./Results/SSP_dsm.xlsx', sheet_name='SSP2_sc')
-FA_sc_SSP3 = pd.read_excel('./Results/SSP_dsm.xlsx', sheet_name='SSP3_sc')
-# FA_sc_SSP4 = pd.read_excel('./Results/SSP_dsm.xlsx', sheet_name='SSP4_sc')
-# FA_sc_SSP5 = pd.read_excel('./Results/SSP_dsm.xlsx', sheet_name='SSP5_sc')
+# floor area models of dsm_scenario.py, saved in binary form with DynamicStockModel.save.
+# The stock by cohort is memory-mapped. If the binary results do not exist (dsm_scenario.main() not run yet),
+# the Excel export of dsm_scenario.py (SSP_dsm.xlsx) is read instead.
+def load_FA_dsm(scenario, path='./Results/SSP_dsm', path_excel='./Results/SSP_dsm.xlsx'):
+    if not os.path.isdir(os.path.join(path, scenario + '_total')):
+        FA_dsm_SSP = pd.read_excel(path_excel, sheet_name=scenario)
+        FA_dsm_SSP = FA_dsm_SSP.set_index('time', drop=False)
+        FA_sc_SSP = pd.read_excel(path_excel, sheet_name=scenario + '_sc')
+        return FA_dsm_SSP, FA_sc_SSP
+    FA_dsm = {}
+    for sector in ['res', 'com', 'pub', 'total']:
+        FA_dsm[sector] = dsm.DynamicStockModel.load(os.path.join(path, scenario + '_' + sector), mmap=True)
+    FA_dsm_SSP = pd.DataFrame({'time': FA_dsm['total'].t})
+    for sector in ['res', 'com', 'pub', 'total']:
+        FA_dsm_SSP['stock_' + sector] = FA_dsm[sector].s
+        FA_dsm_SSP['inflow_' + sector] = FA_dsm[sector].i
+        FA_dsm_SSP['outflow_' + sector] = FA_dsm[sector].o
+    FA_dsm_SSP = FA_dsm_SSP.set_index('time', drop=False)
+    FA_sc_SSP = pd.DataFrame(FA_dsm['total'].s_c, copy=False)
+    return FA_dsm_SSP, FA_sc_SSP
+
+FA_dsm_SSP1, FA_sc_SSP1 = load_FA_dsm('SSP1')
+FA_dsm_SSP2, FA_sc_SSP2 = load_FA_dsm('SSP2')
+FA_dsm_SSP3, FA_sc_SSP3 = load_FA_dsm('SSP3')
+# FA_dsm_SSP4, FA_sc_SSP4 = load_FA_dsm('SSP4')
+# FA_dsm_SSP5, FA_sc_SSP5 = load_FA_dsm('SSP5')
 
 materials_intensity = pd.read_excel('./InputData/Material_data.xlsx', sheet_name='SSP1_density')
 materials_intensity_df = materials_intensity.set_index('Structure_Type', drop=True)
@@ -227,41 +238,37 @@ def determine_outflow_existing_bldgs(FA_sc_SSP, lt, plot=True, plot_title=''):
      Key assumption is that construction techniques are the same each year. '''
 
     # compute an outflow for the existing stock using a "compute evolution from initial stock method"
-    def determine_outflow_by_ss(lt=lt_dummy, FA_sc_df=FA_sc_SSP, switch_year=196, frac_stock=1.0):
+    def determine_outflow_by_ss(lt=lt_dummy, FA_sc_df=FA_sc_SSP, switch_year=196, frac_stock=(1.0,)):
         '''Compute the outflow of the existing building stock with no additional inflow.
         A switch year of 196 represents 2016.
-        frac_stock is the ratio of the exisitng building stock that is a particular structural system.
-        For frac_stock = 1.0, all of the stock is considered to be the same. '''
+        frac_stock is a sequence of ratios of the exisitng building stock, one per structural system.
+        For frac_stock = (1.0,), all of the stock is considered to be the same.
+        The stocks of all ratios are computed in one call, and a list with one dataframe per ratio is returned. '''
         DSM_existing_stock = dsm.DynamicStockModel(t=years_all, lt=lt)
         S_C = DSM_existing_stock.compute_evolution_initialstock(
-            InitialStock=FA_sc_SSP.loc[(switch_year - 1), 0:(switch_year - 1)] * frac_stock, SwitchTime=switch_year)
+            InitialStock=np.multiply.outer(np.asarray(frac_stock), FA_sc_SSP.loc[(switch_year - 1), 0:(switch_year - 1)].values),
+            SwitchTime=switch_year)
 
         # compute outflow
-        O_C = DSM_existing_stock.o_c[1::, :] = -1 * np.diff(DSM_existing_stock.s_c, n=1, axis=0)
-        O_C = DSM_existing_stock.o_c[np.diag_indices(len(DSM_existing_stock.t))] = 0 - np.diag(
-            DSM_existing_stock.s_c)  # allow for outflow in year 0 already
-        O = DSM_existing_stock.compute_outflow_total()
+        DSM_existing_stock.o_c[:, 1::, :] = -1 * np.diff(S_C, n=1, axis=1)
+        diag = np.arange(len(DSM_existing_stock.t))
+        DSM_existing_stock.o_c[:, diag, diag] = 0 - S_C[:, diag, diag]  # allow for outflow in year 0 already
+        O = DSM_existing_stock.o_c.sum(axis=2)
         # compute stock
-        S = DSM_existing_stock.s_c.sum(axis=1)
-        outflow_df = pd.DataFrame({'time': DSM_existing_stock.t, 'outflow': O, 'stock': S})
-        return outflow_df
-
-    existing_outflow_total = determine_outflow_by_ss(lt=lt, FA_sc_df=FA_sc_SSP, switch_year=196,
-                                                     frac_stock=1.0)
-    existing_outflow_LF_wood = determine_outflow_by_ss(lt=lt, FA_sc_df=FA_sc_SSP, switch_year=196,
-                                                       frac_stock=structure_data_historical.LF_wood[0])
-    existing_outflow_Mass_Timber = determine_outflow_by_ss(lt=lt, FA_sc_df=FA_sc_SSP, switch_year=196,
-                                                           frac_stock=structure_data_historical.Mass_Timber[0])
-    existing_outflow_Steel = determine_outflow_by_ss(lt=lt, FA_sc_df=FA_sc_SSP, switch_year=196,
-                                                     frac_stock=structure_data_historical.Steel[0])
-    existing_outflow_RC = determine_outflow_by_ss(lt=lt, FA_sc_df=FA_sc_SSP, switch_year=196,
-                                                  frac_stock=structure_data_historical.RC[0])
-    existing_outflow_RM = determine_outflow_by_ss(lt=lt, FA_sc_df=FA_sc_SSP, switch_year=196,
-                                                  frac_stock=structure_data_historical.RM[0])
-    existing_outflow_URM = determine_outflow_by_ss(lt=lt, FA_sc_df=FA_sc_SSP, switch_year=196,
-                                                   frac_stock=structure_data_historical.URM[0])
-    existing_outflow_MH = determine_outflow_by_ss(lt=lt, FA_sc_df=FA_sc_SSP, switch_year=196,
-                                                  frac_stock=structure_data_historical.MH[0])
+        S = S_C.sum(axis=2)
+        return [pd.DataFrame({'time': DSM_existing_stock.t, 'outflow': O[n], 'stock': S[n]}) for n in range(len(frac_stock))]
+
+    [existing_outflow_total, existing_outflow_LF_wood, existing_outflow_Mass_Timber, existing_outflow_Steel,
+     existing_outflow_RC, existing_outflow_RM, existing_outflow_URM, existing_outflow_MH] = determine_outflow_by_ss(
+        lt=lt, FA_sc_df=FA_sc_SSP, switch_year=196,
+        frac_stock=[1.0,
+                    structure_data_historical.LF_wood[0],
+                    structure_data_historical.Mass_Timber[0],
+                    structure_data_historical.Steel[0],
+                    structure_data_historical.RC[0],
+                    structure_data_historical.RM[0],
+                    structure_data_historical.URM[0],
+                    structure_data_historical.MH[0]])
 
     existing_outflow_all = pd.DataFrame({
         'outflow_LF_wood': existing_outflow_LF_wood.outflow,
@@ -430,10 +437,8 @@ def determine_inflow_outflow_new_bldg(scenario, FA_dsm_SSP=FA_dsm_SSP1, lt=lt_du
         # CheckStr = DSM_Inflow.dimension_check()
         # print(CheckStr)
 
-        S_C = DSM_Inflow_x.compute_s_c_inflow_driven()
-        O_C = DSM_Inflow_x.compute_o_c_from_s_c()
-        S = DSM_Inflow_x.compute_stock_total()
-        O = DSM_Inflow_x.compute_outflow_total()
+        # only total stock and outflow are needed, no stock by cohort
+        S, O = DSM_Inflow_x.compute_inflow_driven_model()
         DSM_Inflow_x.o = pd.Series(DSM_Inflow_x.o, index=DSM_Inflow_x.t)
         return DSM_Inflow_x
 
@@ -939,7 +944,9 @@ os_existing_SSP3 = determine_outflow_existing_bldgs(FA_sc_SSP=FA_sc_SSP3,   lt=l
 
 MC_sim = True
 num_iter =5000
+profile_dsm = False  # print calls and wall time of the dynamic stock model methods in the MC loop (cf. dsm.profiling)
 if MC_sim == True:
+    if profile_dsm == True: dsm.profile_start()
     # scenario 1 MC:
     S1_mat_i_list = {}
     S1_mat_o_list = {}
@@ -1094,6 +1101,10 @@ if MC_sim == True:
         S7_mat_o_list[i] = S7_mat_o
         S7_mat_s_list[i] = S7_mat_s
 
+    if profile_dsm == True:
+        dsm.profile_stop()
+        print(dsm.profile_report())
+
     # Calculate mean and standard deviation
     S1_mat_i_mean = pd.concat(S1_mat_i_list).groupby(level=1).mean()
     S1_mat_i_std = pd.concat(S1_mat_i_list).groupby(level=1).std()
@@ -1186,6 +1197,9 @@ if MC_sim == True:
     S7_mat_s_p05 = pd.concat(S7_mat_s_list).groupby(level=1).quantile(q=0.05)
     S7_mat_s_p95 = pd.concat(S7_mat_s_list).groupby(level=1).quantile(q=0.95)
 
+    print('survival function cache of the dynamic stock models (hits, misses, size):')
+    print(dsm.sf_cache_info())
+
     # print('mean inflow for ea scenario')
     # print(S1_mat_i_mean.head())
     print('mean stock for ea scenario')
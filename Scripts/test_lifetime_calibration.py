@@ -0,0 +1,46 @@
+# Unit test of the weighted statistics of lifetime_calibration against the samples in which each value is repeated
+# once per unit of weight, e.g. python -m unittest Scripts/test_lifetime_calibration.py from the repository root.
+
+# Import libraries
+import os
+import sys
+import unittest
+import numpy as np
+from scipy import stats
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from lifetime_calibration import weighted_ecdf, weighted_quantile, weighted_ks_2samp
+
+# Ages with integer floor area weights, incl. ties between the samples and a zero weight
+x1 = np.array([3., 7., 12., 12., 25., 40., 41., 60.])
+w1 = np.array([2, 5, 1, 3, 8, 4, 0, 6])
+x2 = np.array([7., 10., 25., 33., 40., 55.])
+w2 = np.array([4, 1, 7, 2, 9, 3])
+x1_repeated, x2_repeated = np.repeat(x1, w1), np.repeat(x2, w2)
+
+
+class WeightedStatisticsTestCase(unittest.TestCase):
+
+    def test_weighted_ecdf(self):
+        """Test the weighted ECDF against the share of the repeated sample at or below each point."""
+        points = np.arange(0, 65)
+        np.testing.assert_array_almost_equal(weighted_ecdf(x1, w1, points),
+                                             [np.mean(x1_repeated <= point) for point in points], 12)
+
+    def test_weighted_quantile(self):
+        """Test the weighted quantiles against the value at position q * sum(w) of the sorted repeated sample."""
+        q = np.linspace(0, 0.99, 100)
+        x_sorted = np.sort(x1_repeated)
+        np.testing.assert_array_equal(weighted_quantile(x1, w1, q), x_sorted[np.floor(q * len(x_sorted)).astype(int)])
+        np.testing.assert_array_equal(weighted_quantile(x1, w1, 1.0), x_sorted[-1])
+
+    def test_weighted_ks_2samp(self):
+        """Test the weighted KS statistic and p-value against stats.ks_2samp of the repeated samples."""
+        statistic, pvalue = weighted_ks_2samp(x1, w1, x2, w2)
+        reference = stats.ks_2samp(x1_repeated, x2_repeated, method='asymp')
+        self.assertAlmostEqual(statistic, reference.statistic, 12)
+        self.assertAlmostEqual(pvalue, reference.pvalue, 12)
+        self.assertAlmostEqual(weighted_ks_2samp(x1, w1, x1, 3 * w1)[0], 0.0, 12)
+
+
+if __name__ == '__main__':
+    unittest.main()